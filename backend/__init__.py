@@ -1,2 +0,0 @@
-from . import llm_utils
-from . import embedding_utils
@@ -0,0 +1,87 @@
+"""
+Per-request CPU latency of the embedding and sentiment models for each
+inference backend (PyTorch, ONNX Runtime, ONNX Runtime + int8).
+
+    python -m benchmarks.inference_benchmark --requests 200 --output inference.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE_MESSAGES = [
+    "How do I reset my password?",
+    "I was charged twice for my subscription this month and I want a refund.",
+    "thanks",
+    "The app crashes with error ERR-404 every time I open the billing page, this is unacceptable.",
+    "Can I change the shipping address on an order that has already been dispatched?",
+]
+
+
+def _load(backend: str):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        from transformers import pipeline
+
+        encoder = SentenceTransformer("all-MiniLM-L6-v2")
+        classifier = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+    else:
+        from utils.onnx_backend import OnnxSentenceEncoder, OnnxTextClassifier
+
+        quantize = backend == "onnx-int8"
+        encoder = OnnxSentenceEncoder(quantize=quantize)
+        classifier = OnnxTextClassifier(quantize=quantize)
+    return encoder, classifier
+
+
+def _measure(fn, requests: int) -> dict:
+    for text in SAMPLE_MESSAGES:  # warm-up
+        fn(text)
+    wall, cpu = [], []
+    for i in range(requests):
+        text = SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]
+        w0, c0 = time.perf_counter(), time.process_time()
+        fn(text)
+        wall.append((time.perf_counter() - w0) * 1000)
+        cpu.append((time.process_time() - c0) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(wall, 50)), 3),
+        "p95_ms": round(float(np.percentile(wall, 95)), 3),
+        "cpu_ms_per_request": round(float(np.mean(cpu)), 3),
+    }
+
+
+def run(backends: list[str], requests: int) -> dict:
+    report = {}
+    for backend in backends:
+        encoder, classifier = _load(backend)
+        report[backend] = {
+            "embedding": _measure(lambda t: encoder.encode([t]), requests),
+            "sentiment": _measure(lambda t: classifier([t], truncation=True), requests),
+        }
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"],
+                        choices=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.backends, args.requests)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+"""
+End-to-end load test of the FastAPI app, run in-process.
+
+The embedding model, sentiment classifier and LLM are replaced by fakes with
+configurable latency, the knowledge base by a synthetic one of `--articles`
+articles, and MongoDB is not used. Each endpoint is driven at a fixed
+concurrency; the report has throughput, p50/p95/p99 latency and a per-stage
+breakdown (embedding, vector/BM25 search, sentiment, escalation, context
+assembly, LLM) for every endpoint.
+
+    python -m benchmarks.load_benchmark --articles 2000 --requests 500 --concurrency 16 --output load.json
+    python -m benchmarks.load_benchmark --baseline load.json --max-regression 0.2
+
+With `--baseline`, exits non-zero when any endpoint's p95 latency or
+throughput is worse than the baseline by more than `--max-regression`.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import random
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+
+ENDPOINTS = ["chat_respond", "articles_search", "sentiment_batch", "escalation_predict"]
+
+_TOPICS = {
+    "billing": ["invoice", "charge", "refund", "payment", "card", "subscription", "receipt", "plan"],
+    "shipping": ["delivery", "tracking", "courier", "parcel", "address", "dispatch", "delay", "package"],
+    "account": ["password", "login", "email", "profile", "verification", "security", "username", "reset"],
+    "orders": ["order", "cancel", "return", "exchange", "item", "stock", "discount", "checkout"],
+    "technical": ["error", "crash", "update", "browser", "app", "sync", "install", "settings"],
+}
+_FILLER = ["the", "your", "please", "can", "will", "after", "before", "when", "our", "team", "within", "days",
+           "customers", "may", "need", "to", "check", "and", "then", "contact", "support", "if", "it", "is"]
+_MESSAGES = [
+    "Where is my {a}? It has been a week.",
+    "How do I change the {a} on my {b}?",
+    "I was charged twice and I want a refund right now, this is unacceptable.",
+    "Thanks, the {a} issue is solved!",
+    "Your {a} keeps failing and I am going to cancel my {b}. Let me speak to a manager.",
+    "Can you explain how {a} and {b} work?",
+]
+
+
+# ---------- Fake backends ----------
+def _sleep_ms(ms: float):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+class FakeEncoder:
+    """
+    Hashed bag-of-words embeddings (deterministic, so retrieval is meaningful)
+    with a simulated forward-pass cost.
+    """
+
+    def __init__(self, dim: int, batch_ms: float, item_ms: float):
+        self.dim = dim
+        self.batch_ms = batch_ms
+        self.item_ms = item_ms
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            h = zlib.crc32(word.strip(".,!?").encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, normalize_embeddings=False):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        _sleep_ms(self.batch_ms + self.item_ms * len(batch))
+        vectors = np.stack([self._embed(t) for t in batch]) if batch else np.empty((0, self.dim), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+class FakeClassifier:
+    """
+    Lexicon sentiment classifier with the transformers pipeline call signature.
+    """
+
+    _NEGATIVE = {"unacceptable", "failing", "cancel", "twice", "manager", "delay", "crash", "error"}
+
+    def __init__(self, batch_ms: float, item_ms: float):
+        self.batch_ms = batch_ms
+        self.item_ms = item_ms
+
+    def __call__(self, texts, batch_size=32, truncation=True):
+        _sleep_ms(self.batch_ms + self.item_ms * len(texts))
+        results = []
+        for text in texts:
+            hits = sum(word.strip(".,!?") in self._NEGATIVE for word in text.lower().split())
+            results.append({"label": "NEGATIVE", "score": min(0.99, 0.6 + 0.1 * hits)} if hits
+                           else {"label": "POSITIVE", "score": 0.8})
+        return results
+
+
+def install_fakes(args):
+    """
+    Points the model registry at the fake backends.
+    """
+    # The real loaders are registered when these modules are imported, so they are imported first.
+    import services.sentiment_service  # noqa: F401
+    import utils.embedding_utils  # noqa: F401
+    import utils.llm_utils  # noqa: F401
+    from utils.llm_client import FakeBackend, LLMClient
+    from utils.model_registry import registry
+
+    registry.register("embedding", lambda: FakeEncoder(settings.EMBEDDING_DIM, args.model_batch_ms, args.model_item_ms))
+    registry.register("sentiment", lambda: FakeClassifier(args.model_batch_ms, args.model_item_ms))
+    registry.register("llm_client", lambda: LLMClient(FakeBackend(latency_s=args.llm_latency_ms / 1000)), required=False)
+    registry.register("gemini", lambda: None, required=False)
+
+
+# ---------- Synthetic knowledge base ----------
+def synthetic_articles(n: int, words: int = 320, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    topics = list(_TOPICS)
+    articles = []
+    for i in range(n):
+        topic = topics[i % len(topics)]
+        vocabulary = _TOPICS[topic]
+        title = f"{topic.title()} help: {rng.choice(vocabulary)} {rng.choice(vocabulary)} #{i}"
+        body = " ".join(rng.choice(vocabulary) if rng.random() < 0.35 else rng.choice(_FILLER) for _ in range(words))
+        articles.append({"title": title, "content": body, "url": f"https://help.example.com/{topic}/{i}",
+                         "source": "synthetic", "tags": [topic]})
+    return articles
+
+
+def build_knowledge_base(n_articles: int, seed: int = 0) -> int:
+    """
+    Chunks and embeds a synthetic corpus straight into fresh in-memory
+    vector and BM25 indexes (nothing is written to disk or MongoDB).
+    Returns the number of chunks.
+    """
+    from utils import lexical_index, vector_db
+    from utils.chunking import chunk_articles
+    from utils.embedding_utils import encode_batch
+
+    chunks = [c for per_article in chunk_articles(synthetic_articles(n_articles, seed=seed),
+                                                  settings.CHUNK_SIZE_WORDS, settings.CHUNK_OVERLAP_WORDS)
+              for c in per_article]
+    index = vector_db.VectorIndex()
+    lexical = lexical_index.LexicalIndex()
+    for start in range(0, len(chunks), settings.INGEST_BATCH_SIZE):
+        batch = chunks[start:start + settings.INGEST_BATCH_SIZE]
+        index.upsert(
+            [c["id"] for c in batch],
+            encode_batch([c["embed_text"] for c in batch]),
+            [{k: c[k] for k in ("article_id", "title", "text", "url", "source", "tags")} for c in batch],
+        )
+        lexical.upsert([c["id"] for c in batch], [c["embed_text"] for c in batch])
+    vector_db._default_index = index
+    lexical_index._default_index = lexical
+    return len(chunks)
+
+
+def synthetic_messages(n: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    words = [w for vocabulary in _TOPICS.values() for w in vocabulary]
+    return [rng.choice(_MESSAGES).format(a=rng.choice(words), b=rng.choice(words)) + f" (ref {rng.randrange(10**6)})"
+            for _ in range(n)]
+
+
+# ---------- Measurement ----------
+def _percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    values = np.asarray(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+class StageTimer:
+    """
+    Wraps functions and methods in place to record how long each call takes,
+    grouped by stage name.
+    """
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self._patches: list[tuple[object, str, object]] = []
+
+    def wrap(self, owner, attr: str, stage: str):
+        original = getattr(owner, attr)
+        samples = self.samples.setdefault(stage, [])
+
+        if inspect.iscoroutinefunction(original):
+            async def timed(*a, **kw):
+                start = time.perf_counter()
+                try:
+                    return await original(*a, **kw)
+                finally:
+                    samples.append((time.perf_counter() - start) * 1000)
+        else:
+            def timed(*a, **kw):
+                start = time.perf_counter()
+                try:
+                    return original(*a, **kw)
+                finally:
+                    samples.append((time.perf_counter() - start) * 1000)
+
+        setattr(owner, attr, timed)
+        self._patches.append((owner, attr, original))
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+
+    def report(self) -> dict:
+        return {stage: _percentiles(samples) for stage, samples in self.samples.items() if samples}
+
+    def restore(self):
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches.clear()
+
+
+def instrument() -> StageTimer:
+    from services import chat_pipeline, escalation_service, rag_services, sentiment_service
+    from utils import embedding_utils, lexical_index, vector_db
+
+    timer = StageTimer()
+    timer.wrap(embedding_utils.embedding_scheduler, "infer", "embedding")
+    timer.wrap(vector_db.get_index(), "search", "vector_search")
+    timer.wrap(lexical_index.get_lexical_index(), "search", "bm25_search")
+    timer.wrap(chat_pipeline, "retrieve", "retrieval")
+    timer.wrap(sentiment_service, "analyze", "sentiment")
+    timer.wrap(sentiment_service, "batch_analyze", "sentiment_batch")
+    timer.wrap(escalation_service, "predict", "escalation")
+    timer.wrap(rag_services, "assemble_context", "context")
+    timer.wrap(rag_services, "generate_response_async", "llm")
+    return timer
+
+
+def _request_for(endpoint: str, i: int, messages: list[str], batch_size: int) -> tuple[str, str, dict]:
+    text = messages[i % len(messages)]
+    if endpoint == "chat_respond":
+        return "POST", "/chat/respond", {"json": {"text": text, "top_k": 5, "session_id": f"bench_{i % 64}"}}
+    if endpoint == "articles_search":
+        return "GET", "/articles/search", {"params": {"q": text, "top_k": 5}}
+    if endpoint == "sentiment_batch":
+        texts = [messages[(i * batch_size + j) % len(messages)] for j in range(batch_size)]
+        return "POST", "/sentiment/batch", {"json": {"texts": texts}}
+    return "POST", "/escalation/predict", {"json": {"text": text, "session_id": f"bench_{i % 64}"}}
+
+
+async def drive(client, endpoint: str, requests: int, concurrency: int, messages: list[str], batch_size: int,
+                offset: int = 0) -> dict:
+    """
+    Sends `requests` requests with `concurrency` in flight at all times.
+    """
+    latencies: list[float] = []
+    errors = 0
+    next_request = 0
+
+    async def worker():
+        nonlocal next_request, errors
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            method, url, kwargs = _request_for(endpoint, offset + i, messages, batch_size)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code == 200
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 2) if duration else 0.0,
+        "latency": _percentiles(latencies),
+    }
+
+
+async def _run(args) -> dict:
+    import httpx
+
+    from main import app
+
+    messages = synthetic_messages(args.messages, seed=args.seed + 1)
+    timer = instrument()
+    report = {}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for n, endpoint in enumerate(args.endpoints):
+                # Warm-up requests load the fakes and start the schedulers; they are not measured.
+                await drive(client, endpoint, args.warmup, args.concurrency, messages, args.batch_size,
+                            offset=args.requests + n * args.warmup)
+                timer.reset()
+                result = await drive(client, endpoint, args.requests, args.concurrency, messages, args.batch_size)
+                result["stages"] = timer.report()
+                report[endpoint] = result
+    finally:
+        timer.restore()
+    return report
+
+
+def run(args) -> dict:
+    """
+    Configures the app for an offline run, builds the knowledge base and
+    benchmarks each endpoint.
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    # Persistence and the answer cache are out of scope: every request should do the full work.
+    settings.SESSION_STORE_ENABLED = False
+    settings.ESCALATION_SESSION_PERSIST = False
+    settings.RESPONSE_CACHE_ENABLED = args.response_cache
+    settings.VECTOR_INDEX_PATH = ""
+    install_fakes(args)
+
+    start = time.perf_counter()
+    chunks = build_knowledge_base(args.articles, seed=args.seed)
+    build_s = time.perf_counter() - start
+
+    endpoints = asyncio.run(_run(args))
+    return {
+        "config": {
+            "articles": args.articles,
+            "chunks": chunks,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+            "model_batch_ms": args.model_batch_ms,
+            "model_item_ms": args.model_item_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "response_cache": args.response_cache,
+            "seed": args.seed,
+        },
+        "knowledge_base_build_s": round(build_s, 3),
+        "endpoints": endpoints,
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list[str]:
+    """
+    Regressions of `report` against `baseline`: endpoints whose p95 latency
+    grew, or whose throughput fell, by more than `max_regression` (a fraction).
+    """
+    regressions = []
+    for endpoint, result in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        p95, old_p95 = result["latency"].get("p95_ms"), before["latency"].get("p95_ms")
+        if p95 and old_p95 and p95 > old_p95 * (1 + max_regression):
+            regressions.append(f"{endpoint}: p95 {old_p95}ms -> {p95}ms")
+        rps, old_rps = result["throughput_rps"], before["throughput_rps"]
+        if old_rps and rps < old_rps * (1 - max_regression):
+            regressions.append(f"{endpoint}: throughput {old_rps} -> {rps} req/s")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument("--articles", type=int, default=1000, help="synthetic knowledge base size")
+    parser.add_argument("--requests", type=int, default=300, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--messages", type=int, default=500, help="distinct synthetic customer messages")
+    parser.add_argument("--batch-size", type=int, default=16, help="texts per /sentiment/batch request")
+    parser.add_argument("--model-batch-ms", type=float, default=5.0, help="fake model cost per forward pass")
+    parser.add_argument("--model-item-ms", type=float, default=0.5, help="fake model cost per input")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="fake LLM reply latency")
+    parser.add_argument("--response-cache", action="store_true", help="keep the answer cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.max_regression)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
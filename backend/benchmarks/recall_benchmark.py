@@ -0,0 +1,137 @@
+"""
+Recall benchmark for the compressed vector index modes.
+
+Compares recall@k of int8 / binary first-pass search (with full-precision
+rescoring) against exact float32 search, and reports resident memory and
+query latency of both. Exits non-zero if the recall drop exceeds the
+tolerance. Binary mode has no default rescore factor; use this benchmark to
+pick one for the corpus size.
+
+    python -m benchmarks.recall_benchmark --n 200000 --quantization int8
+    python -m benchmarks.recall_benchmark --index-path data/vector_index --quantization binary --rescore-factor 1000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from utils.vector_db import DEFAULT_RESCORE_FACTORS, VectorIndex
+
+
+def synthetic_embeddings(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """
+    Clustered unit vectors, which resemble sentence embeddings far better than
+    isotropic noise (real embeddings concentrate around topics).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure_recall(reference: VectorIndex, candidate: VectorIndex, queries: np.ndarray, k: int = 10) -> dict:
+    """
+    recall@k of `candidate` against `reference`, plus latency percentiles of
+    both (the reference latency is the exact-search cost being traded away).
+    """
+    recalls, exact_latencies, latencies = [], [], []
+    for q in queries:
+        start = time.perf_counter()
+        expected = {chunk_id for chunk_id, _ in reference.search(q, k)}
+        exact_latencies.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        got = {chunk_id for chunk_id, _ in candidate.search(q, k)}
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & got) / max(1, len(expected)))
+    return {
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "exact_p50_ms": round(float(np.percentile(exact_latencies, 50)), 3),
+        "exact_p95_ms": round(float(np.percentile(exact_latencies, 95)), 3),
+    }
+
+
+def run(args) -> dict:
+    if args.index_path:
+        reference = VectorIndex.load(args.index_path, quantization="none")
+        vectors = None
+    else:
+        vectors = synthetic_embeddings(args.n, args.dim, seed=args.seed)
+        reference = VectorIndex(dim=args.dim, exact_threshold=args.n + 1, quantization="none")
+        reference.upsert([str(i) for i in range(args.n)], vectors)
+
+    # The compressed index is saved and reloaded so that the rescoring rows come
+    # from a memory-mapped file, as they do in a serving worker.
+    with tempfile.TemporaryDirectory() as tmp:
+        reference.save(tmp)
+        candidate = VectorIndex.load(
+            tmp,
+            exact_threshold=reference.exact_threshold,
+            quantization=args.quantization,
+            rescore_factor=args.rescore_factor,
+        )
+        rng = np.random.default_rng(args.seed + 1)
+        rows = rng.choice(len(reference), size=min(args.queries, len(reference)), replace=False)
+        ids = candidate.ids()
+        base = np.stack(list(candidate.get_vectors([ids[r] for r in rows]).values()))
+        queries = base + 0.3 * rng.standard_normal(base.shape).astype(np.float32)
+
+        result = measure_recall(reference, candidate, queries, args.k)
+        memory = candidate.memory_bytes()
+
+    report = {
+        "n": len(reference),
+        "dim": reference.dim,
+        "quantization": args.quantization,
+        "rescore_factor": candidate.rescore_factor,
+        "k": args.k,
+        "compressed": result,
+        "recall_drop": round(1.0 - result["recall_at_k"], 4),
+        "tolerance": args.tolerance,
+        "resident_bytes_float32": memory["vectors"],
+        "resident_bytes_codes": memory["codes"],
+        "compression_ratio": round(memory["vectors"] / memory["codes"], 1) if memory["codes"] else 1.0,
+    }
+    report["passed"] = report["recall_drop"] <= args.tolerance
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100_000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=settings.EMBEDDING_DIM)
+    parser.add_argument("--index-path", help="benchmark a saved index instead of synthetic data")
+    parser.add_argument("--quantization", choices=["int8", "binary"], default="int8")
+    parser.add_argument("--rescore-factor", type=int, default=settings.VECTOR_RESCORE_FACTOR)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=settings.VECTOR_RECALL_TOLERANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    if not args.rescore_factor and args.quantization not in DEFAULT_RESCORE_FACTORS:
+        parser.error(f"--quantization {args.quantization} needs an explicit --rescore-factor")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["passed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load variables from the .env file into the environment
@@ -12,6 +13,164 @@ class Settings:
     # --- Gemini API Key ---
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY")
 
+    # --- MongoDB ---
+    MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+    DB_NAME: str = os.getenv("DB_NAME", "nerve_spark")
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "32"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "2000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000"))
+    MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "5000"))
+    # How long an operation waits for a free pooled connection.
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    # Threads that run blocking pymongo calls for async code (kept apart from inference).
+    MONGO_IO_THREADS: int = int(os.getenv("MONGO_IO_THREADS", "16"))
+
+    # --- LLM Client ---
+    # "gemini" (default) or "fake" for an offline backend.
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini")
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_TIMEOUT_S: float = float(os.getenv("LLM_TIMEOUT_S", "30"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+    # --- Vector Index ---
+    # Directory the in-process vector index is persisted to and memory-mapped from.
+    VECTOR_INDEX_PATH: str = os.getenv("VECTOR_INDEX_PATH", "data/vector_index")
+    EMBEDDING_DIM: int = int(os.getenv("EMBEDDING_DIM", "384"))
+    # Below this many chunks search is exact; above it an IVF index is trained.
+    VECTOR_EXACT_THRESHOLD: int = int(os.getenv("VECTOR_EXACT_THRESHOLD", "50000"))
+    # Clusters scanned per IVF query. At 400k x 384-dim rows on one shared core, 16 probes
+    # measured p95 4-10 ms (host-load dependent; 2-3x faster than scattered lists) at
+    # recall@10 0.98. 8 probes cost about a third of that at recall ~0.95.
+    VECTOR_IVF_NPROBE: int = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+    # "none" keeps float32 rows in RAM; "int8" (~4x smaller) or "binary" (~32x smaller)
+    # scans compact codes first and rescores top_k * VECTOR_RESCORE_FACTOR candidates.
+    VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "none")
+    # 0 uses the mode's default (10 for int8). Binary codes have no safe default: their
+    # recall falls as the corpus grows, so the factor must be set (and benchmarked) explicitly.
+    VECTOR_RESCORE_FACTOR: int = int(os.getenv("VECTOR_RESCORE_FACTOR", "0"))
+    # Maximum acceptable recall@10 drop versus exact search (checked by benchmarks/recall_benchmark.py).
+    VECTOR_RECALL_TOLERANCE: float = float(os.getenv("VECTOR_RECALL_TOLERANCE", "0.05"))
+    # Tombstoned rows are compacted away in the background once they exceed this fraction of the live rows.
+    VECTOR_COMPACT_TOMBSTONE_RATIO: float = float(os.getenv("VECTOR_COMPACT_TOMBSTONE_RATIO", "0.1"))
+
+    # --- Query Embedding Cache ---
+    # Query vectors kept in memory, keyed by normalised text (~1.5 KB each at 384 dims).
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    # Optional file of frequent queries (one per line) embedded at startup.
+    EMBEDDING_PRECOMPUTE_PATH: str = os.getenv("EMBEDDING_PRECOMPUTE_PATH", "")
+
+    # --- Hybrid Retrieval ---
+    # Each retriever fetches top_k * HYBRID_OVERFETCH candidates before RRF fusion.
+    HYBRID_OVERFETCH: int = int(os.getenv("HYBRID_OVERFETCH", "4"))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+
+    # --- Ingestion ---
+    CHUNK_SIZE_WORDS: int = int(os.getenv("CHUNK_SIZE_WORDS", "200"))
+    CHUNK_OVERLAP_WORDS: int = int(os.getenv("CHUNK_OVERLAP_WORDS", "40"))
+    # Number of chunks per SentenceTransformer.encode call / Mongo bulk_write.
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+    # --- Inference Backend ---
+    # "torch" (default) runs the PyTorch models; "onnx" exports them once and runs ONNX Runtime.
+    INFERENCE_BACKEND: str = os.getenv("INFERENCE_BACKEND", "torch")
+    ONNX_QUANTIZE: bool = os.getenv("ONNX_QUANTIZE", "false").lower() == "true"
+    ONNX_CACHE_DIR: str = os.getenv("ONNX_CACHE_DIR", "data/onnx")
+    ONNX_NUM_THREADS: int = int(os.getenv("ONNX_NUM_THREADS", "0"))
+
+    # --- Batch Sentiment ---
+    SENTIMENT_BATCH_SIZE: int = int(os.getenv("SENTIMENT_BATCH_SIZE", "64"))
+    # Characters kept per message before tokenization (the model reads at most 512 tokens).
+    SENTIMENT_MAX_CHARS: int = int(os.getenv("SENTIMENT_MAX_CHARS", "4096"))
+
+    # --- Memoized Sentiment / Escalation Results ---
+    RESULT_CACHE_SIZE: int = int(os.getenv("RESULT_CACHE_SIZE", "20000"))
+    # Optional SQLite file shared by all workers; empty disables the on-disk tier.
+    RESULT_CACHE_DISK_PATH: str = os.getenv("RESULT_CACHE_DISK_PATH", "")
+
+    # --- Escalation / Fallback Sentiment Rules ---
+    # Trigger phrases and weights; edits are picked up without a restart.
+    # Resolved against the backend directory, not the working directory.
+    RULES_PATH: str = str(Path(__file__).parent / os.getenv("RULES_PATH", "rules/default_rules.json"))
+    RULES_RELOAD_INTERVAL_S: float = float(os.getenv("RULES_RELOAD_INTERVAL_S", "5"))
+
+    # --- Feedback Aggregates ---
+    # The dashboard reads an in-memory snapshot that is refreshed at most this often.
+    FEEDBACK_STATS_SNAPSHOT_S: float = float(os.getenv("FEEDBACK_STATS_SNAPSHOT_S", "5"))
+
+    # --- Per-Session Escalation State ---
+    ESCALATION_SESSION_MAX: int = int(os.getenv("ESCALATION_SESSION_MAX", "50000"))
+    # Idle sessions are dropped from memory after this long.
+    ESCALATION_SESSION_TTL_S: float = float(os.getenv("ESCALATION_SESSION_TTL_S", "3600"))
+    # Smoothing factor of the rolling negativity score (higher reacts faster).
+    ESCALATION_SENTIMENT_ALPHA: float = float(os.getenv("ESCALATION_SENTIMENT_ALPHA", "0.4"))
+    # Write session state through to Mongo so it survives restarts and is shared by workers.
+    ESCALATION_SESSION_PERSIST: bool = os.getenv("ESCALATION_SESSION_PERSIST", "false").lower() == "true"
+
+    # --- Chat Transcript Store (write-behind) ---
+    SESSION_STORE_ENABLED: bool = os.getenv("SESSION_STORE_ENABLED", "true").lower() == "true"
+    SESSION_QUEUE_MAX: int = int(os.getenv("SESSION_QUEUE_MAX", "10000"))
+    SESSION_FLUSH_BATCH: int = int(os.getenv("SESSION_FLUSH_BATCH", "200"))
+    SESSION_FLUSH_INTERVAL_MS: float = float(os.getenv("SESSION_FLUSH_INTERVAL_MS", "250"))
+    # How long a request waits for queue space before its turn is dropped.
+    SESSION_ENQUEUE_TIMEOUT_MS: float = float(os.getenv("SESSION_ENQUEUE_TIMEOUT_MS", "50"))
+    # Turns kept per session document (oldest are trimmed); a turn with its sources is a few KB.
+    SESSION_MAX_TURNS: int = int(os.getenv("SESSION_MAX_TURNS", "500"))
+
+    # --- Inference Micro-Batching ---
+    # Concurrent embedding / sentiment calls are grouped into one forward pass.
+    INFERENCE_MAX_BATCH_SIZE: int = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "32"))
+    INFERENCE_MAX_WAIT_MS: float = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+    # --- Chat Pipeline Deadlines ---
+    # A stage that misses its deadline is skipped and replaced by a neutral fallback.
+    STAGE_DEADLINE_RETRIEVAL_MS: float = float(os.getenv("STAGE_DEADLINE_RETRIEVAL_MS", "1500"))
+    STAGE_DEADLINE_SENTIMENT_MS: float = float(os.getenv("STAGE_DEADLINE_SENTIMENT_MS", "500"))
+    STAGE_DEADLINE_ESCALATION_MS: float = float(os.getenv("STAGE_DEADLINE_ESCALATION_MS", "300"))
+
+    # --- Cross-Encoder Reranking ---
+    RERANK_ENABLED: bool = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+    # Retrieval fetches top_k * RERANK_OVERFETCH candidates for the reranker.
+    RERANK_OVERFETCH: int = int(os.getenv("RERANK_OVERFETCH", "4"))
+    # Candidates whose cosine and BM25 scores are both below this fraction of the best skip the cross-encoder.
+    RERANK_MIN_RELATIVE_SCORE: float = float(os.getenv("RERANK_MIN_RELATIVE_SCORE", "0.35"))
+    RERANK_MAX_CANDIDATES: int = int(os.getenv("RERANK_MAX_CANDIDATES", "24"))
+    # Past this, the retrieval order is used for the request.
+    RERANK_BUDGET_MS: float = float(os.getenv("RERANK_BUDGET_MS", "250"))
+
+    # --- Prompt Context Assembly ---
+    # Upper bound on the (estimated) tokens of retrieved context put into a prompt.
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    # Chunks whose embeddings are at least this similar to an included one are skipped.
+    CONTEXT_DEDUP_THRESHOLD: float = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.95"))
+    # Adaptive top_k: drop chunks whose cosine and BM25 scores are both below this fraction of the best (0 disables).
+    CONTEXT_RELATIVE_SCORE_FLOOR: float = float(os.getenv("CONTEXT_RELATIVE_SCORE_FLOOR", "0.4"))
+    CONTEXT_MIN_SOURCES: int = int(os.getenv("CONTEXT_MIN_SOURCES", "2"))
+
+    # --- Response Cache ---
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+    RESPONSE_CACHE_TTL_S: float = float(os.getenv("RESPONSE_CACHE_TTL_S", "3600"))
+    # Minimum cosine similarity for a paraphrased query to reuse a cached answer.
+    RESPONSE_CACHE_SIM_THRESHOLD: float = float(os.getenv("RESPONSE_CACHE_SIM_THRESHOLD", "0.95"))
+
+    # --- Multi-Worker Serving (gunicorn_conf.py) ---
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "2"))
+    # Load the torch models and the vector index once in the master and fork workers afterwards.
+    SHARED_PRELOAD: bool = os.getenv("SHARED_PRELOAD", "true").lower() == "true"
+
+    # --- Startup ---
+    # Load models in the background at startup instead of on the first request.
+    WARMUP_MODELS: bool = os.getenv("WARMUP_MODELS", "true").lower() == "true"
+    # A model that failed to load is retried after this delay, doubling per failure up to the maximum.
+    MODEL_RETRY_BACKOFF_S: float = float(os.getenv("MODEL_RETRY_BACKOFF_S", "5"))
+    MODEL_RETRY_MAX_BACKOFF_S: float = float(os.getenv("MODEL_RETRY_MAX_BACKOFF_S", "300"))
+
+    # --- Observability ---
+    # Requests slower than this are logged with their per-stage spans (0 disables).
+    TRACE_SLOW_REQUEST_MS: float = float(os.getenv("TRACE_SLOW_REQUEST_MS", "2000"))
+
     # You can add other settings here as your app grows
     # MONGODB_URI: str = os.getenv("MONGODB_URI")
 
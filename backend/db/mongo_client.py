@@ -1,13 +1,109 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
 from pymongo import MongoClient
-import os
+from pymongo.database import Database
+
+from config import settings
+
+# --- Mongo access layer ---
+# pymongo is synchronous, so async code never calls it directly: `run()`
+# executes the call on a dedicated, bounded thread pool. DB I/O therefore never
+# blocks the event loop and does not compete with model inference for the
+# default executor. The client owns the connection pool (sized and timed out
+# from settings); it is created on first use or by `connect()` at startup and
+# closed by `close()` at shutdown. Tests can swap in mongomock with `set_client`.
+
+MONGO_URI = settings.MONGO_URI
+DB_NAME = settings.DB_NAME
+
+_client: Any = None
+_executor: ThreadPoolExecutor | None = None
+_lock = threading.Lock()
+
+
+def _create_client() -> MongoClient:
+    return MongoClient(
+        MONGO_URI,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+        waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    )
+
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                # Constructing the client does not connect; that happens on the first operation.
+                _client = _create_client()
+    return _client
+
+
+def set_client(client: Any):
+    """
+    Replaces the client, e.g. with `mongomock.MongoClient()` in tests.
+    """
+    global _client
+    with _lock:
+        _client = client
+
+
+def get_db() -> Database:
+    return get_client()[DB_NAME]
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.MONGO_IO_THREADS, thread_name_prefix="mongo-io")
+    return _executor
+
+
+async def run(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Runs a blocking pymongo call on the Mongo I/O threads.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(fn, *args, **kwargs))
+
 
-# MongoDB connection details (use env vars or defaults)
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
-DB_NAME = os.getenv("DB_NAME", "nerve_spark")
+async def connect(ensure_indexes: list[Callable] | None = None) -> bool:
+    """
+    Startup hook: checks the server is reachable and creates indexes.
+    An unreachable server is logged, not fatal; operations fail individually.
+    """
+    try:
+        await run(get_db().command, "ping")
+        for ensure in ensure_indexes or []:
+            await ensure()
+        logging.info(f"[Mongo] Connected to '{DB_NAME}'.")
+        return True
+    except Exception as e:
+        logging.warning(f"[Mongo] Database not reachable at startup: {e}")
+        return False
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
 
-# Collections
-knowledge_base_collection = db["knowledge_base"]
+async def close():
+    """
+    Shutdown hook: closes the connection pool and the I/O threads.
+    """
+    global _client, _executor
+    with _lock:
+        client, executor = _client, _executor
+        _client, _executor = None, None
+    # In-flight queries finish before the pool closes; both block, so they run off the loop.
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown, True)
+    if client is not None:
+        await asyncio.to_thread(client.close)
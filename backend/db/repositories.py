@@ -0,0 +1,229 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Callable
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateOne
+from pymongo.database import Database
+
+from config import settings
+from db import mongo_client
+from db.schemas import ChatSessionDoc, ChatTurnDoc, FeedbackDoc, KnowledgeChunkDoc
+
+# --- Typed repositories ---
+# Each repository owns one collection and exposes async methods; the pymongo
+# calls run on the Mongo I/O threads (see mongo_client.run). The database is
+# resolved on every call through `db_provider`, so a client swapped in at
+# startup or in tests is picked up everywhere.
+
+
+class _Repository:
+    collection_name = ""
+
+    def __init__(self, db_provider: Callable[[], Database] = mongo_client.get_db):
+        self._db_provider = db_provider
+
+    @property
+    def collection(self):
+        return self._db_provider()[self.collection_name]
+
+    async def ensure_indexes(self):
+        pass
+
+
+class KnowledgeBaseRepository(_Repository):
+    collection_name = "knowledge_base"
+
+    async def ensure_indexes(self):
+        await mongo_client.run(self.collection.create_index, [("article_id", ASCENDING)])
+
+    async def upsert_chunks(self, chunks: list[dict], ingested_at: datetime | None = None) -> int:
+        """
+        Replaces chunk documents by id in one unordered bulk write.
+        """
+        if not chunks:
+            return 0
+        ingested_at = ingested_at or datetime.utcnow()
+        ops = [
+            ReplaceOne(
+                {"_id": c["id"]},
+                {**{k: v for k, v in c.items() if k not in ("id", "embed_text")}, "_id": c["id"], "ingested_at": ingested_at},
+                upsert=True,
+            )
+            for c in chunks
+        ]
+        await mongo_client.run(self.collection.bulk_write, ops, ordered=False)
+        return len(ops)
+
+    async def delete_chunks(self, ids: list[str]) -> int:
+        if not ids:
+            return 0
+        result = await mongo_client.run(self.collection.delete_many, {"_id": {"$in": list(ids)}})
+        return result.deleted_count
+
+    async def get_chunks(self, ids: list[str]) -> list[KnowledgeChunkDoc]:
+        return await mongo_client.run(lambda: list(self.collection.find({"_id": {"$in": list(ids)}})))
+
+    async def count(self) -> int:
+        return await mongo_client.run(self.collection.count_documents, {})
+
+
+class FeedbackRepository(_Repository):
+    collection_name = "feedback"
+
+    async def ensure_indexes(self):
+        await mongo_client.run(self.collection.create_index, [("session_id", ASCENDING)])
+        await mongo_client.run(self.collection.create_index, [("created_at", DESCENDING)])
+
+    async def add(self, doc: FeedbackDoc) -> str:
+        result = await mongo_client.run(self.collection.insert_one, dict(doc))
+        return str(result.inserted_id)
+
+    async def count(self) -> int:
+        return await mongo_client.run(self.collection.count_documents, {})
+
+    async def average_rating(self) -> float:
+        pipeline = [{"$group": {"_id": None, "avg": {"$avg": "$rating"}}}]
+        rows = await mongo_client.run(lambda: list(self.collection.aggregate(pipeline)))
+        return float(rows[0]["avg"]) if rows and rows[0]["avg"] is not None else 0.0
+
+    async def recent(self, limit: int = 10) -> list[FeedbackDoc]:
+        return await mongo_client.run(
+            lambda: list(self.collection.find({}, {"_id": 0}).sort("created_at", DESCENDING).limit(limit))
+        )
+
+    async def rating_histogram(self) -> dict[int, int]:
+        pipeline = [{"$group": {"_id": "$rating", "count": {"$sum": 1}}}]
+        rows = await mongo_client.run(lambda: list(self.collection.aggregate(pipeline)))
+        return {int(row["_id"]): row["count"] for row in rows if row["_id"] is not None}
+
+    async def since(self, start: datetime) -> list[FeedbackDoc]:
+        return await mongo_client.run(
+            lambda: list(self.collection.find({"created_at": {"$gte": start}}, {"_id": 0, "rating": 1, "created_at": 1}))
+        )
+
+
+class FeedbackStatsRepository(_Repository):
+    """
+    Precomputed feedback aggregates: one running-totals document plus one
+    bucket document per hour (dropped by a TTL index once out of every window).
+    """
+
+    collection_name = "feedback_stats"
+    TOTALS_ID = "totals"
+
+    @staticmethod
+    def _create_indexes(collection):
+        collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+    async def ensure_indexes(self):
+        await mongo_client.run(self._create_indexes, self.collection)
+
+    async def record(self, rating: int, bucket: dict[str, Any], recent_size: int):
+        """
+        Adds one rating to the running totals and to its hour bucket. Each
+        update is a single atomic $inc on one document.
+        """
+        inc = {"count": 1, "rating_sum": rating, f"histogram.{rating}": 1}
+        totals = mongo_client.run(
+            self.collection.update_one,
+            {"_id": self.TOTALS_ID},
+            {"$inc": inc, "$push": {"recent": {"$each": [rating], "$slice": -recent_size}}},
+            upsert=True,
+        )
+        hourly = mongo_client.run(
+            self.collection.update_one,
+            {"_id": bucket["_id"]},
+            {"$inc": inc, "$setOnInsert": {"start": bucket["start"], "expires_at": bucket["expires_at"]}},
+            upsert=True,
+        )
+        await asyncio.gather(totals, hourly)
+
+    async def get_many(self, ids: list[str]) -> list[dict[str, Any]]:
+        return await mongo_client.run(lambda: list(self.collection.find({"_id": {"$in": list(ids)}})))
+
+    async def replace_all(self, docs: list[dict[str, Any]]):
+        """
+        Swaps in a new set of documents: they are written to a staging
+        collection that is then renamed over this one, so readers never see
+        the aggregates empty or half-written.
+        """
+        staging = self._db_provider()[f"{self.collection_name}_rebuild"]
+
+        def swap():
+            staging.drop()
+            self._create_indexes(staging)
+            if docs:
+                staging.insert_many(docs)
+            staging.rename(self.collection_name, dropTarget=True)
+
+        await mongo_client.run(swap)
+
+
+class SessionRepository(_Repository):
+    collection_name = "chat_sessions"
+
+    async def ensure_indexes(self):
+        await mongo_client.run(self.collection.create_index, [("session_id", ASCENDING)], unique=True)
+        await mongo_client.run(self.collection.create_index, [("customer_id", ASCENDING), ("updated_at", DESCENDING)])
+
+    async def append_turns(
+        self, sessions: dict[str, tuple[str | None, list[ChatTurnDoc]]], max_turns: int = settings.SESSION_MAX_TURNS
+    ) -> int:
+        """
+        Appends turns to many sessions at once: one upsert per session,
+        all in a single unordered bulk write. Only the latest `max_turns`
+        turns are kept, so long sessions stay far below Mongo's 16 MB
+        document limit; `turn_count` still counts every turn.
+        """
+        ops = []
+        for session_id, (customer_id, turns) in sessions.items():
+            last = turns[-1]
+            ops.append(UpdateOne(
+                {"session_id": session_id},
+                {
+                    "$push": {"turns": {"$each": turns, "$slice": -max_turns}},
+                    "$inc": {"turn_count": len(turns)},
+                    "$set": {
+                        "updated_at": last["created_at"],
+                        "last_sentiment": last.get("sentiment"),
+                        "last_escalation": last.get("escalation"),
+                    },
+                    "$setOnInsert": {"customer_id": customer_id, "created_at": turns[0]["created_at"]},
+                },
+                upsert=True,
+            ))
+        if ops:
+            await mongo_client.run(self.collection.bulk_write, ops, ordered=False)
+        return len(ops)
+
+    async def get(self, session_id: str) -> ChatSessionDoc | None:
+        return await mongo_client.run(self.collection.find_one, {"session_id": session_id}, {"_id": 0})
+
+    async def set_satisfaction(self, session_id: str, rating: int, comment: str | None) -> bool:
+        result = await mongo_client.run(
+            self.collection.update_one,
+            {"session_id": session_id},
+            {"$set": {"satisfaction_score": rating, "satisfaction_comment": comment}},
+        )
+        return result.matched_count > 0
+
+
+class EscalationStateRepository(_Repository):
+    collection_name = "escalation_sessions"
+
+    async def get(self, session_id: str) -> dict[str, Any] | None:
+        return await mongo_client.run(self.collection.find_one, {"_id": session_id})
+
+    async def save(self, doc: dict[str, Any]):
+        await mongo_client.run(self.collection.replace_one, {"_id": doc["_id"]}, doc, upsert=True)
+
+
+knowledge_base = KnowledgeBaseRepository()
+feedback = FeedbackRepository()
+feedback_stats = FeedbackStatsRepository()
+sessions = SessionRepository()
+escalation_states = EscalationStateRepository()
+
+
+def all_repositories() -> list[_Repository]:
+    return [knowledge_base, feedback, feedback_stats, sessions, escalation_states]
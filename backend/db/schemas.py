@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Any, Optional, TypedDict
+
+# --- Document shapes of the Mongo collections ---
+
+
+class KnowledgeChunkDoc(TypedDict, total=False):
+    _id: str  # "{article_id}:{chunk_index}"
+    article_id: str
+    chunk_index: int
+    title: str
+    text: str
+    url: Optional[str]
+    source: Optional[str]
+    tags: list[str]
+    content_hash: str  # sha1 of the embedded text (title + chunk)
+    model_version: str  # embedding model the chunk's vector came from
+    ingested_at: datetime
+
+
+class FeedbackDoc(TypedDict, total=False):
+    session_id: str
+    rating: int
+    comment: Optional[str]
+    metadata: dict[str, Any]
+    created_at: datetime
+
+
+class ChatTurnDoc(TypedDict, total=False):
+    query: str
+    sources: list[dict[str, Any]]
+    sentiment: Optional[dict[str, Any]]
+    escalation: Optional[dict[str, Any]]
+    reply: str
+    metadata: dict[str, Any]
+    created_at: datetime
+
+
+class ChatSessionDoc(TypedDict, total=False):
+    session_id: str
+    customer_id: Optional[str]
+    turns: list[ChatTurnDoc]
+    turn_count: int
+    last_sentiment: Optional[dict[str, Any]]
+    last_escalation: Optional[dict[str, Any]]
+    satisfaction_score: int
+    satisfaction_comment: Optional[str]
+    created_at: datetime
+    updated_at: datetime
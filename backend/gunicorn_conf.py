@@ -0,0 +1,30 @@
+# Gunicorn configuration for serving the FastAPI app with shared models.
+#
+#   gunicorn -c gunicorn_conf.py main:app
+#
+# `preload_app` imports the app (and loads the torch models + vector index)
+# once in the master; workers are forked afterwards and share that memory
+# copy-on-write instead of each loading its own copy. Clients that are not
+# fork-safe (LLM, Gemini, ONNX sessions) are built in each worker.
+import os
+
+from config import settings
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = settings.WEB_CONCURRENCY
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = settings.SHARED_PRELOAD
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+
+
+def on_starting(server):
+    if preload_app:
+        from utils import shared_serving
+
+        shared_serving.preload()
+
+
+def post_fork(server, worker):
+    from utils import shared_serving
+
+    shared_serving.post_fork(workers)
@@ -139,22 +139,84 @@
 
   #////////////////////////-------------------------3333333333333333333333333333333
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import the centralized settings from your new config.py file
 from config import settings
+from utils.model_registry import registry
+from services.chat_session_store import chat_session_store
+from utils.embedding_utils import precompute_queries
+from utils.lexical_index import get_lexical_index
+from utils.metrics import metrics
+from utils.rule_engine import get_engine
+from utils.tracing import RequestContextMiddleware, RequestIdFilter
+from db import mongo_client, repositories
 
 # --- Configure Logging ---
-# This helps in seeing detailed logs in your terminal
-logging.basicConfig(level=logging.INFO)
+# This helps in seeing detailed logs in your terminal. Each line carries the
+# id of the request it was logged for.
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:[%(request_id)s] %(message)s")
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(RequestIdFilter())
 logger = logging.getLogger(__name__)
 
+
+def _warm_up():
+    registry.warm_up()
+    if settings.EMBEDDING_PRECOMPUTE_PATH:
+        try:
+            precompute_queries(settings.EMBEDDING_PRECOMPUTE_PATH)
+        except Exception as e:
+            logger.error(f"Failed to precompute query embeddings: {e}", exc_info=True)
+
+
+def _build_lexical_index():
+    try:
+        get_lexical_index()
+    except Exception as e:
+        logger.error(f"Failed to build the BM25 index: {e}", exc_info=True)
+
+
+# --- Lifespan: model warm-up ---
+# Models load lazily. With WARMUP_MODELS they are loaded in a background thread
+# right after startup, so the liveness probe passes immediately and the
+# readiness probe flips once the required models are in memory.
+# The BM25 index is rebuilt from the vector payloads in a thread as well, so
+# the first search does not pay for it (a no-op when gunicorn preloaded it).
+# The Mongo check and index creation also run in the background, so an
+# unreachable database does not delay startup. The chat transcript writer runs
+# for the app's lifetime and drains its queue before the Mongo pool is closed.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup_task = None
+    if settings.WARMUP_MODELS:
+        warmup_task = asyncio.create_task(asyncio.to_thread(_warm_up))
+    lexical_task = asyncio.create_task(asyncio.to_thread(_build_lexical_index))
+    mongo_task = asyncio.create_task(
+        mongo_client.connect([repo.ensure_indexes for repo in repositories.all_repositories()])
+    )
+    chat_session_store.start()
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if not lexical_task.done():
+        lexical_task.cancel()
+    if not mongo_task.done():
+        mongo_task.cancel()
+    await chat_session_store.stop()
+    await mongo_client.close()
+
+
 # --- FastAPI App Initialization ---
 app = FastAPI(
     title="Customer Support RAG API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # --- CRITICAL: Verify CORS Origins ---
@@ -171,13 +233,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods (GET, POST, OPTIONS, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+# Added last so that it wraps CORS too and every response carries its request id.
+app.add_middleware(RequestContextMiddleware)
 
 # --- Health and Root Endpoints ---
 @app.get("/", tags=["System"])
 def root():
     return {"status": "ok", "service": "customer-support-rag"}
 
+
+@app.get("/health/live", tags=["System"])
+def live():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["System"])
+def ready():
+    """Readiness: 200 once every required model and at least one rule is loaded, 503 before."""
+    registry.retry_due()
+    status = registry.status()
+    status["rules_loaded"] = len(get_engine().rules())
+    status["ready"] = status["ready"] and status["rules_loaded"] > 0
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.get("/health/startup", tags=["System"])
+def startup_report():
+    """Per-model load times and time from process start to ready."""
+    return registry.status()
+
+
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def prometheus_metrics():
+    """Counters and histograms of this worker process, in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # --- API Router Includes ---
 # We import the routers here to ensure the app is configured first
 try:
@@ -9,7 +9,7 @@ router = APIRouter()
 # --- Optional service imports (graceful fallback if missing) ---
 _article_service = None
 try:
-    from app.services import article_service as _article_service  # type: ignore
+    from services import article_service as _article_service  # type: ignore
 except Exception:
     _article_service = None
 
@@ -44,15 +44,20 @@ class SearchResponse(BaseModel):
 
 # ---------- Routes ----------
 @router.post("/ingest", response_model=IngestResponse)
-async def ingest_articles(payload: List[ArticleIn]):
+async def ingest_articles(
+    payload: List[ArticleIn],
+    sync: bool = Query(False, description="Also remove indexed articles of the same sources that are not in this batch"),
+):
     """
     Ingest raw help articles. If a service is present, it will:
-      1) chunk -> embed -> upsert to vector DB
+      1) chunk -> embed new or changed chunks -> upsert to vector DB
       2) store raw docs/meta in Mongo (optional)
+    Unchanged chunks are not re-embedded, so re-sending a whole help center
+    only costs the articles that changed.
     Fallback: return a mock success without doing anything.
     """
     if _article_service and hasattr(_article_service, "ingest_articles"):
-        count, details = await _article_service.ingest_articles([a.dict() for a in payload])  # type: ignore
+        count, details = await _article_service.ingest_articles([a.dict() for a in payload], sync=sync)  # type: ignore
         return IngestResponse(ingested=count, details=details)
 
     # Fallback
@@ -107,3 +112,16 @@ async def get_article(doc_id: str):
     if doc_id == "fallback_1":
         return {"id": doc_id, "title": "Fallback Doc", "content": "No DB connected.", "metadata": {}}
     raise HTTPException(status_code=404, detail="Article not found (fallback)")
+
+
+@router.delete("/{doc_id}")
+async def delete_article(doc_id: str):
+    """
+    Remove an article's chunks from search (tombstoned, compacted in the background).
+    """
+    if _article_service and hasattr(_article_service, "delete_articles"):
+        removed = await _article_service.delete_articles([doc_id])  # type: ignore
+        if not removed:
+            raise HTTPException(status_code=404, detail="Article not found")
+        return {"id": doc_id, "chunks_removed": removed}
+    raise HTTPException(status_code=404, detail="Article not found (fallback)")
@@ -1,11 +1,19 @@
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from datetime import datetime
+import json
 import logging
+import time
+import uuid
 
 # --- Service Imports ---
-from services import rag_services, sentiment_service, escalation_service, article_service
+from services import rag_services, chat_pipeline
+from services.response_cache import response_cache
+from services.chat_session_store import chat_session_store
+from utils.context_builder import context_builder
 from db import mongo_client
 
 router = APIRouter()
@@ -36,33 +44,51 @@ class ChatResponse(BaseModel):
     escalation: Optional[dict] = None
     sources: List[Source] = []
     created_at: datetime
+    timings_ms: Optional[dict] = None
+
+
+def _turn(payload: MessageIn, sources: List[Source], sentiment, escalation, reply: str, created_at: datetime) -> dict:
+    """
+    One transcript entry for the chat session store.
+    """
+    return {
+        "query": payload.text,
+        "sources": [{"id": s.id, "title": s.title, "score": s.score} for s in sources],
+        "sentiment": sentiment,
+        "escalation": escalation,
+        "reply": reply,
+        "metadata": payload.metadata or {},
+        "created_at": created_at,
+    }
 
 
 # ---------- Routes ----------
 @router.post("/respond", response_model=ChatResponse)
 async def respond(payload: MessageIn):
-    session_id = payload.session_id or f"sess_{datetime.utcnow().timestamp()}"
+    session_id = payload.session_id or f"sess_{uuid.uuid4().hex}"
     created_at = datetime.utcnow()
 
     try:
-        # --- THIS IS OUR TEST ---
-        # We will look for this exact message in the terminal.
-        print("--- RUNNING THE NEW VERSION OF CHAT.PY ---")
-        
-        # This is the line with the 'await' fix.
-        chunks = await article_service.search_articles(payload.text, payload.top_k)
-        results = [Source(**chunk) for chunk in chunks]
-
-        # (The rest of the function is the same)
-        sentiment = await sentiment_service.analyze(payload.text)
-        escalation = await escalation_service.predict(payload.text)
+        # Retrieval, sentiment and escalation run concurrently with per-stage deadlines.
+        stages = await chat_pipeline.prepare_chat(payload.text, payload.top_k, session_id=session_id)
+        results = [Source(**chunk) for chunk in stages["retrieval"]]
+        sentiment = stages["sentiment"]
+        escalation = stages["escalation"]
+
+        llm_start = time.perf_counter()
         reply_text = await rag_services.generate_answer(
             query=payload.text,
-            sources=[s.dict() for s in results],
+            sources=stages["retrieval"],
             sentiment=sentiment,
             tone=payload.preferred_tone
         )
-        
+        timings = dict(stages.timings_ms, llm=round((time.perf_counter() - llm_start) * 1000, 2))
+
+        # Persisted by the write-behind store; this only enqueues the turn.
+        await chat_session_store.record_turn(
+            session_id, _turn(payload, results, sentiment, escalation, reply_text, created_at), payload.customer_id
+        )
+
         return ChatResponse(
             session_id=session_id,
             reply=reply_text,
@@ -70,9 +96,93 @@ async def respond(payload: MessageIn):
             escalation=escalation,
             sources=results,
             created_at=created_at,
+            timings_ms=timings,
         )
 
     except Exception as e:
         logging.error(f"An exception occurred in /chat/respond: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="An internal server error occurred.")
 
+
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Hit/miss metrics for the answer cache.
+    """
+    return response_cache.stats()
+
+
+@router.get("/context")
+async def context_stats():
+    """
+    Prompt context sizes: tokens sent vs. the unbudgeted total, and what was dropped.
+    """
+    return context_builder.stats()
+
+
+@router.get("/sessions/stats")
+async def session_store_stats():
+    """
+    Queue depth and write counters of the transcript store.
+    """
+    return chat_session_store.stats()
+
+
+def _sse(event: str, data: dict) -> str:
+    """
+    Formats one server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/stream")
+async def stream(payload: MessageIn):
+    """
+    Server-sent-events variant of /respond. Emits a `meta` event with the
+    sources, sentiment and escalation as soon as they are known, then one
+    `token` event per LLM fragment, and finally a `done` event with the full reply.
+    """
+    session_id = payload.session_id or f"sess_{uuid.uuid4().hex}"
+    created_at = datetime.utcnow()
+
+    try:
+        stages = await chat_pipeline.prepare_chat(payload.text, payload.top_k, session_id=session_id)
+        results = [Source(**chunk) for chunk in stages["retrieval"]]
+        sentiment = stages["sentiment"]
+        escalation = stages["escalation"]
+    except Exception as e:
+        logging.error(f"An exception occurred in /chat/stream: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+    async def events():
+        yield _sse("meta", {
+            "session_id": session_id,
+            "sources": [s.dict() for s in results],
+            "sentiment": sentiment,
+            "escalation": escalation,
+            "created_at": created_at,
+            "timings_ms": stages.timings_ms,
+        })
+        reply_parts = []
+        async for fragment in rag_services.stream_answer(
+            query=payload.text,
+            sources=stages["retrieval"],
+            sentiment=sentiment,
+            tone=payload.preferred_tone
+        ):
+            reply_parts.append(fragment)
+            yield _sse("token", {"text": fragment})
+        reply_text = "".join(reply_parts)
+        await chat_session_store.record_turn(
+            session_id, _turn(payload, results, sentiment, escalation, reply_text, created_at), payload.customer_id
+        )
+        yield _sse("done", {"session_id": session_id, "reply": reply_text})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies (e.g. nginx) from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -3,32 +3,29 @@ from typing import List, Optional
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from utils.rule_engine import get_engine, score_escalation
+
 router = APIRouter()
 
 # --- Optional service import ---
 _escalation = None
 try:
-    from app.services import escalation_service as _escalation  # type: ignore
+    from services import escalation_service as _escalation  # type: ignore
 except Exception:
     _escalation = None
 
-# --- Simple rules for fallback ---
-_DEFAULT_RULES = [
-    "refund", "chargeback", "legal", "lawsuit",
-    "complaint", "escalate", "supervisor", "manager",
-    "cancel my account", "switch provider"
-]
-
 
 class EscalationIn(BaseModel):
     text: str
     history: Optional[List[str]] = None
+    session_id: Optional[str] = None
 
 
 class EscalationOut(BaseModel):
     predicted: bool
     score: float
     reasons: List[str]
+    session: Optional[dict] = None
 
 
 @router.get("/rules", response_model=List[str])
@@ -41,7 +38,15 @@ async def rules():
             return await _escalation.rules()  # type: ignore
         except Exception:
             pass
-    return _DEFAULT_RULES
+    return [rule.phrase for rule in get_engine().rules("escalation")]
+
+
+@router.post("/rules/reload")
+async def reload_rules():
+    """
+    Re-reads the rules file now instead of waiting for the change check.
+    """
+    return {"rules": get_engine().reload()}
 
 
 @router.post("/predict", response_model=EscalationOut)
@@ -50,12 +55,8 @@ async def predict(payload: EscalationIn):
     Predict whether a message (optionally with history) should be escalated.
     """
     if _escalation and hasattr(_escalation, "predict"):
-        return await _escalation.predict(payload.text, payload.history)  # type: ignore
-
-    # Fallback: keyword match
-    txt = payload.text.lower()
-    hits = [k for k in _DEFAULT_RULES if k in txt]
-    score = 0.0
-    if hits:
-        score = 0.85 + 0.03 * min(5, len(hits))
-    return EscalationOut(predicted=score >= 0.88, score=round(score, 2), reasons=hits)
+        return await _escalation.predict(payload.text, payload.history, payload.session_id)  # type: ignore
+
+    # Fallback: compiled rule match
+    engine = get_engine()
+    return EscalationOut(**score_escalation(engine.match(payload.text), engine.options["escalation_threshold"]))
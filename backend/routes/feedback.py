@@ -3,15 +3,20 @@ from typing import Optional, Dict, Any
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field, conint
 from datetime import datetime
+import asyncio
+import logging
 
 router = APIRouter()
 
 # --- Optional DB import ---
-_db = None
+_repos = None
+_stats = None
 try:
-    from app.db import mongo_client as _db  # type: ignore
+    from db import repositories as _repos  # type: ignore
+    from services.feedback_stats import feedback_aggregates as _stats  # type: ignore
 except Exception:
-    _db = None
+    _repos = None
+    _stats = None
 
 
 class FeedbackIn(BaseModel):
@@ -27,10 +32,18 @@ class FeedbackOut(BaseModel):
     stored_at: datetime
 
 
+class FeedbackWindow(BaseModel):
+    count: int
+    average_rating: float
+
+
 class FeedbackStats(BaseModel):
     total: int
     average_rating: float
-    last_10: int
+    # Average of the 10 most recent ratings.
+    last_10: float
+    histogram: Dict[str, int] = {}
+    windows: Dict[str, FeedbackWindow] = {}
 
 
 @router.post("/submit", response_model=FeedbackOut)
@@ -39,10 +52,9 @@ async def submit_feedback(payload: FeedbackIn):
     Store customer satisfaction feedback against a chat session.
     """
     ts = datetime.utcnow()
-    if _db and hasattr(_db, "get_db"):
+    if _repos:
         try:
-            db = _db.get_db()
-            db.feedback.insert_one(
+            await _repos.feedback.add(
                 {
                     "session_id": payload.session_id,
                     "rating": int(payload.rating),
@@ -51,14 +63,13 @@ async def submit_feedback(payload: FeedbackIn):
                     "created_at": ts,
                 }
             )
-            # optional: also stamp session doc
-            db.chat_sessions.update_one(
-                {"session_id": payload.session_id},
-                {"$set": {"satisfaction_score": int(payload.rating), "satisfaction_comment": payload.comment}},
-                upsert=False,
+            # Keep the dashboard aggregates current and stamp the session doc.
+            await asyncio.gather(
+                _stats.record(int(payload.rating), ts),
+                _repos.sessions.set_satisfaction(payload.session_id, int(payload.rating), payload.comment),
             )
         except Exception as e:
-            print(f"[feedback.submit] DB write failed: {e}")
+            logging.error(f"[feedback.submit] DB write failed: {e}")
             # fall through to success response as soft-fail is okay for demo
     return FeedbackOut(ok=True, session_id=payload.session_id, stored_at=ts)
 
@@ -66,23 +77,27 @@ async def submit_feedback(payload: FeedbackIn):
 @router.get("/aggregates", response_model=FeedbackStats)
 async def aggregates():
     """
-    Simple aggregate metrics for dashboard.
+    Aggregate metrics for dashboard, read from the precomputed aggregates.
     """
-    if _db and hasattr(_db, "get_db"):
+    if _stats:
         try:
-            db = _db.get_db()
-            total = db.feedback.count_documents({})
-            if total == 0:
-                return FeedbackStats(total=0, average_rating=0.0, last_10=0)
-            pipeline = [
-                {"$group": {"_id": None, "avg": {"$avg": "$rating"}, "count": {"$sum": 1}}},
-            ]
-            agg = list(db.feedback.aggregate(pipeline))
-            avg = float(agg[0]["avg"]) if agg else 0.0
-            last_10 = db.feedback.count_documents({}) if total < 10 else 10
-            return FeedbackStats(total=total, average_rating=round(avg, 2), last_10=last_10)
+            return FeedbackStats(**await _stats.snapshot())
         except Exception as e:
-            print(f"[feedback.aggregates] DB read failed: {e}")
+            logging.error(f"[feedback.aggregates] DB read failed: {e}")
             # fall through
     # Fallback metrics
-    return FeedbackStats(total=0, average_rating=0.0, last_10=0)
+    return FeedbackStats(total=0, average_rating=0.0, last_10=0.0)
+
+
+@router.post("/aggregates/rebuild", response_model=FeedbackStats)
+async def rebuild_aggregates():
+    """
+    Recomputes the aggregates from the raw feedback collection (recovery).
+    """
+    if not _stats:
+        raise HTTPException(status_code=503, detail="Feedback storage is unavailable.")
+    try:
+        return FeedbackStats(**await _stats.rebuild())
+    except Exception as e:
+        logging.error(f"[feedback.rebuild] Rebuild failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Rebuilding the aggregates failed.")
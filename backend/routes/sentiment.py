@@ -3,12 +3,14 @@ from typing import List, Optional
 from fastapi import APIRouter
 from pydantic import BaseModel
 
+from utils.rule_engine import classify_sentiment, get_engine
+
 router = APIRouter()
 
 # --- Optional service import ---
 _sentiment = None
 try:
-    from app.services import sentiment_service as _sentiment  # type: ignore
+    from services import sentiment_service as _sentiment  # type: ignore
 except Exception:
     _sentiment = None
 
@@ -32,14 +34,9 @@ class SentimentBatchOut(BaseModel):
 
 
 def _fallback_analyze(text: str) -> SentimentOut:
-    t = text.lower()
-    if any(w in t for w in ["angry", "furious", "hate", "useless", "worst", "terrible"]):
-        return SentimentOut(label="very_negative", score=0.95, emotions={"anger": 0.9})
-    if any(w in t for w in ["not happy", "bad", "issue", "problem", "can't", "cannot", "delay"]):
-        return SentimentOut(label="negative", score=0.75, emotions={"sadness": 0.6})
-    if any(w in t for w in ["great", "thanks", "love", "awesome", "perfect", "resolved"]):
-        return SentimentOut(label="positive", score=0.9, emotions={"joy": 0.85})
-    return SentimentOut(label="neutral", score=0.6, emotions={"neutral": 0.7})
+    engine = get_engine()
+    result = classify_sentiment(engine.match(text), engine.options["sentiment_default"])
+    return SentimentOut(label=result["label"], score=result["score"], emotions=result.get("emotions"))
 
 
 @router.post("/analyze", response_model=SentimentOut)
@@ -52,6 +49,16 @@ async def analyze(payload: SentimentIn):
     return _fallback_analyze(payload.text)
 
 
+@router.get("/cache")
+async def cache_stats():
+    """
+    Size and hit-rate metrics for the memoized sentiment results.
+    """
+    if _sentiment and hasattr(_sentiment, "sentiment_cache"):
+        return _sentiment.sentiment_cache.stats()
+    return {}
+
+
 @router.post("/batch", response_model=SentimentBatchOut)
 async def batch(payload: SentimentBatchIn):
     """
@@ -8,3 +8,5 @@ from . import rag_services
 from . import article_service
 from . import sentiment_service
 from . import escalation_service
+from . import rerank_service
+from . import chat_pipeline
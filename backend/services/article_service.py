@@ -1,37 +1,341 @@
+import asyncio
 import logging
-from db.mongo_client import knowledge_base_collection
-from utils.embedding_utils import get_embeddings
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from config import settings
+from db.repositories import knowledge_base
+from services.response_cache import response_cache
+from utils.chunking import chunk_articles
+from utils.embedding_utils import embed_async, encode_batch, model_version
+from utils.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from utils.tracing import span
+from utils.vector_db import get_index, save_index
+
+# A single token containing a digit ("E1234", "SKU-88-B", "#4521") is treated as
+# an exact-ID lookup and answered from BM25 alone, skipping the embedding model.
+_IDENTIFIER_QUERY = re.compile(r"^[#\w][\w\-./#]*$")
+
+# --- Ingestion process pool ---
+# Chunking is pure-Python string work, so large imports are split across
+# processes. "spawn" is used because forking a process that has already loaded
+# torch can deadlock.
+_chunk_pool: ProcessPoolExecutor | None = None
+_POOL_MIN_ARTICLES = 64
+
+
+def _get_chunk_pool() -> ProcessPoolExecutor:
+    global _chunk_pool
+    if _chunk_pool is None:
+        _chunk_pool = ProcessPoolExecutor(
+            max_workers=settings.INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _chunk_pool
+
+
+async def _chunk_all(articles: list[dict]) -> list[dict]:
+    size, overlap = settings.CHUNK_SIZE_WORDS, settings.CHUNK_OVERLAP_WORDS
+    loop = asyncio.get_running_loop()
+    if len(articles) < _POOL_MIN_ARTICLES or settings.INGEST_WORKERS <= 1:
+        per_article = await loop.run_in_executor(None, chunk_articles, articles, size, overlap)
+    else:
+        pool = _get_chunk_pool()
+        # A handful of slices per worker keeps IPC overhead low while still balancing load.
+        slice_size = max(1, len(articles) // (settings.INGEST_WORKERS * 4))
+        futures = [
+            loop.run_in_executor(pool, chunk_articles, articles[i:i + slice_size], size, overlap)
+            for i in range(0, len(articles), slice_size)
+        ]
+        per_article = [chunks for part in await asyncio.gather(*futures) for chunks in part]
+    return [chunk for chunks in per_article for chunk in chunks]
+
+
+async def _await_write(future: asyncio.Future) -> bool:
+    try:
+        await future
+        return True
+    except Exception as e:
+        logging.error(f"[Article Service] Bulk write to knowledge base failed: {e}", exc_info=True)
+        return False
+
+
+# Vector payload fields; unchanged text with different payload fields only
+# needs a payload update, not a new embedding.
+_PAYLOAD_KEYS = ("article_id", "title", "text", "url", "source", "tags", "content_hash")
+
+# Background compaction of tombstoned vector rows (at most one at a time).
+_compaction: asyncio.Future | None = None
+
+
+def _payload(chunk: dict, version: str) -> dict:
+    return {**{k: chunk.get(k) for k in _PAYLOAD_KEYS}, "model_version": version}
+
+
+def plan_changes(index, chunks: list[dict], version: str) -> tuple[list[dict], list[dict]]:
+    """
+    Splits freshly chunked articles into chunks that must be (re-)embedded
+    (new, text changed, or embedded by another model version) and chunks
+    whose vector is still valid but whose payload (title, url, tags, ...)
+    changed. Chunks matching the index exactly are in neither list.
+    """
+    to_embed, relabel = [], []
+    for chunk in chunks:
+        stored = index.get_payload(chunk["id"])
+        if stored is None or stored.get("content_hash") != chunk["content_hash"] or stored.get("model_version") != version:
+            to_embed.append(chunk)
+        elif stored != _payload(chunk, version):
+            relabel.append(chunk)
+    return to_embed, relabel
+
+
+def _indexed_chunk_ids(index, article_id: str, start: int = 0) -> list[str]:
+    # Chunk ids are "{article_id}:{i}" with contiguous i (see utils/chunking.py),
+    # and shrinking an article always removes its tail.
+    ids, i = [], start
+    while f"{article_id}:{i}" in index:
+        ids.append(f"{article_id}:{i}")
+        i += 1
+    return ids
+
+
+def stale_chunk_ids(index, chunks: list[dict], sources_to_sync: set | None = None) -> list[str]:
+    """
+    Indexed chunks that the new version of the articles no longer has: the
+    tail of an article that got shorter, and, when `sources_to_sync` is
+    given, every chunk of an article from one of those sources that is
+    missing from this ingest (it was deleted upstream).
+    """
+    chunk_counts: dict[str, int] = {}
+    for chunk in chunks:
+        chunk_counts[chunk["article_id"]] = max(chunk_counts.get(chunk["article_id"], 0), chunk["chunk_index"] + 1)
+    stale = [i for article_id, n in chunk_counts.items() for i in _indexed_chunk_ids(index, article_id, n)]
+    if sources_to_sync:
+        for chunk_id in index.ids():
+            payload = index.get_payload(chunk_id) or {}
+            if payload.get("source") in sources_to_sync and payload.get("article_id") not in chunk_counts:
+                stale.append(chunk_id)
+    return stale
+
+
+async def _compact(index):
+    loop = asyncio.get_running_loop()
+    try:
+        removed = await loop.run_in_executor(None, index.compact)
+        await loop.run_in_executor(None, save_index)
+        logging.info(f"[Article Service] Compacted {removed} tombstoned vectors out of the index.")
+    except Exception as e:
+        logging.error(f"[Article Service] Index compaction failed: {e}", exc_info=True)
+
+
+def schedule_compaction(index) -> bool:
+    """
+    Starts a background compaction once tombstones exceed
+    VECTOR_COMPACT_TOMBSTONE_RATIO of the live rows. Returns True if started.
+    """
+    global _compaction
+    if index.tombstone_count == 0 or index.tombstone_count < settings.VECTOR_COMPACT_TOMBSTONE_RATIO * len(index):
+        return False
+    if _compaction is not None and not _compaction.done():
+        return False
+    _compaction = asyncio.ensure_future(_compact(index))
+    return True
+
+
+async def _remove_chunks(index, chunk_ids: list[str]) -> int:
+    """
+    Tombstones chunks in the vector index and drops them from BM25 and MongoDB.
+    """
+    if not chunk_ids:
+        return 0
+    removed = index.tombstone(chunk_ids)
+    get_lexical_index().delete(chunk_ids)
+    try:
+        await knowledge_base.delete_chunks(chunk_ids)
+    except Exception as e:
+        logging.error(f"[Article Service] Failed to delete {len(chunk_ids)} chunks from knowledge base: {e}", exc_info=True)
+    return removed
+
+
+async def ingest_articles(articles: list[dict], sync: bool = False) -> tuple[int, list[str]]:
+    """
+    Incremental ingestion: chunk (process pool) -> compare content hashes
+    and model version with the index -> batched embedding of new or changed
+    chunks only -> bulk upsert into the vector index and the knowledge_base
+    collection. Chunks the articles no longer have are tombstoned; with
+    `sync`, so are all articles of the ingested sources that are missing
+    from this batch. Returns (articles ingested, detail messages).
+    """
+    logging.info(f"[Article Service] Ingesting {len(articles)} articles.")
+    details: list[str] = []
+    loop = asyncio.get_running_loop()
+
+    chunks = await _chunk_all(articles)
+    ingested_at = datetime.utcnow()
+    version = model_version()
+    details.append(f"{len(chunks)} chunks from {len(articles)} articles")
+
+    index = get_index()
+    to_embed, relabel = plan_changes(index, chunks, version)
+    # Articles without a source are never deleted by a sync. A sync scans every
+    # indexed payload, so it runs in the executor.
+    stale = await loop.run_in_executor(
+        None, stale_chunk_ids, index, chunks, {a.get("source") for a in articles} - {None} if sync else None
+    )
+    details.append(
+        f"{len(to_embed)} embedded, {len(relabel)} metadata-only updates, "
+        f"{len(chunks) - len(to_embed) - len(relabel)} unchanged, {len(stale)} removed"
+    )
+
+    batch_size = settings.INGEST_BATCH_SIZE
+    pending_write: asyncio.Future | None = None
+    mongo_failed = False
+    for start in range(0, len(to_embed), batch_size):
+        batch = to_embed[start:start + batch_size]
+        vectors = await loop.run_in_executor(None, encode_batch, [c["embed_text"] for c in batch], batch_size)
+        # Upserts can trigger IVF training, so they stay off the event loop too.
+        await loop.run_in_executor(
+            None,
+            index.upsert,
+            [c["id"] for c in batch],
+            vectors,
+            [_payload(c, version) for c in batch],
+        )
+        get_lexical_index().upsert([c["id"] for c in batch], [c["embed_text"] for c in batch])
+
+        # The Mongo write for this batch overlaps with encoding the next one.
+        if pending_write is not None:
+            mongo_failed |= not await _await_write(pending_write)
+        pending_write = asyncio.ensure_future(
+            knowledge_base.upsert_chunks([dict(c, model_version=version) for c in batch], ingested_at)
+        )
+
+    if pending_write is not None:
+        mongo_failed |= not await _await_write(pending_write)
+    if relabel:
+        index.update_payloads([c["id"] for c in relabel], [_payload(c, version) for c in relabel])
+        mongo_failed |= not await _await_write(asyncio.ensure_future(
+            knowledge_base.upsert_chunks([dict(c, model_version=version) for c in relabel], ingested_at)
+        ))
+    if mongo_failed:
+        details.append("warning: some chunks could not be written to MongoDB")
+    await _remove_chunks(index, stale)
+
+    # Cached answers built from any of these chunks may now be stale.
+    response_cache.invalidate_sources([c["id"] for c in to_embed + relabel] + stale)
+
+    if to_embed or relabel or stale:
+        await loop.run_in_executor(None, save_index)
+    if schedule_compaction(index):
+        details.append(f"compacting {index.tombstone_count} tombstoned chunks in the background")
+    logging.info(f"[Article Service] Ingested {len(chunks)} chunks ({len(to_embed)} embedded); index size is now {len(index)}.")
+    return len(articles), details
+
+
+async def delete_articles(article_ids: list[str]) -> int:
+    """
+    Removes articles from the knowledge base. Returns the number of chunks removed.
+    """
+    index = get_index()
+    stale = [chunk_id for article_id in article_ids for chunk_id in _indexed_chunk_ids(index, article_id)]
+    removed = await _remove_chunks(index, stale)
+    if removed:
+        response_cache.invalidate_sources(stale)
+        await asyncio.get_running_loop().run_in_executor(None, save_index)
+        schedule_compaction(index)
+    return removed
+
+
+def _is_identifier_query(query: str) -> bool:
+    query = query.strip()
+    return bool(_IDENTIFIER_QUERY.match(query)) and any(ch.isdigit() for ch in query)
+
+
+def _to_result(index, chunk_id: str, score: float, extra: dict) -> dict:
+    payload = index.get_payload(chunk_id) or {}
+    return {
+        "id": chunk_id,
+        "title": payload.get("title"),
+        "snippet": payload.get("text", "")[:300],
+        "text": payload.get("text", ""),
+        "score": score,
+        "url": payload.get("url"),
+        "metadata": {
+            "article_id": payload.get("article_id"),
+            "title": payload.get("title"),
+            "url": payload.get("url"),
+            "source": payload.get("source"),
+            "tags": payload.get("tags", []),
+            **extra,
+        },
+    }
+
 
 # This is now the one and only search function.
 # It is correctly defined as an 'async' function.
+def _fuse(index, vector_hits: list, lexical_hits: list, top_k: int) -> list[dict]:
+    vector_scores = dict(vector_hits)
+    lexical_scores = dict(lexical_hits)
+    fused = reciprocal_rank_fusion(
+        [[chunk_id for chunk_id, _ in vector_hits], [chunk_id for chunk_id, _ in lexical_hits]],
+        k=settings.HYBRID_RRF_K,
+    )
+    return [
+        _to_result(index, chunk_id, score, {
+            "vector_score": vector_scores.get(chunk_id),
+            "bm25_score": lexical_scores.get(chunk_id),
+            "retriever": "hybrid",
+        })
+        for chunk_id, score in fused[:top_k]
+    ]
+
+
 async def search_articles(query: str, top_k: int = 5) -> list[dict]:
     """
-    Searches for relevant articles in the knowledge base.
-    NOTE: This is a placeholder and should be replaced with a real vector search.
+    Hybrid search over the knowledge base: BM25 (utils/lexical_index.py) and
+    the vector index (utils/vector_db.py), fused with reciprocal-rank fusion.
+    Exact-ID queries are answered from BM25 alone.
     """
     logging.info(f"[Article Service] Searching for articles with query: '{query}'")
     
     try:
-        # In a real application, your asynchronous database query would go here.
-        # For example: results = await knowledge_base_collection.find({...}).to_list(length=top_k)
-        
-        # --- Placeholder Response ---
-        # This simulates finding one relevant article.
-        placeholder_results = [
-            {
-                "id": "kb_123",
-                "title": "How to Reset Your Password",
-                "snippet": "To reset your password, go to the login page and click the 'Forgot Password' link. You will receive an email with instructions...",
-                "score": 0.85,
-                "url": "/help/password-reset"
-            }
-        ]
+        index = get_index()
+        if len(index) == 0:
+            logging.warning("[Article Service] Vector index is empty; nothing to search.")
+            return []
+
+        # Each retriever over-fetches so that fusion has enough candidates to re-rank.
+        candidates = max(top_k * settings.HYBRID_OVERFETCH, 20)
+        # BM25, vector scoring and fusion are CPU-bound; keep them off the event loop.
+        loop = asyncio.get_running_loop()
+        with span("bm25_search"):
+            lexical_hits = await loop.run_in_executor(
+                None, lambda: get_lexical_index().search(query, candidates)
+            )
+
+        if _is_identifier_query(query) and lexical_hits:
+            results = [
+                _to_result(index, chunk_id, score, {"bm25_score": score, "retriever": "bm25"})
+                for chunk_id, score in lexical_hits[:top_k]
+            ]
+            logging.info(f"[Article Service] Exact-ID query; found {len(results)} articles via BM25.")
+            return results
+
+        query_embedding = await embed_async(query)
+        if query_embedding is None:
+            vector_hits = []
+        else:
+            with span("vector_search"):
+                vector_hits = await loop.run_in_executor(None, index.search, query_embedding, candidates)
+
+        results = await loop.run_in_executor(None, _fuse, index, vector_hits, lexical_hits, top_k)
         
-        logging.info(f"[Article Service] Found {len(placeholder_results)} articles.")
-        return placeholder_results
+        logging.info(f"[Article Service] Found {len(results)} articles.")
+        return results
 
     except Exception as e:
         logging.error(f"[Article Service] An error occurred during article search: {e}", exc_info=True)
         # Return an empty list in case of an error to prevent the app from crashing.
         return []
-
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+
+from config import settings
+from services import article_service, sentiment_service, escalation_service, rerank_service
+from utils.tracing import record_span, span
+
+# --- Chat pipeline orchestrator ---
+# Retrieval, sentiment and escalation do not depend on each other, so they run
+# concurrently. Each stage has its own deadline; a stage that misses it (or
+# fails) is replaced by its fallback value instead of failing the request,
+# unless it is marked as required.
+
+
+class Stage:
+    """
+    One independent unit of work in the pipeline.
+
+    `run` is a zero-argument callable returning an awaitable. CPU-bound work
+    inside a stage must be pushed to a thread by the stage itself, otherwise
+    its deadline cannot preempt it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[], Any],
+        deadline_s: float | None = None,
+        fallback: Any = None,
+        required: bool = False,
+    ):
+        self.name = name
+        self.run = run
+        self.deadline_s = deadline_s
+        self.fallback = fallback
+        self.required = required
+
+
+class PipelineResult:
+    def __init__(self):
+        self.values: dict[str, Any] = {}
+        self.timings_ms: dict[str, float] = {}
+        self.degraded: list[str] = []
+
+    def __getitem__(self, name: str) -> Any:
+        return self.values[name]
+
+
+async def _run_stage(stage: Stage, result: PipelineResult):
+    start = time.perf_counter()
+    try:
+        result.values[stage.name] = await asyncio.wait_for(stage.run(), timeout=stage.deadline_s)
+    except Exception as e:
+        if stage.required:
+            raise
+        if isinstance(e, asyncio.TimeoutError):
+            logging.warning(f"[Chat Pipeline] Stage '{stage.name}' missed its {stage.deadline_s}s deadline; using fallback.")
+        else:
+            logging.error(f"[Chat Pipeline] Stage '{stage.name}' failed: {e}; using fallback.", exc_info=True)
+        result.values[stage.name] = stage.fallback
+        result.degraded.append(stage.name)
+    finally:
+        elapsed = time.perf_counter() - start
+        result.timings_ms[stage.name] = round(elapsed * 1000, 2)
+        record_span(stage.name, elapsed)
+
+
+async def run_stages(stages: list[Stage]) -> PipelineResult:
+    """
+    Runs all stages concurrently and returns their values, per-stage
+    timings and the names of stages that fell back.
+    """
+    result = PipelineResult()
+    start = time.perf_counter()
+    await asyncio.gather(*(_run_stage(stage, result) for stage in stages))
+    result.timings_ms["total"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+async def retrieve(text: str, top_k: int) -> list[dict]:
+    """
+    Hybrid retrieval, followed by cross-encoder reranking of an over-fetched
+    candidate set when RERANK_ENABLED.
+    """
+    if not settings.RERANK_ENABLED:
+        return await article_service.search_articles(text, top_k)
+    candidates = await article_service.search_articles(text, top_k * settings.RERANK_OVERFETCH)
+    with span("rerank"):
+        return await rerank_service.rerank(text, candidates, top_k)
+
+
+async def prepare_chat(text: str, top_k: int, history: list | None = None, session_id: str | None = None) -> PipelineResult:
+    """
+    Runs the pre-LLM part of a chat turn: retrieval, sentiment and escalation.
+    With a session_id, the message-level escalation result is then folded
+    into the session's running state together with the model sentiment.
+    """
+    result = await run_stages([
+        Stage(
+            "retrieval",
+            lambda: retrieve(text, top_k),
+            deadline_s=settings.STAGE_DEADLINE_RETRIEVAL_MS / 1000,
+            fallback=[],
+        ),
+        Stage(
+            "sentiment",
+            lambda: sentiment_service.analyze(text),
+            deadline_s=settings.STAGE_DEADLINE_SENTIMENT_MS / 1000,
+            fallback={"label": "NEUTRAL", "score": 0.5},
+        ),
+        Stage(
+            "escalation",
+            lambda: escalation_service.predict(text, history),
+            deadline_s=settings.STAGE_DEADLINE_ESCALATION_MS / 1000,
+            fallback={"predicted": False, "score": 0.0, "reasons": [], "prediction": "no_escalation", "confidence": 0.0},
+        ),
+    ])
+    if session_id and "escalation" not in result.degraded:
+        try:
+            result.values["escalation"] = await escalation_service.observe(
+                session_id, text, result["escalation"], result["sentiment"]
+            )
+        except Exception as e:
+            logging.error(f"[Chat Pipeline] Session escalation update failed: {e}", exc_info=True)
+    return result
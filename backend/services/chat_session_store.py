@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from config import settings
+from db.repositories import SessionRepository, sessions
+from utils.metrics import BATCH_SIZE, QUEUE_DEPTH
+
+# --- Write-behind chat transcript store ---
+# Every chat turn (query, sources, sentiment, escalation, reply) is appended to
+# its session document in the `chat_sessions` collection. The request path only
+# puts the turn on a bounded in-memory queue; a background task drains it and
+# writes whole batches with one unordered bulk_write, grouping turns of the
+# same session into a single $push. When the queue is full, producers wait up
+# to SESSION_ENQUEUE_TIMEOUT_MS (backpressure) and the turn is dropped after
+# that. Whatever is still queued is flushed on shutdown.
+
+
+class ChatSessionStore:
+    def __init__(
+        self,
+        repository: SessionRepository = sessions,
+        max_queue: int = settings.SESSION_QUEUE_MAX,
+        batch_size: int = settings.SESSION_FLUSH_BATCH,
+        flush_interval_s: float = settings.SESSION_FLUSH_INTERVAL_MS / 1000,
+        enqueue_timeout_s: float = settings.SESSION_ENQUEUE_TIMEOUT_MS / 1000,
+    ):
+        self.repository = repository
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.enqueue_timeout_s = enqueue_timeout_s
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: asyncio.Future | None = None
+        self._leftover: list[tuple] = []
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        QUEUE_DEPTH.add_source(lambda: self._queue.qsize() if self._queue else 0, queue="chat_sessions")
+
+    def start(self):
+        """
+        Starts the background flusher on the running loop (idempotent). The
+        queue is bound to the loop it is used on, so an app restarted on a new
+        loop in the same process gets a new queue (with any turns left behind).
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            pending = self._take(self.max_queue) if self._queue is not None else []
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._loop = loop
+            self._task = None
+            for item in pending:
+                self._queue.put_nowait(item)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the flusher after writing everything still queued.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._inflight is not None and not self._inflight.done():
+            await self._inflight
+        await self._flush(self._leftover)
+        self._leftover = []
+        while not self._queue.empty():
+            await self._flush(self._take(self.batch_size))
+        self._queue = None
+        self._loop = None
+
+    async def record_turn(self, session_id: str, turn: dict, customer_id: str | None = None) -> bool:
+        """
+        Queues one turn for persistence. Returns False if it had to be dropped.
+        """
+        if not settings.SESSION_STORE_ENABLED:
+            return False
+        self.start()
+        item = (session_id, customer_id, dict(turn, created_at=turn.get("created_at") or datetime.utcnow()))
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(item), timeout=self.enqueue_timeout_s)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                logging.warning(f"[Chat Sessions] Write queue full; dropped a turn of session {session_id}.")
+                return False
+        self.enqueued += 1
+        return True
+
+    def _take(self, limit: int) -> list[tuple]:
+        items = []
+        while len(items) < limit and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    async def _run(self):
+        batch: list[tuple] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                # Give the batch a moment to fill up before writing it.
+                deadline = time.monotonic() + self.flush_interval_s
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+                self._inflight = asyncio.ensure_future(self._flush(batch))
+                batch = []
+                await asyncio.shield(self._inflight)
+        except asyncio.CancelledError:
+            self._leftover = batch
+            raise
+
+    @staticmethod
+    def group_by_session(batch: list[tuple]) -> dict[str, tuple[str | None, list[dict]]]:
+        """
+        Queued turns per session, in arrival order, with the first known customer id.
+        """
+        grouped: dict[str, tuple[str | None, list[dict]]] = {}
+        for session_id, customer_id, turn in batch:
+            known_customer, turns = grouped.get(session_id, (None, []))
+            turns.append(turn)
+            grouped[session_id] = (known_customer or customer_id, turns)
+        return grouped
+
+    async def _flush(self, batch: list[tuple]):
+        if not batch:
+            return
+        BATCH_SIZE.observe(len(batch), component="chat_sessions")
+        try:
+            await self.repository.append_turns(self.group_by_session(batch))
+            self.written += len(batch)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(batch)
+            logging.error(f"[Chat Sessions] Failed to write {len(batch)} turns: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+chat_session_store = ChatSessionStore()
@@ -1,27 +1,91 @@
+import copy
 import logging
 
+from config import settings
+from utils.result_cache import ResultCache
+from services.escalation_state import SessionState, session_store
+from utils.rule_engine import classify_sentiment, get_engine, score_escalation
+
 # This is a placeholder for a real machine learning model.
 # In a real application, you would load a trained classifier here.
 # For example: from sklearn.externals import joblib
 # classifier = joblib.load('escalation_model.pkl')
 
+# Escalation results for standalone messages (no history) repeat as often as the messages do.
+# Keyed by rule-set version and inference backend too, so edited rules or a
+# backend switch never serve stale results.
+escalation_cache = ResultCache("escalation", version=lambda: f"{get_engine().version}:{settings.INFERENCE_BACKEND}")
+
+
+def _predict_text(text: str) -> dict:
+    """
+    Scores a single message against the compiled escalation rules.
+    """
+    engine = get_engine()
+    result = score_escalation(engine.match(text), engine.options["escalation_threshold"])
+    if result["predicted"]:
+        logging.warning(f"[Escalation Service] Escalation detected by rules: {result['reasons']}")
+    # "prediction"/"confidence" are kept for existing callers of the chat pipeline.
+    result["prediction"] = "escalation" if result["predicted"] else "no_escalation"
+    result["confidence"] = result["score"] if result["predicted"] else round(1.0 - result["score"], 4)
+    return result
+
+
+async def rules() -> list[str]:
+    """
+    The escalation trigger phrases currently loaded.
+    """
+    return [rule.phrase for rule in get_engine().rules("escalation")]
+
+
+def _keyword_sentiment(text: str) -> dict:
+    engine = get_engine()
+    return classify_sentiment(engine.match(text), engine.options["sentiment_default"])
+
+
+async def _predict_message(text: str) -> dict:
+    """
+    Message-level prediction, memoized by normalized text.
+    """
+    cached = await escalation_cache.aget(text)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    result = _predict_text(text)
+    await escalation_cache.aput(text, result)
+    # Copies in both paths, so that callers cannot change the cached entry.
+    return copy.deepcopy(result)
+
+
+async def observe(session_id: str, text: str, message: dict, sentiment: dict | None = None) -> dict:
+    """
+    Folds a new message into the session's running state (O(1)) and returns
+    a conversation-aware prediction. `message` is the message-level result;
+    without a model `sentiment`, the keyword sentiment is used.
+    """
+    state = await session_store.get(session_id)
+    state.update(text, sentiment or _keyword_sentiment(text), message.get("reasons", []))
+    session_store.save(state)
+    return state.assess(message, get_engine().options["escalation_threshold"])
+
+
 # This is the 'predict' function that was missing.
-async def predict(text: str, history: list = None) -> dict:
+async def predict(text: str, history: list = None, session_id: str | None = None) -> dict:
     """
     Predicts the likelihood of a conversation needing escalation.
-    This is a simple keyword-based placeholder.
+    With a session_id the session's incremental state is used; an explicit
+    history is folded into a throwaway state once. Otherwise the message is
+    scored on its own.
     """
     logging.info(f"[Escalation Service] Predicting escalation for text: '{text}'")
-    
-    text_lower = text.lower()
-    escalation_keywords = [
-        "manager", "supervisor", "complaint", "refund", "cancel my account",
-        "legal", "lawyer", "sue", "frustrated", "angry", "unacceptable"
-    ]
-    
-    # Check if any keywords are present
-    if any(keyword in text_lower for keyword in escalation_keywords):
-        logging.warning(f"[Escalation Service] Escalation detected based on keywords.")
-        return {"prediction": "escalation", "confidence": 0.9}
-        
-    return {"prediction": "no_escalation", "confidence": 0.8}
+    if session_id:
+        return await observe(session_id, text, await _predict_message(text))
+
+    if history:
+        state = SessionState("")
+        for past in history:
+            state.update(past, _keyword_sentiment(past), _predict_text(past)["reasons"])
+        message = _predict_text(text)
+        state.update(text, _keyword_sentiment(text), message["reasons"])
+        return state.assess(message, get_engine().options["escalation_threshold"])
+
+    return await _predict_message(text)
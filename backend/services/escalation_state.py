@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from config import settings
+from db.repositories import escalation_states
+from utils.result_cache import text_key
+from utils.rule_engine import tokenize
+
+# --- Incremental per-session escalation state ---
+# Instead of re-scoring the whole transcript every turn, each session keeps a
+# small running summary that is updated in O(1) per message: an exponentially
+# weighted negativity score and its trend, how often the customer repeats
+# themselves, and how often each escalation rule has fired. Sessions live in a
+# bounded LRU with an idle TTL and can optionally be written through to Mongo
+# so they survive restarts and are visible to every worker.
+
+# How much each conversation-level signal adds to the escalation score (noisy-OR).
+_NEGATIVITY_WEIGHT = 0.7
+_REPEAT_WEIGHT = 0.4
+_RECURRING_RULE_WEIGHT = 0.5
+# Number of recent message hashes remembered per session for repeat detection.
+_RECENT_MESSAGES = 20
+# Only substantive messages count as repeats: at least this many tokens, or a
+# rule hit. Acknowledgements like "ok" or "thanks" recur in any polite chat,
+# and their sentiment label is too unreliable to make them substantive.
+_MIN_REPEAT_TOKENS = 3
+# Smallest per-turn rise in smoothed negativity reported as "worsening sentiment".
+_TREND_EPSILON = 0.05
+
+
+def negativity(sentiment: dict | None) -> float:
+    """
+    Maps a sentiment result (model or keyword fallback) to 0 (positive) .. 1 (negative).
+    """
+    if not sentiment:
+        return 0.5
+    label = str(sentiment.get("label", "")).lower()
+    score = float(sentiment.get("score", 0.5))
+    if "neg" in label:
+        return score
+    if "pos" in label:
+        return 1.0 - score
+    return 0.5
+
+
+class SessionState:
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns = 0
+        self.negativity = 0.5
+        self.trend = 0.0
+        self.repeat_contacts = 0
+        self.rule_counts: dict[str, int] = {}
+        self._recent: deque[str] = deque(maxlen=_RECENT_MESSAGES)
+        self.updated_at = time.time()
+
+    def update(self, text: str, sentiment: dict | None, reasons: list[str]):
+        """
+        Folds one new message into the running summary.
+        """
+        alpha = settings.ESCALATION_SENTIMENT_ALPHA
+        previous = self.negativity
+        value = negativity(sentiment)
+        if self.turns == 0:
+            # The first message sets the level; there is no trend yet.
+            self.negativity = value
+        else:
+            self.negativity = alpha * value + (1 - alpha) * previous
+            self.trend = alpha * (self.negativity - previous) + (1 - alpha) * self.trend
+
+        tokens = tokenize(text)
+        if len(tokens) >= _MIN_REPEAT_TOKENS or reasons:
+            # Punctuation and case are ignored, so "Still nothing!" repeats "still nothing".
+            key = text_key(" ".join(tokens))
+            if key in self._recent:  # bounded, so this scan is constant-time
+                self.repeat_contacts += 1
+            self._recent.append(key)
+
+        for reason in reasons:
+            self.rule_counts[reason] = self.rule_counts.get(reason, 0) + 1
+        self.turns += 1
+        self.updated_at = time.time()
+
+    def assess(self, message: dict, threshold: float) -> dict:
+        """
+        Combines the latest message's rule score with the conversation signals.
+        """
+        reasons = list(message.get("reasons", []))
+        miss = 1.0 - float(message.get("score", 0.0))
+
+        pressure = max(0.0, 2 * (self.negativity - 0.5))
+        if self.turns > 1 and pressure > 0:
+            miss *= 1.0 - _NEGATIVITY_WEIGHT * pressure
+            if self.trend > _TREND_EPSILON:
+                reasons.append("worsening sentiment")
+        if self.repeat_contacts:
+            miss *= (1.0 - _REPEAT_WEIGHT) ** min(self.repeat_contacts, 3)
+            reasons.append(f"repeated message x{self.repeat_contacts}")
+        recurring = [rule for rule, count in self.rule_counts.items() if count > 1]
+        if recurring:
+            miss *= 1.0 - _RECURRING_RULE_WEIGHT
+            reasons.extend(f"recurring: {rule}" for rule in recurring if rule not in reasons)
+
+        score = round(1.0 - miss, 4)
+        predicted = score >= threshold
+        return {
+            "predicted": predicted,
+            "score": score,
+            "reasons": reasons,
+            "prediction": "escalation" if predicted else "no_escalation",
+            "confidence": score if predicted else round(1.0 - score, 4),
+            "session": self.summary(),
+        }
+
+    def summary(self) -> dict:
+        return {
+            "turns": self.turns,
+            "negativity": round(self.negativity, 4),
+            "sentiment_trend": round(self.trend, 4),
+            "repeat_contacts": self.repeat_contacts,
+            "rule_counts": dict(self.rule_counts),
+        }
+
+    def to_doc(self) -> dict:
+        return dict(self.summary(), _id=self.session_id, negativity=self.negativity, sentiment_trend=self.trend,
+                    recent=list(self._recent), updated_at=self.updated_at)
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "SessionState":
+        state = cls(doc["_id"])
+        state.turns = doc.get("turns", 0)
+        state.negativity = doc.get("negativity", 0.5)
+        state.trend = doc.get("sentiment_trend", 0.0)
+        state.repeat_contacts = doc.get("repeat_contacts", 0)
+        state.rule_counts = dict(doc.get("rule_counts", {}))
+        state._recent.extend(doc.get("recent", []))
+        state.updated_at = doc.get("updated_at", time.time())
+        return state
+
+
+class SessionStore:
+    """
+    Bounded LRU of session states with idle-TTL eviction.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = settings.ESCALATION_SESSION_MAX,
+        ttl_s: float = settings.ESCALATION_SESSION_TTL_S,
+        persist: bool = settings.ESCALATION_SESSION_PERSIST,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self.persist = persist
+        self._states: OrderedDict[str, tuple[SessionState, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: set[asyncio.Task] = set()
+        self.evictions = 0
+
+    def _evict(self, now: float):
+        # Entries are kept in last-access order, so expired ones are at the front.
+        while self._states:
+            _, (_, expires_at) = next(iter(self._states.items()))
+            if expires_at >= now:
+                break
+            self._states.popitem(last=False)
+            self.evictions += 1
+
+    def _get_local(self, session_id: str) -> SessionState | None:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            item = self._states.get(session_id)
+            if item is None:
+                return None
+            self._states[session_id] = (item[0], now + self.ttl_s)
+            self._states.move_to_end(session_id)
+            return item[0]
+
+    def _remember(self, state: SessionState):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            self._states[state.session_id] = (state, now + self.ttl_s)
+            self._states.move_to_end(state.session_id)
+            while len(self._states) > self.max_sessions:
+                self._states.popitem(last=False)
+                self.evictions += 1
+
+    async def get(self, session_id: str) -> SessionState:
+        """
+        The session's state: from memory, else from Mongo (when persisting), else new.
+        """
+        state = self._get_local(session_id)
+        if state is not None:
+            return state
+        if self.persist:
+            try:
+                doc = await escalation_states.get(session_id)
+                if doc:
+                    state = SessionState.from_doc(doc)
+            except Exception as e:
+                logging.warning(f"[Escalation State] Could not load session {session_id}: {e}")
+        state = state or SessionState(session_id)
+        self._remember(state)
+        return state
+
+    def save(self, state: SessionState):
+        """
+        Writes the state through to Mongo in the background (no-op unless persisting).
+        """
+        if not self.persist:
+            return
+        task = asyncio.get_running_loop().create_task(self._write(state.to_doc()))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    @staticmethod
+    async def _write(doc: dict):
+        try:
+            await escalation_states.save(doc)
+        except Exception as e:
+            logging.warning(f"[Escalation State] Could not persist session {doc['_id']}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+session_store = SessionStore()
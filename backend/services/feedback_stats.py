@@ -0,0 +1,139 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+from config import settings
+from db.repositories import FeedbackRepository, FeedbackStatsRepository, feedback, feedback_stats
+
+# --- Incrementally maintained feedback aggregates ---
+# Every submitted rating bumps a running-totals document (count, rating sum,
+# histogram, last ratings) and the bucket of the current hour. The dashboard
+# then reads the totals plus the last 25 hour buckets with one query, and
+# rolling 1h / 24h windows are derived from those buckets, so the cost no
+# longer grows with the size of the feedback collection. Reads are served
+# from a short-lived in-memory snapshot. `rebuild()` recomputes everything
+# from the raw feedback collection for recovery.
+
+RECENT_SIZE = 10
+_HOUR_FORMAT = "%Y-%m-%dT%H"
+_BUCKET_RETENTION = timedelta(hours=48)
+
+
+def _hour_start(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def hour_bucket_id(ts: datetime) -> str:
+    return "hour:" + ts.strftime(_HOUR_FORMAT)
+
+
+def _empty_stats() -> dict:
+    return {
+        "total": 0,
+        "average_rating": 0.0,
+        "last_10": 0.0,
+        "histogram": {str(r): 0 for r in range(1, 6)},
+        "windows": {name: {"count": 0, "average_rating": 0.0} for name in ("hour", "day")},
+    }
+
+
+def summarize(totals: dict | None, buckets: dict[str, dict], now: datetime) -> dict:
+    """
+    Turns the precomputed documents into the dashboard payload.
+
+    A rolling window of N hours sums the N most recent hour buckets (the
+    current one is partial) plus the share of the bucket before them that
+    still falls inside the window.
+    """
+    stats = _empty_stats()
+    if totals:
+        count = totals.get("count", 0)
+        recent = totals.get("recent", [])
+        stats["total"] = count
+        stats["average_rating"] = round(totals.get("rating_sum", 0) / count, 2) if count else 0.0
+        stats["last_10"] = round(sum(recent) / len(recent), 2) if recent else 0.0
+        for rating, n in totals.get("histogram", {}).items():
+            stats["histogram"][str(rating)] = n
+
+    elapsed = (now - _hour_start(now)).total_seconds() / 3600
+    for name, hours in (("hour", 1), ("day", 24)):
+        count = rating_sum = 0.0
+        for back in range(hours + 1):
+            bucket = buckets.get(hour_bucket_id(now - timedelta(hours=back)))
+            if not bucket:
+                continue
+            share = 1.0 - elapsed if back == hours else 1.0
+            count += share * bucket.get("count", 0)
+            rating_sum += share * bucket.get("rating_sum", 0)
+        stats["windows"][name] = {
+            "count": int(round(count)),
+            "average_rating": round(rating_sum / count, 2) if count else 0.0,
+        }
+    return stats
+
+
+class FeedbackAggregates:
+    def __init__(
+        self,
+        repository: FeedbackStatsRepository = feedback_stats,
+        feedback_repository: FeedbackRepository = feedback,
+        snapshot_ttl_s: float = settings.FEEDBACK_STATS_SNAPSHOT_S,
+    ):
+        self.repository = repository
+        self.feedback_repository = feedback_repository
+        self.snapshot_ttl_s = snapshot_ttl_s
+        self._snapshot: dict | None = None
+        self._snapshot_expires = 0.0
+
+    async def record(self, rating: int, created_at: datetime):
+        start = _hour_start(created_at)
+        bucket = {"_id": hour_bucket_id(created_at), "start": start, "expires_at": start + _BUCKET_RETENTION}
+        await self.repository.record(rating, bucket, RECENT_SIZE)
+        self._snapshot = None
+
+    async def snapshot(self, now: datetime | None = None) -> dict:
+        """
+        Current aggregates: one read of at most 26 small documents, cached briefly.
+        """
+        if self._snapshot is not None and time.monotonic() < self._snapshot_expires and now is None:
+            return self._snapshot
+        now = now or datetime.utcnow()
+        ids = [FeedbackStatsRepository.TOTALS_ID] + [hour_bucket_id(now - timedelta(hours=h)) for h in range(25)]
+        docs = {doc["_id"]: doc for doc in await self.repository.get_many(ids)}
+        stats = summarize(docs.pop(FeedbackStatsRepository.TOTALS_ID, None), docs, now)
+        self._snapshot, self._snapshot_expires = stats, time.monotonic() + self.snapshot_ttl_s
+        return stats
+
+    async def rebuild(self) -> dict:
+        """
+        Recomputes all aggregate documents from the raw feedback collection.
+        """
+        now = datetime.utcnow()
+        histogram = await self.feedback_repository.rating_histogram()
+        recent = await self.feedback_repository.recent(RECENT_SIZE)
+        totals = {
+            "_id": FeedbackStatsRepository.TOTALS_ID,
+            "count": sum(histogram.values()),
+            "rating_sum": sum(rating * n for rating, n in histogram.items()),
+            "histogram": {str(rating): n for rating, n in histogram.items()},
+            "recent": [doc["rating"] for doc in reversed(recent)],
+        }
+        buckets: dict[str, dict] = {}
+        for doc in await self.feedback_repository.since(_hour_start(now) - _BUCKET_RETENTION):
+            start = _hour_start(doc["created_at"])
+            bucket = buckets.setdefault(hour_bucket_id(start), {
+                "_id": hour_bucket_id(start), "start": start, "expires_at": start + _BUCKET_RETENTION,
+                "count": 0, "rating_sum": 0, "histogram": {},
+            })
+            rating = int(doc["rating"])
+            bucket["count"] += 1
+            bucket["rating_sum"] += rating
+            bucket["histogram"][str(rating)] = bucket["histogram"].get(str(rating), 0) + 1
+
+        await self.repository.replace_all([totals, *buckets.values()])
+        self._snapshot = None
+        logging.info(f"[Feedback Stats] Rebuilt aggregates from {totals['count']} feedback entries.")
+        return await self.snapshot()
+
+
+feedback_aggregates = FeedbackAggregates()
@@ -1,26 +1,93 @@
 import logging
+from typing import AsyncIterator
 from services.article_service import search_articles
 # This is the corrected import. It now calls the 'analyze' function.
 from services.sentiment_service import analyze as analyze_sentiment
-from utils.llm_utils import generate_response
+from config import settings
+from services.response_cache import response_cache
+from utils.context_builder import ContextResult, context_builder
+from utils.embedding_utils import embed_async
+from utils.tracing import span
+from utils.vector_db import get_index
+from utils.llm_utils import generate_response_async, stream_response, UNAVAILABLE_REPLY, ERROR_REPLY
+
+
+def assemble_context(sources: list) -> ContextResult:
+    """
+    Deduplicates the sources (using their stored embeddings), orders them by
+    score and fits them into the context token budget.
+    """
+    ids = [s["id"] for s in sources if s.get("id")]
+    with span("context"):
+        vectors = get_index().get_vectors(ids) if ids else {}
+        result = context_builder.build(sources, vectors)
+    logging.info(
+        f"--- [RAG Service] Context: {len(result.used)}/{len(sources)} sources, ~{result.tokens} tokens "
+        f"(unbudgeted ~{result.naive_tokens}; {result.duplicates} duplicates, {result.below_cutoff} below cutoff) ---"
+    )
+    return result
+
+
+def build_context(sources: list) -> str:
+    """
+    Prepares the prompt context from the sources passed in from the chat route.
+    """
+    return assemble_context(sources).text
+
 
 async def generate_answer(query: str, sources: list, sentiment: dict, tone: str = None):
     """
     This function runs the full RAG pipeline.
     """
     logging.info("--- [RAG Service] Starting RAG pipeline ---")
+
+    sentiment_label = sentiment.get("label", "neutral")
+    cache_key = response_cache.make_key(query, sentiment_label, tone)
+    source_ids = tuple(s.get("id") for s in sources)
+    query_embedding = None
+    if settings.RESPONSE_CACHE_ENABLED:
+        cached = response_cache.get_exact(cache_key, source_ids)
+        if cached is None:
+            query_embedding = await embed_async(query)
+            cached = response_cache.get_semantic(cache_key, query_embedding, source_ids)
+        if cached is not None:
+            logging.info("--- [RAG Service] Answer served from response cache ---")
+            return cached
     
-    # The context is prepared from the sources passed in from the chat route
-    context = "\n\n".join([f"Title: {s.get('title', '')}\nContent: {s.get('snippet', '')}" for s in sources])
+    context = build_context(sources)
     
     try:
-        # Call the llm_utils function that connects to the Gemini API
-        response_text = generate_response(
-            user_query=query, 
-            context=context, 
-            sentiment_label=sentiment.get("label", "neutral")
-        )
+        # Call the llm_utils function that connects to the Gemini API (non-blocking)
+        with span("llm"):
+            response_text = await generate_response_async(
+                user_query=query,
+                context=context,
+                sentiment_label=sentiment_label
+            )
+        if settings.RESPONSE_CACHE_ENABLED and response_text not in (UNAVAILABLE_REPLY, ERROR_REPLY):
+            response_cache.put(cache_key, response_text, source_ids, query_embedding)
         return response_text
     except Exception as e:
         logging.error(f"--- [RAG Service] ERROR during LLM call: {e}", exc_info=True)
         return "I'm sorry, but I encountered an error trying to generate a response."
+
+
+async def stream_answer(query: str, sources: list, sentiment: dict, tone: str = None) -> AsyncIterator[str]:
+    """
+    Streaming variant of generate_answer: yields reply fragments as the LLM produces them.
+    """
+    logging.info("--- [RAG Service] Starting streaming RAG pipeline ---")
+
+    context = build_context(sources)
+
+    try:
+        with span("llm"):
+            async for fragment in stream_response(
+                user_query=query,
+                context=context,
+                sentiment_label=sentiment.get("label", "neutral")
+            ):
+                yield fragment
+    except Exception as e:
+        logging.error(f"--- [RAG Service] ERROR during streaming LLM call: {e}", exc_info=True)
+        yield "I'm sorry, but I encountered an error trying to generate a response."
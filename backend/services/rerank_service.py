@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import logging
+import math
+
+from config import settings
+from utils.context_builder import relevance_mask
+from utils.model_registry import registry
+from utils.result_cache import ResultCache
+
+# --- Cross-encoder reranking (optional, RERANK_ENABLED) ---
+# Retrieval over-fetches candidates; they are pruned cheaply by their cosine and
+# BM25 scores, and the survivors are scored against the query by a small
+# cross-encoder in a single batched forward pass. Scores are cached per
+# (query, chunk), so repeated questions skip the model. If scoring does not
+# finish within RERANK_BUDGET_MS, the retrieval order is used instead (and
+# the scores are still cached once the pass completes).
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def _load_model():
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(RERANK_MODEL, max_length=512)
+
+
+if settings.RERANK_ENABLED:
+    # Not required for readiness: without it, retrieval order is kept.
+    registry.register("reranker", _load_model, required=False)
+
+rerank_cache = ResultCache("rerank", use_disk=False)
+
+
+def _cache_key(query: str, candidate: dict) -> str:
+    # The chunk text hash keeps scores from outliving a re-ingested chunk.
+    digest = hashlib.blake2b(candidate.get("text", "").encode("utf-8"), digest_size=8).hexdigest()
+    return f"{query}\x00{candidate['id']}\x00{digest}"
+
+
+def prune(candidates: list[dict], keep_at_least: int) -> list[dict]:
+    """
+    Drops candidates whose cosine and BM25 scores are both far below the
+    best candidate's, and caps how many reach the cross-encoder.
+    """
+    if not candidates:
+        return []
+    mask = relevance_mask(candidates, settings.RERANK_MIN_RELATIVE_SCORE)
+    survivors = [c for i, (c, keep) in enumerate(zip(candidates, mask)) if i < keep_at_least or keep]
+    return survivors[: max(keep_at_least, settings.RERANK_MAX_CANDIDATES)]
+
+
+def _score_pairs(model, query: str, candidates: list[dict]) -> list[float]:
+    pairs = [(query, c.get("text") or c.get("snippet") or "") for c in candidates]
+    scores = model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+    for candidate, score in zip(candidates, scores):
+        rerank_cache.put(_cache_key(query, candidate), float(score))
+    return [float(s) for s in scores]
+
+
+def _sigmoid(x: float) -> float:
+    return 1.0 / (1.0 + math.exp(-x))
+
+
+async def rerank(query: str, candidates: list[dict], top_k: int) -> list[dict]:
+    """
+    Reorders retrieval candidates by cross-encoder relevance and returns the
+    best `top_k`. Falls back to the retrieval order when reranking is
+    disabled, the model is unavailable or the latency budget is exceeded.
+    """
+    if not settings.RERANK_ENABLED or len(candidates) <= 1:
+        return candidates[:top_k]
+    model = await registry.aget("reranker")
+    if model is None:
+        return candidates[:top_k]
+
+    survivors = prune(candidates, top_k)
+    logits: dict[str, float] = {}
+    missing = []
+    for candidate in survivors:
+        cached = rerank_cache.get(_cache_key(query, candidate))
+        if cached is None:
+            missing.append(candidate)
+        else:
+            logits[candidate["id"]] = cached
+
+    if missing:
+        scoring = asyncio.ensure_future(asyncio.to_thread(_score_pairs, model, query, missing))
+        try:
+            # shield: on timeout the pass keeps running and still fills the cache.
+            scores = await asyncio.wait_for(asyncio.shield(scoring), timeout=settings.RERANK_BUDGET_MS / 1000)
+        except asyncio.TimeoutError:
+            logging.warning(f"[Rerank Service] Missed the {settings.RERANK_BUDGET_MS}ms budget; keeping retrieval order.")
+            return candidates[:top_k]
+        except Exception as e:
+            logging.error(f"[Rerank Service] Reranking failed: {e}", exc_info=True)
+            return candidates[:top_k]
+        logits.update((c["id"], s) for c, s in zip(missing, scores))
+
+    reranked = []
+    for candidate in sorted(survivors, key=lambda c: logits[c["id"]], reverse=True)[:top_k]:
+        result = dict(candidate, score=round(_sigmoid(logits[candidate["id"]]), 6))
+        result["metadata"] = dict(candidate.get("metadata") or {}, retrieval_score=candidate.get("score"),
+                                  rerank_score=logits[candidate["id"]])
+        reranked.append(result)
+    logging.info(f"[Rerank Service] Reranked {len(survivors)}/{len(candidates)} candidates ({len(missing)} scored).")
+    return reranked
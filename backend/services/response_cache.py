@@ -0,0 +1,144 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import settings
+from utils.metrics import CACHE_HITS, CACHE_MISSES
+
+# --- Two-tier answer cache ---
+# Tier 1 (exact): keyed by the normalised query plus the sentiment label and
+# tone, since both change the prompt.
+# Tier 2 (semantic): reuses an answer when a new query embedding is within a
+# cosine threshold of a cached one *and* retrieval returned the same source ids,
+# so a paraphrase only hits when it would have been answered from the same context.
+# Both tiers share one LRU order and TTL; re-ingesting a chunk drops every
+# answer that was built from it.
+
+_PUNCT = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    return _WHITESPACE.sub(" ", _PUNCT.sub(" ", text.lower())).strip()
+
+
+class _Entry:
+    __slots__ = ("answer", "source_ids", "embedding", "expires_at")
+
+    def __init__(self, answer: str, source_ids: tuple, embedding: np.ndarray | None, expires_at: float):
+        self.answer = answer
+        self.source_ids = source_ids
+        self.embedding = embedding
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = settings.RESPONSE_CACHE_SIZE,
+        ttl_s: float = settings.RESPONSE_CACHE_TTL_S,
+        similarity_threshold: float = settings.RESPONSE_CACHE_SIM_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHE_HITS.add_source(lambda: self.hits_exact + self.hits_semantic, cache="response")
+        CACHE_MISSES.add_source(lambda: self.misses, cache="response")
+
+    @staticmethod
+    def make_key(query: str, sentiment_label: str, tone: str | None) -> tuple:
+        return (normalize_query(query), sentiment_label, tone)
+
+    def get_exact(self, key: tuple, source_ids: tuple) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            # Newly ingested articles can change what a query retrieves.
+            if entry is None or entry.source_ids != source_ids:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits_exact += 1
+            return entry.answer
+
+    def get_semantic(self, key: tuple, embedding: np.ndarray | None, source_ids: tuple) -> str | None:
+        """
+        Best cached answer whose embedding is close enough to `embedding` and
+        whose sources match. Entries must share the sentiment label and tone.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if e.embedding is not None and e.source_ids == source_ids
+                and k[1:] == key[1:] and e.expires_at >= now
+            ]
+            if candidates:
+                matrix = np.stack([e.embedding for _, e in candidates])
+                query = embedding / (np.linalg.norm(embedding) or 1.0)
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    best_key, best_entry = candidates[best]
+                    self._entries.move_to_end(best_key)
+                    self.hits_semantic += 1
+                    return best_entry.answer
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, answer: str, source_ids: tuple, embedding: np.ndarray | None = None):
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding = embedding / (np.linalg.norm(embedding) or 1.0)
+        with self._lock:
+            self._entries[key] = _Entry(answer, source_ids, embedding, time.monotonic() + self.ttl_s)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_sources(self, chunk_ids) -> int:
+        """
+        Drops every answer built from any of the given chunk ids.
+        """
+        chunk_ids = set(chunk_ids)
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if chunk_ids.intersection(e.source_ids)]
+            for k in stale:
+                del self._entries[k]
+        if stale:
+            logging.info(f"[Response Cache] Invalidated {len(stale)} cached answers.")
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits_exact + self.hits_semantic + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits_exact": self.hits_exact,
+            "hits_semantic": self.hits_semantic,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits_exact + self.hits_semantic) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Process-wide cache used by rag_services.
+response_cache = ResponseCache()
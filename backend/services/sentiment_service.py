@@ -1,36 +1,139 @@
+import asyncio
 import logging
-from transformers import pipeline
 
-# --- Initialize the Sentiment Analysis Pipeline ---
+from config import settings
+from utils.inference_scheduler import MicroBatchScheduler
+from utils.model_registry import registry
+from utils.result_cache import ResultCache
+from utils.tracing import span
+
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+
+# --- Sentiment Analysis Pipeline (loaded lazily) ---
 # This uses the Hugging Face transformers library to load a pre-trained model.
-# The model will be downloaded automatically the first time this code is run.
-try:
+# The model will be downloaded automatically the first time it is used.
+def _load_pipeline():
+    if settings.INFERENCE_BACKEND == "onnx":
+        from utils.onnx_backend import OnnxTextClassifier
+
+        return OnnxTextClassifier()
+
+    from transformers import pipeline
+
     # This specific model is good for general-purpose sentiment analysis.
-    sentiment_analyzer = pipeline(
+    return pipeline(
         "sentiment-analysis", 
-        model="distilbert-base-uncased-finetuned-sst-2-english"
+        model=SENTIMENT_MODEL
     )
-    logging.info("Sentiment analysis model loaded successfully.")
-except Exception as e:
-    logging.error(f"Failed to load sentiment analysis model: {e}", exc_info=True)
-    sentiment_analyzer = None
+
+
+registry.register("sentiment", _load_pipeline)
+
+
+def model_version() -> str:
+    """
+    Identifies the model and backend producing results; part of every cache key.
+    """
+    backend = settings.INFERENCE_BACKEND
+    if backend == "onnx" and settings.ONNX_QUANTIZE:
+        backend += "+int8"
+    return f"{SENTIMENT_MODEL}:{backend}"
+
+
+def get_analyzer():
+    """
+    The transformers pipeline, loaded on first use (None if loading failed).
+    """
+    return registry.get("sentiment")
+
+
+def _clip(text: str) -> str:
+    # The model only sees the first 512 tokens anyway; clipping characters first
+    # keeps the tokenizer from chewing through megabyte-long transcripts.
+    return text[: settings.SENTIMENT_MAX_CHARS]
+
+
+def _classify_batch(texts: list[str]) -> list[dict]:
+    # One pipeline call for the whole micro-batch; truncation keeps long messages within the model limit.
+    return get_analyzer()([_clip(t) for t in texts], batch_size=len(texts), truncation=True)
+
+
+def _classify_sorted(texts: list[str], batch_size: int) -> list[dict]:
+    """
+    Classifies texts in length buckets: inputs are sorted by length so each
+    batch pads to a similar size, then results are put back in input order.
+    """
+    analyzer = get_analyzer()
+    results: list[dict | None] = [None] * len(texts)
+    order = sorted((i for i in range(len(texts)) if texts[i].strip()), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        outputs = analyzer([_clip(texts[i]) for i in bucket], batch_size=len(bucket), truncation=True)
+        for i, output in zip(bucket, outputs):
+            results[i] = output
+    # Empty messages carry no sentiment.
+    return [r if r is not None else {"label": "NEUTRAL", "score": 0.5} for r in results]
+
+
+# Shared scheduler: concurrent analyze() calls are classified in one forward pass.
+sentiment_scheduler = MicroBatchScheduler("sentiment", _classify_batch)
+
+# Repeated messages ("thanks", "ok", ...) skip the model entirely.
+sentiment_cache = ResultCache("sentiment", version=model_version)
+
 
 # This is the 'analyze' function that was missing.
 async def analyze(text: str) -> dict:
     """
     Analyzes the sentiment of a given text using the loaded pipeline.
     """
-    if not sentiment_analyzer:
+    cached = await sentiment_cache.aget(text)
+    if cached is not None:
+        return dict(cached)
+
+    if not await registry.aget("sentiment"):
         logging.error("Sentiment analyzer is not available.")
         # Return a neutral fallback response if the model failed to load
         return {"label": "NEUTRAL", "score": 0.5}
 
     try:
-        # The pipeline returns a list with a single dictionary, e.g., [{'label': 'POSITIVE', 'score': 0.999}]
-        results = sentiment_analyzer(text)
-        # We return the first result from the list.
-        return results[0]
+        # Runs on the scheduler's worker thread as part of a batch, e.g. {'label': 'POSITIVE', 'score': 0.999}
+        with span("sentiment_model"):
+            result = await sentiment_scheduler.infer(text)
+        await sentiment_cache.aput(text, result)
+        # A copy, so that callers cannot change the cached entry.
+        return dict(result)
     except Exception as e:
         logging.error(f"An error occurred during sentiment analysis: {e}", exc_info=True)
         return {"label": "ERROR", "score": 0.0}
 
+
+async def batch_analyze(texts: list[str], batch_size: int = None) -> list[dict]:
+    """
+    Analyzes many texts at once (bulk jobs, backfills). Runs in a worker
+    thread with length-bucketed batches; results are in input order.
+    """
+    if not texts:
+        return []
+    if not await registry.aget("sentiment"):
+        logging.error("Sentiment analyzer is not available.")
+        return [{"label": "NEUTRAL", "score": 0.5} for _ in texts]
+
+    batch_size = batch_size or settings.SENTIMENT_BATCH_SIZE
+    # Cache lookups may hit the SQLite tier, so they run off the event loop too.
+    results = await asyncio.to_thread(lambda: [sentiment_cache.get(t) for t in texts])
+    missing = [i for i, r in enumerate(results) if r is None]
+    try:
+        if missing:
+            with span("sentiment_batch"):
+                computed = await asyncio.to_thread(_classify_sorted, [texts[i] for i in missing], batch_size)
+            for i, result in zip(missing, computed):
+                results[i] = result
+            await asyncio.to_thread(lambda: [sentiment_cache.put(texts[i], results[i]) for i in missing])
+        return [dict(r) for r in results]
+    except Exception as e:
+        logging.error(f"An error occurred during batch sentiment analysis: {e}", exc_info=True)
+        return [{"label": "ERROR", "score": 0.0} for _ in texts]
+
@@ -1,32 +1,77 @@
 import os
 import sys
+
 import pytest
+from fastapi.testclient import TestClient
 
 # Add backend root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.rag_services import rag_query
+from benchmarks import load_benchmark
+from config import settings
+from utils import lexical_index, vector_db
+from utils.model_registry import registry
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The app with fake models, a fake LLM and a small synthetic knowledge base."""
+    monkeypatch.setattr(registry, "_slots", dict(registry._slots))
+    monkeypatch.setattr(vector_db, "_default_index", None)
+    monkeypatch.setattr(lexical_index, "_default_index", None)
+    for name, value in (("SESSION_STORE_ENABLED", False), ("RESPONSE_CACHE_ENABLED", False), ("VECTOR_INDEX_PATH", "")):
+        monkeypatch.setattr(settings, name, value)
+    load_benchmark.install_fakes(
+        load_benchmark.parse_args(["--model-batch-ms", "0", "--model-item-ms", "0", "--llm-latency-ms", "0"])
+    )
+    load_benchmark.build_knowledge_base(25)
+
+    from main import app
+
+    return TestClient(app)
+
+
+def test_chat_respond_basic(client):
+    """The reply comes with sources, sentiment, escalation and stage timings."""
+    response = client.post("/chat/respond", json={"text": "How can I reset my account password?"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["reply"]
+    assert body["session_id"].startswith("sess_")
+    assert body["sources"] and all(s["id"] for s in body["sources"])
+    assert body["sentiment"]["label"] in ["POSITIVE", "NEGATIVE", "NEUTRAL"]
+    assert "predicted" in body["escalation"]
+    assert {"retrieval", "sentiment", "escalation", "llm"} <= set(body["timings_ms"])
+
+
+def test_chat_respond_with_sentiment_integration(client):
+    """A negative message is labelled as such and the session id is kept."""
+    response = client.post(
+        "/chat/respond",
+        json={"text": "I am really unhappy, this delay is unacceptable.", "session_id": "sess_test"},
+    )
 
+    body = response.json()
+    assert body["session_id"] == "sess_test"
+    assert body["sentiment"]["label"] == "NEGATIVE"
 
-def test_rag_query_basic():
-    """Test if RAG query returns all required keys."""
-    query = "How can I reset my account password?"
-    result = rag_query(query)
 
-    # Check required keys
-    assert "retrieved_articles" in result
-    assert "sentiment" in result
-    assert "ai_response" in result
+def test_article_search_ranks_matching_topic_first(client):
+    response = client.get("/articles/search", params={"q": "password reset login", "top_k": 3})
 
-    # Check types
-    assert isinstance(result["retrieved_articles"], list)
-    assert isinstance(result["sentiment"], dict)
-    assert isinstance(result["ai_response"], str)
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[0]["metadata"]["tags"] == ["account"]
 
 
-def test_rag_query_with_sentiment_integration():
-    """Test if sentiment label is one of expected values."""
-    query = "I am really unhappy with your service."
-    result = rag_query(query)
+def test_metrics_cover_pipeline_stages(client):
+    response = client.post("/chat/respond", json={"text": "Where is my parcel?"}, headers={"X-Request-ID": "trace-1"})
 
-    assert result["sentiment"]["label"] in ["POSITIVE", "NEGATIVE", "NEUTRAL"]
+    assert response.headers["x-request-id"] == "trace-1"
+    assert "retrieval;dur=" in response.headers["server-timing"]
+    text = client.get("/metrics").text
+    for sample in ('stage_duration_seconds_count{stage="retrieval"}', 'stage_duration_seconds_count{stage="llm"}',
+                   'llm_tokens_total{backend="fake",kind="completion"}', 'batch_size_count{component="embedding"}',
+                   'cache_hits_total{cache="sentiment"}', 'http_requests_total{method="POST",route="/chat/respond",status="200"}'):
+        assert sample in text
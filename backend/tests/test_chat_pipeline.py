@@ -0,0 +1,37 @@
+import asyncio
+import os
+import sys
+import time
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.chat_pipeline import Stage, run_stages
+
+
+def test_stages_run_concurrently():
+    """Total latency is bounded by the slowest stage, not the sum."""
+    async def sleepy(value):
+        await asyncio.sleep(0.1)
+        return value
+
+    start = time.perf_counter()
+    result = asyncio.run(run_stages([Stage(f"s{i}", lambda i=i: sleepy(i), deadline_s=1) for i in range(3)]))
+
+    assert time.perf_counter() - start < 0.25
+    assert [result[f"s{i}"] for i in range(3)] == [0, 1, 2]
+    assert set(result.timings_ms) == {"s0", "s1", "s2", "total"}
+
+
+def test_missed_deadline_uses_fallback():
+    """A stage that misses its deadline degrades to its fallback value."""
+    async def slow():
+        await asyncio.sleep(1)
+        return "late"
+
+    result = asyncio.run(run_stages([
+        Stage("sentiment", slow, deadline_s=0.01, fallback={"label": "NEUTRAL"}),
+    ]))
+
+    assert result["sentiment"] == {"label": "NEUTRAL"}
+    assert result.degraded == ["sentiment"]
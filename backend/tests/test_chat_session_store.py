@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+import threading
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from db.repositories import SessionRepository
+from services.chat_session_store import ChatSessionStore
+
+
+class FakeCollection:
+    def __init__(self):
+        self.calls = []
+
+    def bulk_write(self, operations, ordered=True):
+        self.calls.append((operations, ordered))
+
+
+def test_turns_are_batched_per_session_and_flushed_on_stop():
+    """Queued turns become one unordered bulk_write with one upsert per session."""
+    collection = FakeCollection()
+    store = ChatSessionStore(SessionRepository(lambda: {"chat_sessions": collection}), max_queue=100, batch_size=50, flush_interval_s=10)
+
+    async def scenario():
+        for i in range(3):
+            await store.record_turn("s1", {"query": f"q{i}", "reply": "r"})
+        await store.record_turn("s2", {"query": "other", "reply": "r"}, customer_id="c2")
+        await store.stop()
+
+    asyncio.run(scenario())
+
+    assert len(collection.calls) == 1
+    operations, ordered = collection.calls[0]
+    assert ordered is False
+    by_session = {op._filter["session_id"]: op._doc for op in operations}
+    assert [t["query"] for t in by_session["s1"]["$push"]["turns"]["$each"]] == ["q0", "q1", "q2"]
+    assert by_session["s1"]["$push"]["turns"]["$slice"] == -settings.SESSION_MAX_TURNS
+    assert by_session["s2"]["$setOnInsert"]["customer_id"] == "c2"
+    assert store.stats()["written"] == 4
+
+
+def test_full_queue_applies_backpressure_then_drops():
+    """While a write is stuck, producers wait briefly for space and then drop."""
+    release = threading.Event()
+
+    class SlowCollection(FakeCollection):
+        def bulk_write(self, operations, ordered=True):
+            release.wait(5)
+            super().bulk_write(operations, ordered)
+
+    collection = SlowCollection()
+    store = ChatSessionStore(SessionRepository(lambda: {"chat_sessions": collection}), max_queue=1, batch_size=1, flush_interval_s=0, enqueue_timeout_s=0.05)
+
+    async def scenario():
+        accepted = [await store.record_turn("s", {"query": str(i)}) for i in range(4)]
+        release.set()
+        await store.stop()
+        return accepted
+
+    assert asyncio.run(scenario()) == [True, True, False, False]
+    assert store.stats()["dropped"] == 2
+    assert store.stats()["written"] == 2
+
+
+def test_store_restarts_on_a_new_event_loop():
+    """A second lifespan (new loop, same process) gets a fresh queue and flusher."""
+    collection = FakeCollection()
+    store = ChatSessionStore(SessionRepository(lambda: {"chat_sessions": collection}), max_queue=10, batch_size=10, flush_interval_s=0)
+
+    async def lifespan(query):
+        store.start()
+        await store.record_turn("s", {"query": query})
+        await asyncio.sleep(0.01)
+        await store.stop()
+
+    asyncio.run(lifespan("first"))
+    asyncio.run(lifespan("second"))
+
+    assert store.stats()["written"] == 2 and store.stats()["failed"] == 0
@@ -0,0 +1,32 @@
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.chunking import chunk_text, chunk_article
+
+
+def test_chunks_overlap_and_cover_text():
+    """Consecutive chunks share `overlap` words and together cover every word."""
+    words = [f"w{i}" for i in range(25)]
+    chunks = chunk_text(" ".join(words), chunk_size=10, overlap=3)
+
+    assert chunks[0].split() == words[:10]
+    assert chunks[1].split()[:3] == words[7:10]
+    assert chunks[-1].split()[-1] == "w24"
+
+
+def test_chunk_article_ids_are_stable():
+    """Re-chunking the same article yields the same chunk ids."""
+    article = {"title": "Refunds", "content": "word " * 500, "url": "https://help.example.com/refunds"}
+    first = chunk_article(article, chunk_size=100, overlap=20)
+    second = chunk_article(article, chunk_size=100, overlap=20)
+
+    assert [c["id"] for c in first] == [c["id"] for c in second]
+    assert first[0]["embed_text"].startswith("Refunds\n")
+
+
+def test_empty_content_has_no_chunks():
+    """Articles without content produce no chunks."""
+    assert chunk_text("   ") == []
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.context_builder import ContextBuilder, estimate_tokens, relevance_mask
+
+
+def _unit(*values):
+    v = np.array(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_near_duplicates_are_dropped_and_order_follows_score():
+    builder = ContextBuilder(budget_tokens=1000, dedup_threshold=0.95, relative_score_floor=0)
+    sources = [
+        {"id": "b", "title": "Refunds", "text": "Refunds take 5 days.", "score": 0.5},
+        {"id": "a", "title": "Refunds", "text": "Refunds take five days.", "score": 0.9},
+        {"id": "c", "title": "Shipping", "text": "Orders ship in 2 days.", "score": 0.7},
+    ]
+    vectors = {"a": _unit(1, 0, 0), "b": _unit(1, 0.05, 0), "c": _unit(0, 1, 0)}
+
+    result = builder.build(sources, vectors)
+
+    assert [s["id"] for s in result.used] == ["a", "c"]
+    assert result.duplicates == 1
+    assert result.text.startswith("Title: Refunds\nContent: Refunds take five days.")
+
+
+def test_context_fits_the_token_budget():
+    builder = ContextBuilder(budget_tokens=150, relative_score_floor=0, min_chunk_tokens=20)
+    sources = [{"id": str(i), "title": f"T{i}", "text": f"word{i} " * 60, "score": 1.0 - i / 10} for i in range(5)]
+
+    result = builder.build(sources)
+
+    assert result.tokens <= 150
+    assert result.text.endswith(" ...")  # the second chunk is cut to fit
+    assert len(result.used) == 2 and result.over_budget == 3
+    assert result.naive_tokens > 5 * estimate_tokens("word0 " * 60)
+    assert builder.stats()["tokens_saved"] == result.naive_tokens - result.tokens
+
+
+def test_adaptive_top_k_keeps_only_competitive_hits():
+    builder = ContextBuilder(relative_score_floor=0.5, min_sources=1)
+    sources = [{"id": "a", "score": 0.033}, {"id": "b", "score": 0.02}, {"id": "c", "score": 0.01}]
+
+    assert [s["id"] for s in builder.adaptive_cutoff(sources)] == ["a", "b"]
+
+
+@pytest.fixture
+def hybrid_search(monkeypatch):
+    """search_articles over a synthetic KB plus one article on a topic nothing else covers."""
+    from benchmarks import load_benchmark
+    from config import settings
+    from services.article_service import search_articles
+    from utils import lexical_index, vector_db
+    from utils.chunking import chunk_article
+    from utils.embedding_utils import encode_batch
+    from utils.model_registry import registry
+
+    monkeypatch.setattr(registry, "_slots", dict(registry._slots))
+    monkeypatch.setattr(vector_db, "_default_index", None)
+    monkeypatch.setattr(lexical_index, "_default_index", None)
+    monkeypatch.setattr(settings, "VECTOR_INDEX_PATH", "")
+    load_benchmark.install_fakes(
+        load_benchmark.parse_args(["--model-batch-ms", "0", "--model-item-ms", "0", "--llm-latency-ms", "0"])
+    )
+    load_benchmark.build_knowledge_base(200)
+
+    chunks = chunk_article({"article_id": "zephyr", "title": "Zephyr blender warranty",
+                            "content": "zephyr blender warranty claim needs the serial number and receipt " * 5})
+    vector_db._default_index.upsert([c["id"] for c in chunks], encode_batch([c["embed_text"] for c in chunks]),
+                                    [{"article_id": c["article_id"], "title": c["title"], "text": c["text"]} for c in chunks])
+    lexical_index._default_index.upsert([c["id"] for c in chunks], [c["embed_text"] for c in chunks])
+    return lambda query, top_k: asyncio.run(search_articles(query, top_k=top_k))
+
+
+def test_adaptive_top_k_on_hybrid_search_results(hybrid_search):
+    """Fused RRF scores barely vary, so the cutoff uses the cosine and BM25 components."""
+    hits = hybrid_search("zephyr blender warranty claim", top_k=10)
+    assert len(hits) == 10
+    # Every hit is within the floor on the fused score alone.
+    assert hits[-1]["score"] >= 0.4 * hits[0]["score"]
+
+    kept = ContextBuilder(relative_score_floor=0.4, min_sources=1).adaptive_cutoff(hits)
+    assert [h["metadata"]["article_id"] for h in kept] == ["zephyr"]
+
+
+def test_relevance_mask_keeps_hits_strong_on_either_retriever():
+    def hit(vector_score, bm25_score):
+        return {"score": 0.016, "metadata": {"vector_score": vector_score, "bm25_score": bm25_score}}
+
+    sources = [hit(0.8, 10.0), hit(0.1, 9.0), hit(0.7, None), hit(0.2, 1.0)]
+    assert relevance_mask(sources, 0.5) == [True, True, True, False]
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import embedding_utils
+from utils.embedding_utils import EmbeddingCache
+
+
+class FakeEncoder:
+    """Deterministic 4-dim embeddings; records how many texts each call encodes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        self.calls.append(len(batch))
+        vectors = np.array([[len(t), t.count("a"), t.count("e"), 1.0] for t in batch], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+
+def _setup(monkeypatch, max_entries=100):
+    model = FakeEncoder()
+    monkeypatch.setattr(embedding_utils, "get_model", lambda: model)
+    monkeypatch.setattr(embedding_utils, "query_embedding_cache", EmbeddingCache(max_entries))
+    return model
+
+
+def test_get_embeddings_returns_cached_readonly_array(monkeypatch):
+    model = _setup(monkeypatch)
+
+    first = embedding_utils.get_embeddings("Where is my order?")
+    second = embedding_utils.get_embeddings("  where is MY order?")
+
+    assert isinstance(first, np.ndarray) and first.dtype == np.float32
+    assert second is first
+    assert not first.flags.writeable
+    assert model.calls == [1]
+
+
+def test_get_embeddings_many_encodes_only_misses_once(monkeypatch):
+    model = _setup(monkeypatch)
+    embedding_utils.get_embeddings("refund policy")
+
+    matrix = embedding_utils.get_embeddings_many(["refund policy", "track order", "Track order", "cancel"])
+
+    assert matrix.shape == (4, 4)
+    assert model.calls == [1, 2]
+    np.testing.assert_array_equal(matrix[1], matrix[2])
+    np.testing.assert_array_equal(matrix[0], embedding_utils.get_embeddings("refund policy"))
+    assert embedding_utils.get_embeddings_many([]).shape == (0, embedding_utils.settings.EMBEDDING_DIM)
+
+
+def test_cache_is_bounded_lru():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("a", np.ones(3))
+    cache.put("b", np.ones(3))
+    cache.get("a")
+    cache.put("c", np.ones(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_embed_async_skips_scheduler_on_hit(monkeypatch):
+    _setup(monkeypatch)
+    calls = []
+
+    async def infer(text):
+        calls.append(text)
+        return np.array([1.0, 0.0, 0.0, 0.0], dtype=np.float32)
+
+    async def aget(name):
+        return object()
+
+    monkeypatch.setattr(embedding_utils.embedding_scheduler, "infer", infer)
+    monkeypatch.setattr(embedding_utils.registry, "aget", aget)
+
+    async def run():
+        return await embedding_utils.embed_async("hello"), await embedding_utils.embed_async("Hello ")
+
+    first, second = asyncio.run(run())
+    assert calls == ["hello"]
+    assert second is first
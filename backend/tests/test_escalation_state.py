@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import escalation_service
+from services.escalation_state import SessionState, SessionStore
+
+
+def test_conversation_signals_raise_the_score():
+    """A repeated, increasingly negative complaint escalates even without a trigger phrase."""
+    store = SessionStore(max_sessions=10, ttl_s=60, persist=False)
+    escalation_service.session_store, original = store, escalation_service.session_store
+    try:
+        first = asyncio.run(escalation_service.predict("My order still has not arrived", session_id="s1"))
+        negative = {"label": "NEGATIVE", "score": 0.99}
+        message = {"score": 0.0, "reasons": []}
+        for _ in range(3):
+            last = asyncio.run(escalation_service.observe("s1", "My order still has not arrived!", message, negative))
+    finally:
+        escalation_service.session_store = original
+
+    assert first["predicted"] is False
+    assert last["predicted"] is True
+    assert "repeated message x3" in last["reasons"]
+    assert last["session"]["turns"] == 4
+
+
+def test_recurring_rule_is_counted_once_per_message():
+    state = SessionState("s")
+    state.update("I want a refund", None, ["refund"])
+    state.update("where is my refund", None, ["refund"])
+
+    result = state.assess({"score": 0.9, "reasons": ["refund"]}, threshold=0.85)
+
+    assert state.rule_counts == {"refund": 2}
+    assert result["reasons"] == ["refund"]
+    assert result["score"] > 0.9
+
+
+def test_store_is_bounded_and_expires_idle_sessions():
+    store = SessionStore(max_sessions=2, ttl_s=60, persist=False)
+    for sid in ("a", "b", "c"):
+        asyncio.run(store.get(sid))
+    assert len(store) == 2 and store.evictions == 1
+
+    expiring = SessionStore(max_sessions=10, ttl_s=-1, persist=False)
+    asyncio.run(expiring.get("a"))
+    asyncio.run(expiring.get("b"))
+    assert len(expiring) == 1
+
+
+def test_short_acknowledgements_are_not_repeat_contacts():
+    """Four negative-labelled "ok"s neither count as repeats nor read as a worsening trend."""
+    state = SessionState("s")
+    negative = {"label": "NEGATIVE", "score": 0.8}
+    for _ in range(4):
+        state.update("ok", negative, [])
+    result = state.assess({"score": 0.0, "reasons": []}, threshold=0.5)
+
+    assert state.repeat_contacts == 0
+    assert result["predicted"] is False
+    assert result["reasons"] == []
+
+    polite = SessionState("p")
+    for _ in range(4):
+        polite.update("Thanks!", {"label": "POSITIVE", "score": 0.9}, [])
+    assert polite.assess({"score": 0.0, "reasons": []}, threshold=0.5)["score"] == 0.0
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.feedback_stats import FeedbackAggregates, hour_bucket_id, summarize
+
+
+def test_rolling_windows_weight_the_oldest_bucket():
+    """At hh:30 the 1h window counts the current bucket plus half of the previous one."""
+    now = datetime(2026, 1, 1, 12, 30)
+    buckets = {
+        hour_bucket_id(now): {"count": 2, "rating_sum": 10},
+        hour_bucket_id(now - timedelta(hours=1)): {"count": 4, "rating_sum": 4},
+        hour_bucket_id(now - timedelta(hours=30)): {"count": 100, "rating_sum": 100},
+    }
+    totals = {"count": 7, "rating_sum": 21, "histogram": {"5": 3}, "recent": [1, 5, 3]}
+
+    stats = summarize(totals, buckets, now)
+
+    assert stats["total"] == 7 and stats["average_rating"] == 3.0
+    assert stats["last_10"] == 3.0
+    assert stats["histogram"]["5"] == 3 and stats["histogram"]["1"] == 0
+    assert stats["windows"]["hour"] == {"count": 4, "average_rating": 3.0}
+    assert stats["windows"]["day"] == {"count": 6, "average_rating": 2.33}
+
+
+def test_incremental_updates_match_a_rebuild():
+    mongomock = pytest.importorskip("mongomock")
+    from db import mongo_client
+
+    mongo_client.set_client(mongomock.MongoClient())
+    aggregates = FeedbackAggregates(snapshot_ttl_s=60)
+    now = datetime.utcnow()
+
+    async def scenario():
+        for i, rating in enumerate([5, 4, 1] + [3] * 10):
+            ts = now - timedelta(minutes=12 - i)
+            await aggregates.feedback_repository.add({"session_id": "s", "rating": rating, "created_at": ts})
+            await aggregates.record(rating, ts)
+        incremental = await aggregates.snapshot(now)
+        rebuilt = await aggregates.rebuild()
+        # The rebuild is swapped in by renaming a staging collection, which keeps the TTL index.
+        db = mongo_client.get_db()
+        assert "feedback_stats_rebuild" not in db.list_collection_names()
+        assert "expires_at_1" in db["feedback_stats"].index_information()
+        return incremental, rebuilt
+
+    try:
+        incremental, rebuilt = asyncio.run(scenario())
+    finally:
+        asyncio.run(mongo_client.close())
+
+    assert incremental["total"] == 13
+    assert incremental["last_10"] == 3.0
+    assert incremental["histogram"]["3"] == 10
+    for key in ("total", "average_rating", "last_10", "histogram"):
+        assert incremental[key] == rebuilt[key]
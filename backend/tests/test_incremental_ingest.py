@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from services import article_service
+from utils.lexical_index import LexicalIndex
+from utils.vector_db import VectorIndex
+
+
+class _FakeKnowledgeBase:
+    def __init__(self):
+        self.upserted: list[str] = []
+        self.deleted: list[str] = []
+
+    async def upsert_chunks(self, chunks, ingested_at):
+        self.upserted.extend(c["id"] for c in chunks)
+
+    async def delete_chunks(self, ids):
+        self.deleted.extend(ids)
+
+
+@pytest.fixture
+def ingest(monkeypatch):
+    index = VectorIndex(dim=8)
+    lexical = LexicalIndex()
+    encoded: list[str] = []
+
+    def fake_encode(texts, batch_size=64):
+        encoded.extend(texts)
+        rng = np.random.default_rng(len(encoded))
+        return rng.standard_normal((len(texts), 8)).astype(np.float32)
+
+    monkeypatch.setattr(settings, "CHUNK_SIZE_WORDS", 20)
+    monkeypatch.setattr(settings, "CHUNK_OVERLAP_WORDS", 5)
+    monkeypatch.setattr(settings, "VECTOR_COMPACT_TOMBSTONE_RATIO", 10.0)
+    monkeypatch.setattr(article_service, "get_index", lambda: index)
+    monkeypatch.setattr(article_service, "get_lexical_index", lambda: lexical)
+    monkeypatch.setattr(article_service, "save_index", lambda: None)
+    monkeypatch.setattr(article_service, "encode_batch", fake_encode)
+    monkeypatch.setattr(article_service, "knowledge_base", _FakeKnowledgeBase())
+    monkeypatch.setattr(article_service, "model_version", lambda: "model-a")
+
+    def run(articles, sync=False):
+        encoded.clear()
+        asyncio.run(article_service.ingest_articles(articles, sync=sync))
+        return len(encoded)
+
+    run.index = index
+    return run
+
+
+def _article(article_id, words=50, source="helpdesk", **fields):
+    content = " ".join(f"{article_id}w{i}" for i in range(words))
+    return {"article_id": article_id, "title": article_id.upper(), "content": content, "source": source, **fields}
+
+
+def test_unchanged_articles_are_not_re_embedded(ingest):
+    articles = [_article("a"), _article("b")]
+    first = ingest(articles)
+    assert first == len(ingest.index) > 0
+
+    assert ingest(articles) == 0
+
+
+def test_only_changed_chunks_are_re_embedded(ingest):
+    ingest([_article("a"), _article("b")])
+    edited = _article("a")
+    edited["content"] = edited["content"].replace("aw45", "edited")
+
+    assert ingest([edited, _article("b")]) == 1
+
+
+def test_metadata_change_updates_payload_without_embedding(ingest):
+    ingest([_article("a")])
+    assert ingest([_article("a", url="https://help.example.com/a")]) == 0
+    assert ingest.index.get_payload("a:0")["url"] == "https://help.example.com/a"
+
+
+def test_shrunk_article_tombstones_its_tail(ingest):
+    ingest([_article("a", words=80)])
+    before = len(ingest.index)
+
+    ingest([_article("a", words=20)])
+    assert len(ingest.index) == 1 < before
+    assert "a:1" not in ingest.index
+    assert ingest.index.tombstone_count == before - 1
+
+
+def test_sync_removes_articles_missing_from_their_source(ingest):
+    ingest([_article("a"), _article("b"), _article("c", source="other")])
+
+    ingest([_article("a")], sync=True)
+    articles = {ingest.index.get_payload(i)["article_id"] for i in ingest.index.ids()}
+    assert articles == {"a", "c"}
+
+
+def test_model_version_change_re_embeds_everything(ingest, monkeypatch):
+    ingest([_article("a"), _article("b")])
+    monkeypatch.setattr(article_service, "model_version", lambda: "model-b")
+
+    assert ingest([_article("a"), _article("b")]) == len(ingest.index)
+
+
+def test_deleted_article_is_compacted_in_the_background(ingest, monkeypatch):
+    ingest([_article("a"), _article("b")])
+    monkeypatch.setattr(settings, "VECTOR_COMPACT_TOMBSTONE_RATIO", 0.1)
+
+    async def delete_and_wait():
+        removed = await article_service.delete_articles(["b"])
+        await article_service._compaction
+        return removed
+
+    assert asyncio.run(delete_and_wait()) > 0
+    assert ingest.index.tombstone_count == 0
+    assert {ingest.index.get_payload(i)["article_id"] for i in ingest.index.ids()} == {"a"}
@@ -0,0 +1,40 @@
+import asyncio
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.inference_scheduler import MicroBatchScheduler
+
+
+def test_concurrent_calls_are_batched_in_order():
+    """Concurrent callers share batches and each gets its own result back."""
+    batch_sizes = []
+
+    def double(items):
+        batch_sizes.append(len(items))
+        return [i * 2 for i in items]
+
+    scheduler = MicroBatchScheduler("test", double, max_batch_size=8, max_wait_ms=20)
+
+    async def run():
+        return await asyncio.gather(*(scheduler.infer(i) for i in range(20)))
+
+    assert asyncio.run(run()) == [i * 2 for i in range(20)]
+    assert max(batch_sizes) == 8
+    assert len(batch_sizes) < 20
+
+
+def test_batch_errors_propagate_to_every_caller():
+    """A failing forward pass fails all futures in that batch."""
+    def boom(items):
+        raise ValueError("model exploded")
+
+    scheduler = MicroBatchScheduler("boom", boom, max_batch_size=4, max_wait_ms=1)
+    future = scheduler.submit("x")
+    try:
+        future.result(timeout=2)
+        assert False, "expected an exception"
+    except ValueError as e:
+        assert "exploded" in str(e)
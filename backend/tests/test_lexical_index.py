@@ -0,0 +1,35 @@
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_compound_identifiers():
+    """Error codes are indexed whole and by their parts."""
+    assert tokenize("Got ERR-404 on SKU_12") == ["got", "err-404", "err", "404", "on", "sku_12", "sku", "12"]
+
+
+def test_bm25_finds_error_code_and_respects_deletes():
+    """An exact error code ranks its chunk first; deleted chunks disappear."""
+    index = LexicalIndex()
+    index.upsert(
+        ["a", "b", "c"],
+        ["How to reset your password", "Error ERR-404 means the page was not found", "Refund policy and timelines"],
+    )
+
+    assert index.search("ERR-404", top_k=3)[0][0] == "b"
+    index.delete(["b"])
+    assert index.search("ERR-404", top_k=3) == []
+
+    index.compact()
+    assert index.search("refund", top_k=1)[0][0] == "c"
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Ids ranked by both retrievers outrank ids ranked by only one."""
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]])
+    assert fused[0][0] == "y"
+    assert {chunk_id for chunk_id, _ in fused} == {"x", "y", "z", "w"}
@@ -0,0 +1,39 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llm_client import LLMClient, LLMError, FakeBackend
+
+
+def test_transient_failures_are_retried():
+    """Injected transient failures are retried until the backend succeeds."""
+    backend = FakeBackend(fail_times=2, reply="hello")
+    client = LLMClient(backend, max_retries=2, backoff_base_s=0.001)
+
+    assert asyncio.run(client.generate("hi")) == "hello"
+    assert backend.calls == 3
+
+
+def test_timeout_raises_llm_error():
+    """A backend slower than the timeout fails with LLMError once retries run out."""
+    client = LLMClient(FakeBackend(latency_s=0.2), timeout_s=0.01, max_retries=1, backoff_base_s=0.001)
+
+    with pytest.raises(LLMError):
+        asyncio.run(client.generate("hi"))
+
+
+def test_stream_yields_the_full_reply():
+    """Streamed fragments concatenate to the complete reply."""
+    client = LLMClient(FakeBackend(reply="one two three"))
+
+    async def collect():
+        return [fragment async for fragment in client.stream("hi")]
+
+    fragments = asyncio.run(collect())
+    assert len(fragments) == 3
+    assert "".join(fragments) == "one two three"
@@ -0,0 +1,76 @@
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.metrics import MetricsRegistry
+from utils.tracing import RequestContextMiddleware, current_request_id, span
+
+
+def test_render_counters_histograms_and_callbacks():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    depth = registry.callback("queue_depth", "Depth.", ("queue",))
+    requests.inc(route="/a")
+    requests.inc(2, route="/a")
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, route="/a")
+    depth.add_source(lambda: 7, queue="q")
+    depth.add_source(lambda: 3, queue="q")  # replaces the first source
+
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'queue_depth{queue="q"} 3' in text
+    assert registry.counter("requests_total", "Requests.", ("route",)) is requests
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        with span("lookup"):
+            pass
+        return {"item_id": item_id, "request_id": current_request_id()}
+
+    return app
+
+
+def test_middleware_assigns_request_ids_and_server_timing():
+    client = TestClient(_app())
+
+    generated = client.get("/items/1")
+    forwarded = client.get("/items/2", headers={"X-Request-ID": "abc-123"})
+    rejected = client.get("/items/3", headers={"X-Request-ID": "bad id\n"})
+
+    assert generated.headers["x-request-id"] == generated.json()["request_id"]
+    assert len(generated.headers["x-request-id"]) == 32
+    assert forwarded.headers["x-request-id"] == "abc-123" == forwarded.json()["request_id"]
+    assert rejected.headers["x-request-id"] != "bad id\n"
+    assert generated.headers["server-timing"].startswith("lookup;dur=")
+    assert current_request_id() is None
+
+
+def test_http_metrics_use_route_templates():
+    from utils.metrics import HTTP_REQUESTS
+
+    client = TestClient(_app())
+    before = HTTP_REQUESTS.value(method="GET", route="/items/{item_id}", status="200")
+    client.get("/items/10")
+    client.get("/items/11")
+
+    assert HTTP_REQUESTS.value(method="GET", route="/items/{item_id}", status="200") == before + 2
+    client.get("/nowhere")
+    assert HTTP_REQUESTS.value(method="GET", route="unmatched", status="404") >= 1
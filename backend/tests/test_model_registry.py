@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.model_registry import ModelRegistry
+
+
+def test_model_is_loaded_once_under_concurrency():
+    """Concurrent first calls share a single load."""
+    calls = []
+    registry = ModelRegistry()
+    registry.register("m", lambda: calls.append(1) or object())
+
+    threads = [threading.Thread(target=registry.get, args=("m",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert registry.is_loaded("m")
+
+
+def test_readiness_reports_failed_required_models():
+    """A failing required model keeps the registry not-ready and reports the error."""
+    def broken():
+        raise RuntimeError("weights missing")
+
+    registry = ModelRegistry()
+    registry.register("ok", lambda: "model")
+    registry.register("broken", broken)
+    registry.register("optional", broken, required=False)
+
+    assert not registry.is_ready()
+    registry.warm_up()
+
+    status = registry.status()
+    assert status["ready"] is False
+    assert status["models"]["broken"]["error"] == "weights missing"
+    assert registry.get("broken") is None
+
+
+def test_failed_model_is_retried_after_backoff():
+    """A failed load is retried once its backoff passes; readiness follows the load."""
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("download interrupted")
+        return "model"
+
+    registry = ModelRegistry(retry_backoff_s=60)
+    registry.register("m", flaky)
+
+    assert registry.get("m") is None
+    assert registry.get("m") is None  # still backing off
+    assert len(attempts) == 1 and registry.status()["models"]["m"]["failures"] == 1
+    assert registry.ready_at_s is None
+
+    registry._slots["m"].retry_at = 0.0  # backoff elapsed
+    assert registry.get("m") == "model"
+    assert registry.is_ready() and registry.ready_at_s is not None
+
+
+def test_readiness_probe_retries_due_models_in_the_background():
+    """retry_due reloads failed required models even when no request asks for them."""
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("gpu busy")
+        return "model"
+
+    registry = ModelRegistry(retry_backoff_s=0)
+    registry.register("m", flaky)
+    registry.warm_up()
+    assert not registry.is_ready()
+
+    assert registry.retry_due() == ["m"]
+    for t in [t for t in threading.enumerate() if t.name == "model-retry-m"]:
+        t.join()
+    assert registry.is_ready()
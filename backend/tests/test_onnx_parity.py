@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Needs the optional ONNX dependencies and the model weights; skipped otherwise.
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+transformers = pytest.importorskip("transformers")
+
+from utils.onnx_backend import OnnxSentenceEncoder, OnnxTextClassifier, SENTIMENT_MODEL
+
+TEXTS = [
+    "I love this product! It's amazing.",
+    "This is terrible and I hate it.",
+    "How do I reset my password?",
+    "My order ERR-404 never arrived and support keeps ignoring me.",
+]
+
+
+@pytest.mark.parametrize("quantize, min_cosine", [(False, 0.999), (True, 0.95)])
+def test_embeddings_match_sentence_transformers(quantize, min_cosine):
+    """ONNX embeddings point the same way as the PyTorch SentenceTransformer ones."""
+    from sentence_transformers import SentenceTransformer
+
+    reference = SentenceTransformer("all-MiniLM-L6-v2").encode(TEXTS, normalize_embeddings=True)
+    onnx = OnnxSentenceEncoder(quantize=quantize).encode(TEXTS)
+
+    cosines = (reference * onnx).sum(axis=1)
+    assert onnx.shape == reference.shape
+    assert np.all(cosines >= min_cosine)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_sentiment_labels_match_pipeline(quantize):
+    """ONNX sentiment returns the same labels as the transformers pipeline."""
+    reference = transformers.pipeline("sentiment-analysis", model=SENTIMENT_MODEL)(TEXTS)
+    onnx = OnnxTextClassifier(quantize=quantize)(TEXTS)
+
+    assert [r["label"] for r in onnx] == [r["label"] for r in reference]
+    if not quantize:
+        assert np.allclose([r["score"] for r in onnx], [r["score"] for r in reference], atol=1e-3)
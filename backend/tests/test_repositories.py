@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from pymongo import UpdateOne
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mongomock = pytest.importorskip("mongomock")
+
+from db import mongo_client
+from db.repositories import FeedbackRepository, KnowledgeBaseRepository, SessionRepository
+
+
+@pytest.fixture
+def mock_db():
+    mongo_client.set_client(mongomock.MongoClient())
+    yield mongo_client.get_db()
+    asyncio.run(mongo_client.close())
+
+
+@pytest.fixture
+def bulk_db(mock_db):
+    # Older mongomock releases cannot consume the bulk operations of newer pymongo.
+    try:
+        mock_db["probe"].bulk_write([UpdateOne({"_id": 1}, {"$set": {"x": 1}}, upsert=True)])
+    except TypeError:
+        pytest.skip("installed mongomock does not support this pymongo's bulk_write")
+    return mock_db
+
+
+def test_feedback_round_trip(mock_db):
+    feedback, sessions = FeedbackRepository(), SessionRepository()
+    mock_db["chat_sessions"].insert_one({"session_id": "s1", "turns": []})
+    now = datetime.utcnow()
+
+    async def scenario():
+        for rating in (5, 3):
+            await feedback.add({"session_id": "s1", "rating": rating, "created_at": now})
+        stamped = await sessions.set_satisfaction("s1", 3, "ok")
+        missing = await sessions.set_satisfaction("nope", 1, None)
+        return stamped, missing, await sessions.get("s1"), await feedback.count(), await feedback.average_rating()
+
+    stamped, missing, session, count, average = asyncio.run(scenario())
+
+    assert (stamped, missing) == (True, False)
+    assert session["satisfaction_score"] == 3
+    assert (count, average) == (2, 4.0)
+
+
+def test_session_turns_are_appended_across_batches(bulk_db):
+    sessions = SessionRepository()
+    now = datetime.utcnow()
+
+    async def scenario():
+        await sessions.append_turns({"s1": ("c1", [{"query": "hi", "reply": "hello", "created_at": now}])})
+        await sessions.append_turns({"s1": (None, [{"query": "refund?", "reply": "sure", "created_at": now}])})
+        return await sessions.get("s1")
+
+    session = asyncio.run(scenario())
+
+    assert [t["query"] for t in session["turns"]] == ["hi", "refund?"]
+    assert session["turn_count"] == 2 and session["customer_id"] == "c1"
+
+
+def test_session_keeps_only_the_latest_turns(bulk_db):
+    sessions = SessionRepository()
+    now = datetime.utcnow()
+
+    async def scenario():
+        for i in range(5):
+            await sessions.append_turns({"s1": (None, [{"query": f"q{i}", "created_at": now}])}, max_turns=3)
+        return await sessions.get("s1")
+
+    session = asyncio.run(scenario())
+
+    assert [t["query"] for t in session["turns"]] == ["q2", "q3", "q4"]
+    assert session["turn_count"] == 5
+
+
+def test_knowledge_base_upsert_replaces_chunks(bulk_db):
+    repo = KnowledgeBaseRepository()
+    chunk = {"id": "a:0", "article_id": "a", "title": "T", "text": "old", "embed_text": "T old"}
+
+    async def scenario():
+        await repo.upsert_chunks([chunk])
+        await repo.upsert_chunks([dict(chunk, text="new")])
+        return await repo.count(), await repo.get_chunks(["a:0"])
+
+    count, docs = asyncio.run(scenario())
+
+    assert count == 1
+    assert docs[0]["text"] == "new" and "embed_text" not in docs[0]
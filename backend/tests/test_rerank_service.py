@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+import time
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import rerank_service
+from utils.model_registry import registry
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the passage contains."""
+
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(self.delay_s)
+        self.calls.append(len(pairs))
+        return [float(sum(word in passage for word in query.split())) for query, passage in pairs]
+
+
+def _candidates():
+    return [
+        {"id": "a", "text": "shipping times for orders", "score": 0.033},
+        {"id": "b", "text": "how to request a refund for an order", "score": 0.030},
+        {"id": "c", "text": "refund policy", "score": 0.029},
+        {"id": "d", "text": "unrelated", "score": 0.005},
+    ]
+
+
+def _setup(monkeypatch, model):
+    monkeypatch.setattr(rerank_service.settings, "RERANK_ENABLED", True)
+    monkeypatch.setattr(rerank_service.settings, "RERANK_MIN_RELATIVE_SCORE", 0.5)
+
+    async def aget(name):
+        return model
+
+    monkeypatch.setattr(registry, "aget", aget)
+    rerank_service.rerank_cache.clear()
+
+
+def test_rerank_prunes_scores_once_and_caches(monkeypatch):
+    model = FakeCrossEncoder()
+    _setup(monkeypatch, model)
+
+    first = asyncio.run(rerank_service.rerank("refund order", _candidates(), top_k=2))
+    second = asyncio.run(rerank_service.rerank("refund order", _candidates(), top_k=2))
+
+    assert [c["id"] for c in first] == ["b", "a"]
+    assert first[0]["metadata"]["retrieval_score"] == 0.030
+    assert model.calls == [3]  # "d" was pruned; the second call was served from the cache
+    assert [c["id"] for c in second] == ["b", "a"]
+
+
+def test_rerank_keeps_retrieval_order_when_over_budget(monkeypatch):
+    _setup(monkeypatch, FakeCrossEncoder(delay_s=0.2))
+    monkeypatch.setattr(rerank_service.settings, "RERANK_BUDGET_MS", 10)
+
+    result = asyncio.run(rerank_service.rerank("refund order", _candidates(), top_k=2))
+
+    assert [c["id"] for c in result] == ["a", "b"]
+
+
+def test_prune_uses_retriever_scores_not_fused_rank():
+    """Fused RRF scores are all close; the cosine and BM25 components decide what is pruned."""
+    def hit(chunk_id, rank, vector_score, bm25_score):
+        return {"id": chunk_id, "score": 1 / (60 + rank),
+                "metadata": {"vector_score": vector_score, "bm25_score": bm25_score}}
+
+    candidates = [hit("a", 1, 0.82, 12.0), hit("b", 2, 0.75, None), hit("c", 3, 0.12, 11.0),
+                  hit("d", 4, 0.15, 1.5), hit("e", 5, None, 0.9)]
+
+    survivors = rerank_service.prune(candidates, keep_at_least=1)
+    assert [c["id"] for c in survivors] == ["a", "b", "c"]
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import numpy as np
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.response_cache import ResponseCache
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    """The exact tier matches on the normalised query."""
+    cache = ResponseCache(max_entries=10, ttl_s=60)
+    cache.put(cache.make_key("How do I reset my password?", "NEGATIVE", None), "Click 'Forgot password'.", ("kb_1",))
+
+    key = cache.make_key("how do i reset my  PASSWORD", "NEGATIVE", None)
+    assert cache.get_exact(key, ("kb_1",)) == "Click 'Forgot password'."
+    assert cache.get_exact(key, ("kb_2",)) is None
+
+
+def test_semantic_hit_requires_same_sources():
+    """A close embedding only hits when retrieval returned the same chunks."""
+    cache = ResponseCache(max_entries=10, ttl_s=60, similarity_threshold=0.9)
+    embedding = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    cache.put(cache.make_key("refund please", "NEGATIVE", None), "Refunds take 5 days.", ("kb_9",), embedding)
+
+    key = cache.make_key("i want my money back", "NEGATIVE", None)
+    close = np.array([0.99, 0.05, 0.0], dtype=np.float32)
+    assert cache.get_semantic(key, close, ("kb_9",)) == "Refunds take 5 days."
+    assert cache.get_semantic(key, close, ("kb_3",)) is None
+    assert cache.stats()["hits_semantic"] == 1
+
+
+def test_lru_eviction_and_source_invalidation():
+    """Old entries are evicted and re-ingested chunks invalidate answers."""
+    cache = ResponseCache(max_entries=2, ttl_s=60)
+    for i in range(3):
+        cache.put(cache.make_key(f"q{i}", "POSITIVE", None), f"a{i}", (f"kb_{i}",))
+
+    assert cache.get_exact(cache.make_key("q0", "POSITIVE", None), ("kb_0",)) is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.invalidate_sources(["kb_2"]) == 1
+    assert cache.get_exact(cache.make_key("q2", "POSITIVE", None), ("kb_2",)) is None
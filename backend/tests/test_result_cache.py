@@ -0,0 +1,69 @@
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import result_cache
+from utils.result_cache import ResultCache
+
+
+def test_lookup_is_keyed_by_normalized_text():
+    """Case and whitespace differences share an entry; LRU bounds the size."""
+    cache = ResultCache("test", max_entries=2, use_disk=False)
+    cache.put("  Thanks ", {"label": "POSITIVE", "score": 0.99})
+
+    assert cache.get("thanks") == {"label": "POSITIVE", "score": 0.99}
+    cache.put("ok", {"label": "POSITIVE"})
+    cache.put("refund", {"label": "NEGATIVE"})
+
+    assert cache.get("thanks") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+
+
+def test_disk_tier_survives_a_new_process_cache(tmp_path, monkeypatch):
+    """A fresh in-memory cache reads results written by another instance."""
+    monkeypatch.setattr(result_cache.settings, "RESULT_CACHE_DISK_PATH", str(tmp_path / "results.db"))
+    monkeypatch.setattr(result_cache, "_disk_tier", None)
+
+    ResultCache("sentiment").put("I want a refund", {"label": "NEGATIVE", "score": 0.98})
+    fresh = ResultCache("sentiment")
+
+    assert fresh.get("i want a refund") == {"label": "NEGATIVE", "score": 0.98}
+    assert fresh.stats()["disk_hits"] == 1
+    assert ResultCache("escalation").get("i want a refund") is None
+
+
+def test_version_is_part_of_the_key_and_async_access_uses_the_disk_tier(tmp_path, monkeypatch):
+    """Results of another model version are not served; aget/aput reach the SQLite tier."""
+    import asyncio
+
+    monkeypatch.setattr(result_cache.settings, "RESULT_CACHE_DISK_PATH", str(tmp_path / "results.db"))
+    monkeypatch.setattr(result_cache, "_disk_tier", None)
+    version = ["torch"]
+
+    asyncio.run(ResultCache("sentiment", version=lambda: version[0]).aput("ok", {"label": "POSITIVE"}))
+    fresh = ResultCache("sentiment", version=lambda: version[0])
+
+    assert asyncio.run(fresh.aget("OK")) == {"label": "POSITIVE"}
+    assert fresh.stats()["disk_hits"] == 1
+    version[0] = "onnx"
+    assert asyncio.run(fresh.aget("ok")) is None
+
+
+def test_unopenable_disk_tier_falls_back_to_memory_without_touching_settings(tmp_path, monkeypatch):
+    (tmp_path / "not-a-dir").write_text("")
+    path = str(tmp_path / "not-a-dir" / "results.db")
+    monkeypatch.setattr(result_cache.settings, "RESULT_CACHE_DISK_PATH", path)
+    monkeypatch.setattr(result_cache, "_disk_tier", None)
+    monkeypatch.setattr(result_cache, "_disk_tier_disabled", False)
+
+    cache = ResultCache("sentiment")
+    cache.put("ok", {"label": "POSITIVE"})
+
+    assert cache.get("ok") == {"label": "POSITIVE"}
+    assert result_cache._disk_tier_disabled
+    assert result_cache.settings.RESULT_CACHE_DISK_PATH == path
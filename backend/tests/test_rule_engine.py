@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.rule_engine import Rule, PhraseAutomaton, RuleEngine, classify_sentiment, score_escalation
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules", "default_rules.json")
+
+
+def test_automaton_matches_whole_words_and_overlapping_phrases():
+    """Phrases match on word boundaries, including ones that share a suffix."""
+    automaton = PhraseAutomaton([
+        Rule("sue", "escalation"),
+        Rule("cancel my account", "escalation"),
+        Rule("my account", "escalation"),
+    ])
+    tokens = "There is an issue, please cancel my account".lower().replace(",", "").split()
+
+    phrases = [m.rule.phrase for m in automaton.find_all(tokens)]
+
+    assert phrases == ["cancel my account", "my account"]
+
+
+def test_escalation_reports_every_matched_reason():
+    engine = RuleEngine(path=RULES_FILE)
+    result = score_escalation(engine.match("I want a REFUND or I'll call my lawyer."), engine.options["escalation_threshold"])
+
+    assert result["predicted"] is True
+    assert result["reasons"] == ["refund", "lawyer"]
+    assert result["score"] > 0.99
+    assert score_escalation(engine.match("Where is my parcel?"), 0.85) == {"predicted": False, "score": 0.0, "reasons": []}
+
+
+def test_sentiment_fallback_uses_group_priority():
+    engine = RuleEngine(path=RULES_FILE)
+    default = engine.options["sentiment_default"]
+
+    assert classify_sentiment(engine.match("Thanks, but this is the worst"), default)["label"] == "very_negative"
+    assert classify_sentiment(engine.match("I can't log in"), default)["label"] == "negative"
+    assert classify_sentiment(engine.match("hello there"), default)["label"] == "neutral"
+
+
+def test_edited_rules_are_picked_up_without_restart(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"escalation": {"rules": [{"phrase": "refund", "weight": 0.9}]}}))
+    engine = RuleEngine(path=str(path), check_interval_s=0)
+    old_version = engine.version
+    assert [m.rule.phrase for m in engine.match("refund please")] == ["refund"]
+
+    path.write_text(json.dumps({"escalation": {"rules": [{"phrase": "data breach", "weight": 0.95}]}}))
+    os.utime(path, (1, 1))  # force an mtime change on coarse-grained filesystems
+
+    assert engine.match("refund please") == []
+    assert [m.rule.phrase for m in engine.match("Was there a data breach?")] == ["data breach"]
+    assert engine.version != old_version
+
+
+def test_stemmed_rules_match_plural_and_past_tense_forms():
+    """Inflected forms escalate like the base phrase; "sue" still does not fire inside "issue"."""
+    engine = RuleEngine(path=RULES_FILE)
+    threshold = engine.options["escalation_threshold"]
+
+    for text, reason in (
+        ("I want my refunds now", "refund"),
+        ("I filed complaints twice", "complaint"),
+        ("I already escalated this", "escalate"),
+        ("They cancelled my account without asking", "cancel my account"),
+        ("We are suing you", "sue"),
+    ):
+        result = score_escalation(engine.match(text), threshold)
+        assert result["predicted"] is True, text
+        assert result["reasons"] == [reason]
+
+    assert score_escalation(engine.match("There are issues with my invoices"), threshold)["reasons"] == []
+
+
+def test_default_rules_path_does_not_depend_on_working_directory(tmp_path, monkeypatch, caplog):
+    """The configured path loads from any cwd; a missing file is logged as an empty rule set."""
+    from config import settings
+
+    monkeypatch.chdir(tmp_path)
+    assert RuleEngine(path=settings.RULES_PATH).rules()
+
+    engine = RuleEngine(path="missing.json")
+    assert engine.rules() == []
+    assert "No rules loaded" in caplog.text
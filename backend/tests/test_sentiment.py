@@ -1,36 +1,44 @@
+import asyncio
 import os
 import sys
-import pytest
 
 # Add backend root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.sentiment_service import detect_sentiment
+from routes.sentiment import _fallback_analyze
+from services import sentiment_service
+from utils.model_registry import registry
 
 
 def test_positive_sentiment():
     """Check positive sentiment detection."""
-    text = "I love this product! It's amazing."
-    result = detect_sentiment(text)
+    result = _fallback_analyze("I love this product! It's amazing.")
 
-    assert result["label"] in ["POSITIVE", "LABEL_2"]  # transformer models may return label names
-    assert 0 <= result["score"] <= 1
+    assert result.label == "positive"
+    assert 0 <= result.score <= 1
+    assert "joy" in result.emotions
 
 
 def test_negative_sentiment():
     """Check negative sentiment detection."""
-    text = "This is terrible and I hate it."
-    result = detect_sentiment(text)
+    result = _fallback_analyze("This is terrible and I hate it.")
 
-    assert result["label"] in ["NEGATIVE", "LABEL_0"]
-    assert 0 <= result["score"] <= 1
+    assert result.label == "very_negative"
+    assert 0 <= result.score <= 1
 
 
 def test_neutral_sentiment():
-    """Check neutral sentiment detection."""
-    text = "The product arrived yesterday."
-    result = detect_sentiment(text)
+    """Messages without sentiment phrases get the neutral default."""
+    result = _fallback_analyze("The product arrived yesterday.")
 
-    # Some models don't have neutral, so we just ensure it's valid
-    assert result["label"] in ["POSITIVE", "NEGATIVE", "NEUTRAL", "LABEL_0", "LABEL_1", "LABEL_2"]
-    assert 0 <= result["score"] <= 1
+    assert result.label == "neutral"
+    assert 0 <= result.score <= 1
+
+
+def test_analyze_is_neutral_without_a_model(monkeypatch):
+    """The service answers NEUTRAL instead of failing when the model is unavailable."""
+    monkeypatch.setattr(registry, "aget", lambda name: asyncio.sleep(0, result=None))
+
+    result = asyncio.run(sentiment_service.analyze("a message the cache has never seen before"))
+
+    assert result == {"label": "NEUTRAL", "score": 0.5}
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import sentiment_service
+from utils.model_registry import registry
+
+
+class _RecordingAnalyzer:
+    """Stands in for the transformers pipeline and records batch contents."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, batch_size=None, truncation=True):
+        self.batches.append(list(texts))
+        return [{"label": "POSITIVE" if "good" in t else "NEGATIVE", "score": float(len(t))} for t in texts]
+
+
+def test_batch_analyze_buckets_by_length_and_keeps_order(monkeypatch):
+    """Batches hold similar-length texts, and results come back in input order."""
+    analyzer = _RecordingAnalyzer()
+    monkeypatch.setattr(sentiment_service, "get_analyzer", lambda: analyzer)
+    monkeypatch.setattr(registry, "aget", lambda name: asyncio.sleep(0, result=analyzer))
+
+    texts = ["good " * 50, "bad", "", "good", "bad " * 20, "x" * 10_000]
+    results = asyncio.run(sentiment_service.batch_analyze(texts, batch_size=2))
+
+    assert [r["label"] for r in results[:5]] == ["POSITIVE", "NEGATIVE", "NEUTRAL", "POSITIVE", "NEGATIVE"]
+    assert [len(b) for b in analyzer.batches] == [2, 2, 1]
+    assert analyzer.batches[0] == ["bad", "good"]
+    # Very long inputs are clipped before tokenization.
+    assert results[5]["score"] == float(sentiment_service.settings.SENTIMENT_MAX_CHARS)
+
+
+def test_analyze_returns_copies_of_cached_results(monkeypatch):
+    """Changing a returned result never changes what the cache serves next."""
+    analyzer = _RecordingAnalyzer()
+    monkeypatch.setattr(sentiment_service, "get_analyzer", lambda: analyzer)
+    monkeypatch.setattr(registry, "aget", lambda name: asyncio.sleep(0, result=analyzer))
+    sentiment_service.sentiment_cache.clear()
+
+    async def scenario():
+        first = await sentiment_service.analyze("good service")
+        first["label"] = "TAMPERED"
+        second = await sentiment_service.analyze("good service")
+        second["label"] = "TAMPERED"
+        return await sentiment_service.analyze("good service")
+
+    assert asyncio.run(scenario())["label"] == "POSITIVE"
+    assert len(analyzer.batches) == 1
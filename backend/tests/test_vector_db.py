@@ -0,0 +1,246 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+# Add backend root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vector_db import VectorIndex
+
+
+def _random_vectors(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def test_exact_search_returns_nearest_first():
+    """A stored vector should be its own best match."""
+    vectors = _random_vectors(50)
+    index = VectorIndex(dim=16)
+    index.add([f"c{i}" for i in range(50)], vectors)
+
+    results = index.search(vectors[7], top_k=3)
+    assert results[0][0] == "c7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert len(results) == 3
+
+
+def test_upsert_and_delete():
+    """Upsert overwrites a chunk and delete keeps the remaining ids searchable."""
+    vectors = _random_vectors(10)
+    index = VectorIndex(dim=16)
+    index.upsert([f"c{i}" for i in range(10)], vectors, [{"text": str(i)} for i in range(10)])
+
+    index.upsert(["c3"], vectors[5:6], [{"text": "updated"}])
+    assert len(index) == 10
+    assert index.get_payload("c3") == {"text": "updated"}
+
+    assert index.delete(["c0", "missing"]) == 1
+    assert "c0" not in index
+    assert index.search(vectors[9], top_k=1)[0][0] == "c9"
+
+
+def test_ivf_search_matches_exact_for_stored_vectors():
+    """Above the exact threshold the IVF path still finds stored vectors."""
+    vectors = _random_vectors(2000)
+    index = VectorIndex(dim=16, exact_threshold=500, nprobe=8)
+    index.upsert([f"c{i}" for i in range(2000)], vectors)
+    assert index.is_trained
+
+    hits = sum(index.search(vectors[i], top_k=1)[0][0] == f"c{i}" for i in range(0, 2000, 50))
+    assert hits == 40
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """A saved index is memory-mapped back with ids and payloads intact."""
+    vectors = _random_vectors(20)
+    index = VectorIndex(dim=16)
+    index.upsert([f"c{i}" for i in range(20)], vectors, [{"title": f"t{i}"} for i in range(20)])
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert len(loaded) == 20
+    assert loaded.get_payload("c4") == {"title": "t4"}
+    assert loaded.search(vectors[4], top_k=1)[0][0] == "c4"
+
+    # Writes after a memory-mapped load must not touch the file on disk.
+    loaded.delete(["c4"])
+    assert len(VectorIndex.load(str(tmp_path))) == 20
+
+
+def test_int8_quantized_search_keeps_recall(tmp_path):
+    """int8 first-pass search with rescoring matches exact top-10 closely."""
+    from benchmarks.recall_benchmark import synthetic_embeddings, measure_recall
+
+    vectors = synthetic_embeddings(3000, 32)
+    ids = [str(i) for i in range(3000)]
+    exact = VectorIndex(dim=32, exact_threshold=10_000)
+    exact.upsert(ids, vectors)
+    exact.save(str(tmp_path))
+
+    compressed = VectorIndex.load(str(tmp_path), exact_threshold=10_000, quantization="int8", rescore_factor=10)
+    report = measure_recall(exact, compressed, vectors[:50], k=10)
+
+    assert report["recall_at_k"] >= 0.95
+    assert compressed.memory_bytes()["codes"] < exact.memory_bytes()["vectors"] / 3
+
+
+def test_tombstones_hide_chunks_until_compaction(tmp_path):
+    """Tombstoned ids vanish from search and lookups at once and are removed by compact."""
+    vectors = _random_vectors(10)
+    index = VectorIndex(dim=16)
+    index.upsert([f"c{i}" for i in range(10)], vectors, [{"text": str(i)} for i in range(10)])
+
+    assert index.tombstone(["c2", "c3", "missing"]) == 2
+    assert len(index) == 8 and index.tombstone_count == 2
+    assert "c2" not in index and index.get_payload("c2") is None
+    assert [hit[0] for hit in index.search(vectors[2], top_k=10)].count("c2") == 0
+    assert len(index.search(vectors[2], top_k=8)) == 8
+
+    # Only live rows are written out, which compacts the index as well.
+    index.save(str(tmp_path))
+    assert index.tombstone_count == 0
+    loaded = VectorIndex.load(str(tmp_path))
+    assert len(loaded) == 8 and loaded.tombstone_count == 0 and "c2" not in loaded
+
+    # Re-ingesting a tombstoned id brings it back; overwriting leaves a dead row.
+    index.upsert(["c3"], vectors[3:4], [{"text": "3"}])
+    index.upsert(["c4"], vectors[4:5], [{"text": "4"}])
+    assert "c3" in index
+
+    assert index.compact() == 1
+    assert index.tombstone_count == 0 and len(index) == 9
+    assert index.search(vectors[3], top_k=1)[0][0] == "c3"
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_loaded_index_supports_delete_and_compact(tmp_path, mmap, quantization):
+    """Rows of a loaded index can be deleted and compacted, memory-mapped or not."""
+    vectors = _random_vectors(10)
+    index = VectorIndex(dim=16, quantization=quantization)
+    index.upsert([f"c{i}" for i in range(10)], vectors)
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path), mmap=mmap, quantization=quantization)
+    assert loaded.delete(["c0"]) == 1
+    loaded.tombstone(["c1"])
+    assert loaded.compact() == 2
+    assert len(loaded) == 8
+    assert loaded.search(vectors[9], top_k=1)[0][0] == "c9"
+
+
+def test_binary_quantization_requires_explicit_rescore_factor():
+    """Binary codes have no safe default rescore factor; int8 falls back to its own."""
+    with pytest.raises(ValueError):
+        VectorIndex(dim=16, quantization="binary", rescore_factor=0)
+    assert VectorIndex(dim=16, quantization="int8", rescore_factor=0).rescore_factor == 10
+    assert VectorIndex(dim=16, quantization="binary", rescore_factor=400).rescore_factor == 400
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_dead_rows_do_not_shrink_results(quantization):
+    """With most rows deleted, search still returns exactly top_k live hits."""
+    vectors = _random_vectors(600)
+    index = VectorIndex(dim=16, exact_threshold=300, nprobe=4, quantization=quantization)
+    index.upsert([f"c{i}" for i in range(600)], vectors)
+    index.delete([f"c{i}" for i in range(0, 600, 2) if i != 100])
+
+    hits = index.search(vectors[100], top_k=5)
+    assert hits[0][0] == "c100"
+    assert len(hits) == 5
+    assert all(int(chunk_id[1:]) % 2 == 1 for chunk_id, _ in hits[1:])
+
+
+def test_search_does_not_wait_for_writers():
+    """Searches read the published snapshot while a writer holds the lock."""
+    vectors = _random_vectors(50)
+    index = VectorIndex(dim=16)
+    index.upsert([f"c{i}" for i in range(50)], vectors)
+
+    result = []
+    with index._lock:
+        reader = threading.Thread(target=lambda: result.append(index.search(vectors[3], top_k=1)))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+    assert result[0][0][0] == "c3"
+
+
+def test_rewrite_carries_over_writes_made_meanwhile():
+    """Rows appended, overwritten or deleted while a rewrite was being built survive the swap."""
+    vectors = _random_vectors(30)
+    index = VectorIndex(dim=16)
+    index.upsert([f"c{i}" for i in range(20)], vectors[:20])
+    snap = index._snap
+
+    index.upsert(["c1", "c20"], vectors[20:22])
+    index.delete(["c2"])
+    assert index._rewrite(snap, np.flatnonzero(snap.alive[: snap.count]), 0)
+
+    assert len(index) == 20 and "c2" not in index
+    assert index.search(vectors[20], top_k=1)[0][0] == "c1"
+    assert index.search(vectors[21], top_k=1)[0][0] == "c20"
+    assert index.search(vectors[2], top_k=20)[0][0] != "c2"
+    assert index.compact() == 2 and len(index) == 20
+
+
+def test_compaction_does_not_block_writers():
+    """Writes made while a compaction is being built survive the swap."""
+    vectors = _random_vectors(101)
+    index = VectorIndex(dim=16)
+    index.upsert([f"c{i}" for i in range(100)], vectors[:100])
+    index.delete([f"c{i}" for i in range(50)])
+
+    removed = []
+    with index._lock:
+        worker = threading.Thread(target=lambda: removed.append(index.compact()))
+        worker.start()
+        index.upsert(["new"], vectors[100:])
+        index.delete(["c51"])
+        assert index.search(vectors[60], top_k=1)[0][0] == "c60"
+    worker.join(timeout=5)
+
+    assert removed == [50]
+    assert len(index) == 50 and "new" in index and "c51" not in index
+    assert index.search(vectors[100], top_k=1)[0][0] == "new"
+
+
+def test_writes_keep_the_base_memory_mapped(tmp_path):
+    """Writes to a memory-mapped index go to the delta; saving maps the new file."""
+    vectors = _random_vectors(40)
+    index = VectorIndex(dim=16, quantization="int8")
+    index.upsert([f"c{i}" for i in range(30)], vectors[:30])
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path), quantization="int8")
+    loaded.upsert([f"c{i}" for i in range(30, 40)], vectors[30:])
+    loaded.upsert(["c0"], vectors[5:6])
+    loaded.delete(["c1"])
+    memory = loaded.memory_bytes()
+    assert memory["vectors_memory_mapped"] and memory["vectors_resident"] == 11 * 16 * 4
+    assert loaded.search(vectors[35], top_k=1)[0][0] == "c35"
+
+    loaded.save(str(tmp_path))
+    memory = loaded.memory_bytes()
+    assert memory["vectors_memory_mapped"] and memory["vectors_resident"] == 0
+    assert len(loaded) == 39 and loaded.search(vectors[5], top_k=2)[1][0] in ("c0", "c5")
+    assert len(VectorIndex.load(str(tmp_path))) == 39
+
+
+def test_save_after_file_backed_compaction_is_skipped(tmp_path, monkeypatch):
+    """Compacting a memory-mapped index rewrites its files, so the next save has nothing to do."""
+    index = VectorIndex(dim=16, mmap=True)
+    index.upsert([f"c{i}" for i in range(10)], _random_vectors(10))
+    index.save(str(tmp_path))
+    index.delete(["c0", "c1"])
+    assert index.compact() == 2
+    assert len(VectorIndex.load(str(tmp_path))) == 8
+
+    rewrites = []
+    monkeypatch.setattr(index, "_rewrite", lambda *args, **kwargs: rewrites.append(args))
+    index.save(str(tmp_path))
+    assert rewrites == []
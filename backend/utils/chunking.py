@@ -0,0 +1,77 @@
+# backend/utils/chunking.py
+import hashlib
+import re
+
+# Kept free of heavy imports (no torch / transformers) so it is cheap to load
+# in the ingestion process pool.
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def article_id_for(article: dict) -> str:
+    """
+    Stable id for an article, derived from its URL (or title if it has none),
+    so re-ingesting the same article overwrites its chunks instead of duplicating them.
+    """
+    key = str(article.get("url") or article.get("title") or "")
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_text(text: str, chunk_size: int = 200, overlap: int = 40) -> list[str]:
+    """
+    Splits text into windows of `chunk_size` words, each overlapping the
+    previous one by `overlap` words.
+    """
+    words = _WHITESPACE.split(text.strip())
+    if not words or words == [""]:
+        return []
+    step = max(1, chunk_size - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_size]))
+        if start + chunk_size >= len(words):
+            break
+    return chunks
+
+
+def content_hash(embed_text: str) -> str:
+    """
+    Fingerprint of exactly what gets embedded; an unchanged hash (under the
+    same model version) means the stored vector can be reused.
+    """
+    return hashlib.sha1(embed_text.encode("utf-8")).hexdigest()
+
+
+def chunk_article(article: dict, chunk_size: int = 200, overlap: int = 40) -> list[dict]:
+    """
+    Turns one article into chunk records ready to embed and store.
+    """
+    article_id = article.get("article_id") or article_id_for(article)
+    title = article.get("title", "")
+    url = article.get("url")
+    records = []
+    for i, text in enumerate(chunk_text(article.get("content", ""), chunk_size, overlap)):
+        # The title is prepended so that short chunks still embed with their topic.
+        embed_text = f"{title}\n{text}" if title else text
+        records.append(
+            {
+                "id": f"{article_id}:{i}",
+                "article_id": article_id,
+                "chunk_index": i,
+                "title": title,
+                "embed_text": embed_text,
+                "content_hash": content_hash(embed_text),
+                "text": text,
+                "url": str(url) if url else None,
+                "source": article.get("source"),
+                "tags": article.get("tags") or [],
+            }
+        )
+    return records
+
+
+def chunk_articles(articles: list[dict], chunk_size: int = 200, overlap: int = 40) -> list[list[dict]]:
+    """
+    Chunks a slice of articles; this is the unit of work sent to the process pool.
+    """
+    return [chunk_article(a, chunk_size, overlap) for a in articles]
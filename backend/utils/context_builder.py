@@ -0,0 +1,177 @@
+# backend/utils/context_builder.py
+import re
+import threading
+
+import numpy as np
+
+from config import settings
+
+# --- Token-budgeted prompt context ---
+# Retrieved chunks are ordered by score, trimmed to the ones that score close
+# to the best hit (adaptive top_k), stripped of near-duplicates (cosine
+# similarity of their stored embeddings; exact text match when no embedding is
+# available) and packed into a fixed token budget. Tokens are estimated from
+# character counts (~4 characters per token for English), which is close
+# enough for budgeting without loading a tokenizer.
+
+_WHITESPACE = re.compile(r"\s+")
+_CHARS_PER_TOKEN = 4
+# Per-retriever scores that search_articles puts in hit metadata.
+_COMPONENT_SCORES = ("vector_score", "bm25_score")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def _content(source: dict) -> str:
+    return source.get("text") or source.get("snippet") or ""
+
+
+def relevance_mask(sources: list[dict], floor: float) -> list[bool]:
+    """
+    Whether each source scores at least `floor` of the best source. Fused
+    hybrid scores (RRF, ~1/(60 + rank)) hardly differ between ranks, so hybrid
+    hits are compared per retriever instead: a hit is kept if its cosine
+    similarity or its BM25 score is competitive. Reranked hits, and hits
+    without component scores, are compared on `score`.
+    """
+    def components(source: dict) -> dict:
+        metadata = source.get("metadata") or {}
+        if "rerank_score" in metadata or all(metadata.get(k) is None for k in _COMPONENT_SCORES):
+            return {"score": source.get("score")}
+        return {k: metadata.get(k) for k in _COMPONENT_SCORES}
+
+    per_source = [components(s) for s in sources]
+    best: dict[str, float] = {}
+    for scores in per_source:
+        for key, value in scores.items():
+            if value is not None and value > best.get(key, 0.0):
+                best[key] = value
+    if not best:
+        return [True] * len(sources)
+    return [
+        any(value is not None and key in best and value >= floor * best[key] for key, value in scores.items())
+        for scores in per_source
+    ]
+
+
+def format_source(title: str, content: str) -> str:
+    return f"Title: {title}\nContent: {content}"
+
+
+def _truncate(content: str, max_tokens: int) -> str:
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    if len(content) <= max_chars:
+        return content
+    cut = content[:max_chars]
+    # Stop at the last complete word.
+    return (cut.rsplit(" ", 1)[0] if " " in cut else cut) + " ..."
+
+
+class ContextResult:
+    def __init__(self, text: str, used: list[dict], tokens: int, naive_tokens: int, duplicates: int, over_budget: int, below_cutoff: int):
+        self.text = text
+        self.used = used
+        self.tokens = tokens
+        self.naive_tokens = naive_tokens
+        self.duplicates = duplicates
+        self.over_budget = over_budget
+        self.below_cutoff = below_cutoff
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        budget_tokens: int = settings.CONTEXT_TOKEN_BUDGET,
+        dedup_threshold: float = settings.CONTEXT_DEDUP_THRESHOLD,
+        relative_score_floor: float = settings.CONTEXT_RELATIVE_SCORE_FLOOR,
+        min_sources: int = settings.CONTEXT_MIN_SOURCES,
+        min_chunk_tokens: int = 48,
+    ):
+        self.budget_tokens = budget_tokens
+        self.dedup_threshold = dedup_threshold
+        self.relative_score_floor = relative_score_floor
+        self.min_sources = min_sources
+        self.min_chunk_tokens = min_chunk_tokens
+        self._lock = threading.Lock()
+        self._totals = {"prompts": 0, "tokens": 0, "naive_tokens": 0, "duplicates": 0, "over_budget": 0, "below_cutoff": 0}
+
+    def adaptive_cutoff(self, sources: list[dict]) -> list[dict]:
+        """
+        Keeps the sources scoring at least `relative_score_floor` of the best
+        one (never fewer than `min_sources`; see `relevance_mask`). A query
+        with one clear answer uses one or two chunks; a broad one keeps more.
+        """
+        if not sources or self.relative_score_floor <= 0:
+            return sources
+        mask = relevance_mask(sources, self.relative_score_floor)
+        return [s for i, (s, keep) in enumerate(zip(sources, mask)) if i < self.min_sources or keep]
+
+    def build(self, sources: list[dict], vectors: dict[str, np.ndarray] | None = None, budget_tokens: int | None = None) -> ContextResult:
+        """
+        Selects and formats sources for the prompt. `vectors` maps source ids
+        to normalised embeddings for near-duplicate detection.
+        """
+        budget = budget_tokens or self.budget_tokens
+        vectors = vectors or {}
+        naive_tokens = sum(estimate_tokens(format_source(s.get("title") or "", _content(s))) for s in sources)
+
+        ranked = sorted(sources, key=lambda s: s.get("score") or 0.0, reverse=True)
+        candidates = self.adaptive_cutoff(ranked)
+        below_cutoff = len(ranked) - len(candidates)
+
+        kept_vectors: list[np.ndarray] = []
+        kept_texts: set[str] = set()
+        blocks: list[str] = []
+        used: list[dict] = []
+        tokens = duplicates = over_budget = 0
+        for source in candidates:
+            content = _content(source)
+            vector = vectors.get(source.get("id"))
+            normalized = _WHITESPACE.sub(" ", content.strip().lower())
+            if normalized in kept_texts or (
+                vector is not None and kept_vectors and float(np.max(np.stack(kept_vectors) @ vector)) >= self.dedup_threshold
+            ):
+                duplicates += 1
+                continue
+
+            title = source.get("title") or ""
+            block = format_source(title, content)
+            separator = 1 if blocks else 0  # the blank line between blocks
+            cost = estimate_tokens(block) + separator
+            remaining = budget - tokens
+            if cost > remaining:
+                # Partially include the first chunk that overflows if a useful amount still fits
+                # (one token is reserved for the " ..." marker).
+                room = remaining - estimate_tokens(format_source(title, "")) - separator - 1
+                if room < self.min_chunk_tokens:
+                    over_budget += 1
+                    continue
+                block = format_source(title, _truncate(content, room))
+                cost = estimate_tokens(block) + separator
+
+            blocks.append(block)
+            used.append(source)
+            tokens += cost
+            kept_texts.add(normalized)
+            if vector is not None:
+                kept_vectors.append(vector)
+
+        result = ContextResult("\n\n".join(blocks), used, tokens, naive_tokens, duplicates, over_budget, below_cutoff)
+        with self._lock:
+            for key, value in (("prompts", 1), ("tokens", tokens), ("naive_tokens", naive_tokens), ("duplicates", duplicates),
+                               ("over_budget", over_budget), ("below_cutoff", below_cutoff)):
+                self._totals[key] += value
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+        totals["budget_tokens"] = self.budget_tokens
+        totals["tokens_saved"] = totals["naive_tokens"] - totals["tokens"]
+        totals["savings_ratio"] = round(totals["tokens_saved"] / totals["naive_tokens"], 4) if totals["naive_tokens"] else 0.0
+        return totals
+
+
+context_builder = ContextBuilder()
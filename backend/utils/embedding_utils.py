@@ -1,25 +1,200 @@
 # backend/utils/embedding_utils.py
-from sentence_transformers import SentenceTransformer
 import logging
+import threading
+from collections import OrderedDict
 
-# Load the sentence transformer model. This will download the model the first time it's run.
-# "all-MiniLM-L6-v2" is a good, lightweight default model.
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    logging.info("SentenceTransformer model 'all-MiniLM-L6-v2' loaded successfully.")
-except Exception as e:
-    logging.error(f"Failed to load SentenceTransformer model: {e}")
-    model = None
+import numpy as np
 
-def get_embeddings(text: str) -> list[float]: # <--- RENAMED THIS FUNCTION
+from config import settings
+from utils.inference_scheduler import MicroBatchScheduler
+from utils.model_registry import registry
+from utils.metrics import CACHE_HITS, CACHE_MISSES
+from utils.result_cache import text_key
+from utils.tracing import span
+
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+def model_version() -> str:
+    """
+    Identifies the vectors the current configuration produces. Stored chunks
+    embedded under a different version are re-embedded on the next ingest.
+    (ONNX at full precision matches PyTorch; int8 quantization does not.)
+    """
+    if settings.INFERENCE_BACKEND == "onnx" and settings.ONNX_QUANTIZE:
+        return f"{EMBEDDING_MODEL}+int8"
+    return EMBEDDING_MODEL
+
+
+def _load_model():
+    if settings.INFERENCE_BACKEND == "onnx":
+        from utils.onnx_backend import OnnxSentenceEncoder
+
+        return OnnxSentenceEncoder()
+
+    # Imported here so that importing this module does not pull in torch.
+    from sentence_transformers import SentenceTransformer
+
+    # This will download the model the first time it's run.
+    # "all-MiniLM-L6-v2" is a good, lightweight default model.
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+registry.register("embedding", _load_model)
+
+
+def get_model():
+    """
+    The SentenceTransformer, loaded lazily on first use (None if loading failed).
+    """
+    return registry.get("embedding")
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of query embeddings keyed by normalised text. Cached arrays
+    are read-only so that callers cannot corrupt shared entries.
+    """
+
+    def __init__(self, max_entries: int = settings.EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        CACHE_HITS.add_source(lambda: self.hits, cache="query_embedding")
+        CACHE_MISSES.add_source(lambda: self.misses, cache="query_embedding")
+
+    def get(self, text: str) -> np.ndarray | None:
+        key = text_key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: np.ndarray) -> np.ndarray:
+        if self.max_entries <= 0:
+            return vector
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        key = text_key(text)
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+query_embedding_cache = EmbeddingCache()
+
+
+def get_embeddings(text: str) -> np.ndarray | None:
+    """
+    Embedding of a single text as a float32 vector (cached by normalised
+    text). Returns None if the model is unavailable.
+    """
+    cached = query_embedding_cache.get(text)
+    if cached is not None:
+        return cached
+    model = get_model()
+    if model is None:
+        logging.error("Embedding model is not available.")
+        return None
+    embedding = model.encode(text, convert_to_numpy=True, show_progress_bar=False)
+    return query_embedding_cache.put(text, embedding)
+
+
+def get_embeddings_many(texts: list[str], batch_size: int = 64) -> np.ndarray:
+    """
+    Embeddings of many texts as a (n, dim) float32 matrix. Cached texts skip
+    the model; the rest (deduplicated) are encoded in batched passes.
+    """
+    vectors: list[np.ndarray | None] = [query_embedding_cache.get(t) for t in texts]
+    missing = {text_key(t): t for t, v in zip(texts, vectors) if v is None}
+    if missing:
+        model = get_model()
+        if model is None:
+            raise RuntimeError("Embedding model is not available.")
+        encoded = model.encode(list(missing.values()), batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        fresh = {key: query_embedding_cache.put(t, e) for (key, t), e in zip(missing.items(), encoded)}
+        vectors = [v if v is not None else fresh[text_key(t)] for t, v in zip(texts, vectors)]
+    if not vectors:
+        return np.empty((0, settings.EMBEDDING_DIM), dtype=np.float32)
+    return np.stack(vectors)
+
+
+def encode_batch(texts: list[str], batch_size: int = 64) -> np.ndarray:
     """
-    Generates an embedding for a given text using the loaded SentenceTransformer model.
+    Encodes many texts in batched forward passes and returns a (n, dim)
+    float32 matrix. Used by ingestion instead of calling get_embeddings per text.
     """
+    model = get_model()
     if model is None:
+        raise RuntimeError("Embedding model is not available.")
+    if not texts:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    return model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    ).astype(np.float32, copy=False)
+
+
+def _encode_queries(texts: list[str]) -> list[np.ndarray]:
+    embeddings = get_model().encode(texts, batch_size=len(texts), convert_to_numpy=True, show_progress_bar=False)
+    return list(embeddings.astype(np.float32, copy=False))
+
+
+# Shared scheduler: concurrent query embeddings from all requests are encoded together.
+embedding_scheduler = MicroBatchScheduler("embedding", _encode_queries)
+
+
+async def embed_async(text: str) -> np.ndarray | None:
+    """
+    Embeds a single query without blocking the event loop. Concurrent calls
+    are micro-batched into one SentenceTransformer forward pass.
+    """
+    cached = query_embedding_cache.get(text)
+    if cached is not None:
+        return cached
+    if await registry.aget("embedding") is None:
         logging.error("Embedding model is not available.")
-        return []
-        
-    # The model.encode() method creates the vector embedding
-    embedding = model.encode(text, convert_to_tensor=False)
-    return embedding.tolist()
+        return None
+    with span("embedding"):
+        embedding = await embedding_scheduler.infer(text)
+    return query_embedding_cache.put(text, embedding)
 
+
+def precompute_queries(path: str) -> int:
+    """
+    Fills the query cache from a file of frequent queries (one per line).
+    """
+    with open(path, encoding="utf-8") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    if queries:
+        get_embeddings_many(queries)
+    logging.info(f"[Embeddings] Precomputed {len(queries)} frequent query embeddings.")
+    return len(queries)
@@ -0,0 +1,116 @@
+# backend/utils/inference_scheduler.py
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from config import settings
+from utils.metrics import BATCH_SIZE, INFERENCE_LATENCY, QUEUE_DEPTH
+
+# --- Micro-batching inference scheduler ---
+# Requests from every coroutine (and any plain thread) are queued; a single
+# worker thread drains the queue into dynamic batches — up to `max_batch_size`
+# items, waiting at most `max_wait_ms` after the first item arrives — and runs
+# one forward pass per batch. The event loop only ever awaits a future.
+
+
+class MicroBatchScheduler:
+    """
+    Groups single-item inference calls into batched calls of `batch_fn`.
+
+    `batch_fn` receives a list of inputs and must return a list of outputs of
+    the same length and order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[list], list],
+        max_batch_size: int = settings.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms: float = settings.INFERENCE_MAX_WAIT_MS,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+        # Simple counters for observability.
+        self.batches_run = 0
+        self.items_run = 0
+        QUEUE_DEPTH.add_source(self._queue.qsize, queue=f"inference_{name}")
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._start_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name=f"inference-{self.name}", daemon=True
+                    )
+                    self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queues one input and returns a concurrent Future for its output.
+        """
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((item, future))
+        return future
+
+    async def infer(self, item: Any) -> Any:
+        """
+        Awaitable wrapper around `submit` for use inside async handlers.
+        """
+        return await asyncio.wrap_future(self.submit(item))
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            # Drop callers that were cancelled while waiting in the queue.
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            inputs = [item for item, _ in batch]
+            start = time.perf_counter()
+            try:
+                outputs = self.batch_fn(inputs)
+                if len(outputs) != len(inputs):
+                    raise RuntimeError(
+                        f"{self.name} batch_fn returned {len(outputs)} outputs for {len(inputs)} inputs"
+                    )
+            except Exception as e:
+                logging.error(f"[Inference Scheduler] {self.name} batch of {len(inputs)} failed: {e}", exc_info=True)
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.items_run += len(inputs)
+            BATCH_SIZE.observe(len(inputs), component=self.name)
+            INFERENCE_LATENCY.observe(time.perf_counter() - start, scheduler=self.name)
+            for (_, fut), output in zip(batch, outputs):
+                fut.set_result(output)
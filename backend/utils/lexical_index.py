@@ -0,0 +1,186 @@
+# backend/utils/lexical_index.py
+import logging
+import math
+import re
+import threading
+from array import array
+
+import numpy as np
+
+from utils.vector_db import get_index
+
+# --- In-process BM25 index ---
+# Posting lists are typed `array`s (int32 doc numbers + uint16 term
+# frequencies), which take a fraction of the memory of Python lists and can
+# be viewed as NumPy arrays without copying, so scoring a term is one
+# vectorised operation over its postings.
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+_SPLIT = re.compile(r"[-_.]")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lower-cases and splits text into terms. Compound identifiers such as
+    "ERR-404" or "SKU_12.5" are kept whole *and* split into their parts, so
+    both exact codes and their pieces can match.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if _SPLIT.search(token):
+            tokens.extend(p for p in _SPLIT.split(token) if p)
+    return tokens
+
+
+class LexicalIndex:
+    """
+    BM25 index over chunk text with upsert/delete by chunk id.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, tuple[array, array]] = {}
+        self._doc_ids: list[str | None] = []
+        self._doc_lens = array("i")
+        self._id_to_doc: dict[str, int] = {}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._id_to_doc)
+
+    def _delete_locked(self, chunk_id: str):
+        doc = self._id_to_doc.pop(chunk_id, None)
+        if doc is None:
+            return
+        # Postings are left in place and masked out at query time via doc_len == 0;
+        # `compact` reclaims them.
+        self._total_len -= self._doc_lens[doc]
+        self._doc_lens[doc] = 0
+        self._doc_ids[doc] = None
+
+    def upsert(self, ids: list[str], texts: list[str]):
+        with self._lock:
+            for chunk_id, text in zip(ids, texts):
+                self._delete_locked(chunk_id)
+                tokens = tokenize(text)
+                doc = len(self._doc_ids)
+                self._doc_ids.append(chunk_id)
+                self._doc_lens.append(len(tokens))
+                self._id_to_doc[chunk_id] = doc
+                self._total_len += len(tokens)
+
+                counts: dict[str, int] = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    postings = self._postings.get(token)
+                    if postings is None:
+                        postings = self._postings[token] = (array("i"), array("H"))
+                    postings[0].append(doc)
+                    postings[1].append(min(tf, 65535))
+            self._maybe_compact()
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            for chunk_id in ids:
+                self._delete_locked(chunk_id)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        dead = len(self._doc_ids) - len(self._id_to_doc)
+        if dead > 1000 and dead > len(self._id_to_doc):
+            self.compact()
+
+    def compact(self):
+        """
+        Rebuilds posting lists without deleted documents.
+        """
+        with self._lock:
+            live = [d for d, chunk_id in enumerate(self._doc_ids) if chunk_id is not None]
+            remap = np.full(len(self._doc_ids), -1, dtype=np.int64)
+            remap[live] = np.arange(len(live))
+            postings = {}
+            for token, (docs, tfs) in self._postings.items():
+                docs_np = np.frombuffer(docs, dtype=np.int32)
+                keep = remap[docs_np] >= 0
+                if keep.any():
+                    postings[token] = (
+                        array("i", remap[docs_np[keep]].astype(np.int32).tobytes()),
+                        array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()),
+                    )
+            self._postings = postings
+            self._doc_ids = [self._doc_ids[d] for d in live]
+            self._doc_lens = array("i", [self._doc_lens[d] for d in live])
+            self._id_to_doc = {chunk_id: d for d, chunk_id in enumerate(self._doc_ids)}
+
+    def search(self, query: str, top_k: int = 5) -> list[tuple[str, float]]:
+        """
+        Returns up to top_k (chunk_id, bm25_score) pairs, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_live = len(self._id_to_doc)
+            if not terms or n_live == 0:
+                return []
+            doc_lens = np.frombuffer(self._doc_lens, dtype=np.int32)
+            avg_len = self._total_len / n_live or 1.0
+            scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                docs = np.frombuffer(postings[0], dtype=np.int32)
+                tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+                lens = doc_lens[docs]
+                live = lens > 0
+                df = int(live.sum())
+                if df == 0:
+                    continue
+                idf = math.log(1 + (n_live - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * lens / avg_len)
+                scores[docs] += np.where(live, idf * tfs * (self.k1 + 1) / (tfs + norm), 0.0)
+
+            hits = np.flatnonzero(scores > 0)
+            if hits.size == 0:
+                return []
+            order = hits[np.argsort(-scores[hits], kind="stable")[:top_k]]
+            return [(self._doc_ids[d], float(scores[d])) for d in order]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """
+    Fuses ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    """
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+# --- Process-wide default index ---
+_default_index: LexicalIndex | None = None
+_default_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Returns the shared BM25 index. It is not persisted separately: on first
+    use it is rebuilt from the chunk text stored in the vector index payloads.
+    """
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                index = LexicalIndex()
+                vectors = get_index()
+                ids = vectors.ids()
+                payloads = [vectors.get_payload(i) or {} for i in ids]
+                index.upsert(ids, [f"{p.get('title') or ''}\n{p.get('text', '')}" for p in payloads])
+                if ids:
+                    logging.info(f"[Lexical Index] Built BM25 index over {len(ids)} chunks.")
+                _default_index = index
+    return _default_index
@@ -0,0 +1,193 @@
+# backend/utils/llm_client.py
+import asyncio
+import logging
+import random
+from typing import AsyncIterator
+
+from config import settings
+from utils.context_builder import estimate_tokens
+from utils.metrics import LLM_REQUESTS, LLM_TOKENS
+
+# --- Async LLM client layer ---
+# LLMClient wraps a pluggable backend with a bounded concurrency semaphore,
+# per-call timeouts and retries with jittered exponential backoff, so a slow
+# provider delays only the calls waiting on it instead of the whole worker.
+
+
+class LLMError(Exception):
+    """Raised when the LLM call fails after all retries."""
+
+
+class TransientLLMError(LLMError):
+    """A failure worth retrying (rate limit, overload, timeout)."""
+
+
+class LLMBackend:
+    """
+    Interface for LLM providers. `generate` returns the full reply;
+    `stream` yields text fragments as they arrive.
+    """
+
+    name = "base"
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        # Default: one fragment containing the whole reply.
+        yield await self.generate(prompt)
+
+    def is_retryable(self, exc: Exception) -> bool:
+        return isinstance(exc, (TransientLLMError, asyncio.TimeoutError, ConnectionError))
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Uses the native async methods of a google.generativeai GenerativeModel.
+    The model (and its underlying async transport) is created once and
+    reused for every call.
+    """
+
+    name = "gemini"
+    # google.api_core exception names that indicate a transient failure.
+    _RETRYABLE = {"ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "TooManyRequests"}
+
+    def __init__(self, model):
+        self.model = model
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    def is_retryable(self, exc: Exception) -> bool:
+        return super().is_retryable(exc) or type(exc).__name__ in self._RETRYABLE
+
+
+class FakeBackend(LLMBackend):
+    """
+    Offline backend for tests and benchmarks. Replies deterministically after
+    a configurable latency and can inject transient failures.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_s: float = 0.0, token_delay_s: float = 0.0, fail_times: int = 0, reply: str | None = None):
+        self.latency_s = latency_s
+        self.token_delay_s = token_delay_s
+        self.fail_times = fail_times
+        self.reply = reply
+        self.calls = 0
+
+    def _reply_for(self, prompt: str) -> str:
+        if self.reply is not None:
+            return self.reply
+        return f"This is a test reply to a prompt of {len(prompt)} characters."
+
+    async def _maybe_fail(self):
+        self.calls += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise TransientLLMError("injected failure")
+
+    async def generate(self, prompt: str) -> str:
+        await self._maybe_fail()
+        return self._reply_for(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        await self._maybe_fail()
+        for i, token in enumerate(self._reply_for(prompt).split(" ")):
+            if self.token_delay_s:
+                await asyncio.sleep(self.token_delay_s)
+            yield token if i == 0 else " " + token
+
+
+class LLMClient:
+    """
+    Concurrency-limited, timeout- and retry-aware front for an LLMBackend.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        timeout_s: float = settings.LLM_TIMEOUT_S,
+        max_retries: int = settings.LLM_MAX_RETRIES,
+        backoff_base_s: float = 0.25,
+        backoff_max_s: float = 4.0,
+    ):
+        self.backend = backend
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _record(self, outcome: str, prompt: str, reply: str | None = None):
+        name = self.backend.name
+        LLM_REQUESTS.inc(backend=name, outcome=outcome)
+        LLM_TOKENS.inc(estimate_tokens(prompt), backend=name, kind="prompt")
+        if reply:
+            LLM_TOKENS.inc(estimate_tokens(reply), backend=name, kind="completion")
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform in [0, min(cap, base * 2^attempt)].
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+
+    async def generate(self, prompt: str) -> str:
+        """
+        Returns the full reply, retrying transient failures.
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    reply = await asyncio.wait_for(self.backend.generate(prompt), timeout=self.timeout_s)
+                self._record("ok", prompt, reply)
+                return reply
+            except Exception as e:
+                if attempt >= self.max_retries or not self.backend.is_retryable(e):
+                    self._record("error", prompt)
+                    raise LLMError(f"{self.backend.name} call failed after {attempt + 1} attempt(s): {e!r}") from e
+                delay = self._backoff(attempt)
+                logging.warning(f"[LLM Client] {self.backend.name} attempt {attempt + 1} failed ({e!r}); retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Yields reply fragments. Failures before the first fragment are retried;
+        once text has been sent a failure is raised, since it cannot be un-sent.
+        The timeout applies to the wait for each fragment.
+        """
+        attempt = 0
+        while True:
+            started = False
+            fragments: list[str] = []
+            try:
+                async with self._semaphore:
+                    iterator = self.backend.stream(prompt).__aiter__()
+                    while True:
+                        try:
+                            fragment = await asyncio.wait_for(iterator.__anext__(), timeout=self.timeout_s)
+                        except StopAsyncIteration:
+                            self._record("ok", prompt, "".join(fragments))
+                            return
+                        started = True
+                        fragments.append(fragment)
+                        yield fragment
+            except Exception as e:
+                if started or attempt >= self.max_retries or not self.backend.is_retryable(e):
+                    self._record("error", prompt)
+                    raise LLMError(f"{self.backend.name} stream failed after {attempt + 1} attempt(s): {e!r}") from e
+                delay = self._backoff(attempt)
+                logging.warning(f"[LLM Client] {self.backend.name} stream attempt {attempt + 1} failed ({e!r}); retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
@@ -1,13 +1,20 @@
 import os
 import logging
-import google.generativeai as genai
 from dotenv import load_dotenv
+from typing import AsyncIterator
+
+from config import settings
+from utils.llm_client import LLMClient, LLMError, GeminiBackend, FakeBackend
+from utils.model_registry import registry
 
 # Load environment variables from .env file
 load_dotenv()
 
-# --- Configure the Gemini API ---
-try:
+
+# --- Configure the Gemini API (lazily, on first use) ---
+def _load_gemini():
+    import google.generativeai as genai
+
     gemini_api_key = os.getenv("GEMINI_API_KEY")
     if not gemini_api_key:
         raise ValueError("GEMINI_API_KEY not found in environment variables.")
@@ -17,23 +24,40 @@ try:
     # --- THIS IS THE FIX ---
     # The model name has been updated to 'gemini-2.0-flash' to match
     # your working Node.js implementation, which is the correct model.
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    logging.info("Gemini 2.0 Flash model initialized successfully.")
+    return genai.GenerativeModel('gemini-2.0-flash')
 
-except Exception as e:
-    logging.error(f"Failed to configure Gemini API: {e}")
-    model = None
 
-def generate_response(user_query: str, context: str, sentiment_label: str) -> str:
+# --- Shared async client ---
+# "fake" selects the offline backend (tests, benchmarks, local dev without a key).
+def _load_llm_client():
+    if settings.LLM_BACKEND == "fake":
+        return LLMClient(FakeBackend())
+    model = registry.get("gemini")
+    if model is None:
+        raise RuntimeError("Gemini model is not available.")
+    return LLMClient(GeminiBackend(model))
+
+
+# Not required for readiness: without the LLM the app still serves retrieval,
+# sentiment and escalation, and replies with UNAVAILABLE_REPLY.
+registry.register("gemini", _load_gemini, required=False)
+registry.register("llm_client", _load_llm_client, required=False)
+
+
+def get_llm_client() -> LLMClient | None:
+    return registry.get("llm_client")
+
+
+# Canned replies returned when the LLM cannot answer; callers must not cache these.
+UNAVAILABLE_REPLY = "I'm sorry, but my AI service is currently unavailable."
+ERROR_REPLY = "I'm sorry, I encountered an error while trying to process your request."
+
+
+def build_prompt(user_query: str, context: str, sentiment_label: str) -> str:
     """
-    Generates a response using the Gemini LLM, incorporating context and sentiment.
+    Crafts a prompt that uses the retrieved context and sentiment.
     """
-    if not model:
-        logging.error("Gemini model is not available. Cannot generate response.")
-        return "I'm sorry, but my AI service is currently unavailable."
-
-    # Crafting a prompt that uses the retrieved context and sentiment
-    prompt = f"""
+    return f"""
     You are a helpful and empathetic customer support agent.
     Your customer has expressed a sentiment of: "{sentiment_label}".
     
@@ -51,6 +75,19 @@ def generate_response(user_query: str, context: str, sentiment_label: str) -> st
     Your Empathetic Response:
     """
 
+
+def generate_response(user_query: str, context: str, sentiment_label: str) -> str:
+    """
+    Generates a response using the Gemini LLM, incorporating context and sentiment.
+    Synchronous; async code should use generate_response_async instead.
+    """
+    model = registry.get("gemini")
+    if not model:
+        logging.error("Gemini model is not available. Cannot generate response.")
+        return "I'm sorry, but my AI service is currently unavailable."
+
+    prompt = build_prompt(user_query, context, sentiment_label)
+
     try:
         logging.info("Sending prompt to Gemini API...")
         response = model.generate_content(prompt)
@@ -59,3 +96,34 @@ def generate_response(user_query: str, context: str, sentiment_label: str) -> st
     except Exception as e:
         logging.error(f"An error occurred while calling the Gemini API: {e}", exc_info=True)
         return "I'm sorry, I encountered an error while trying to process your request."
+
+
+async def generate_response_async(user_query: str, context: str, sentiment_label: str) -> str:
+    """
+    Non-blocking variant of generate_response, routed through the shared
+    LLMClient (concurrency limit, timeout, retries).
+    """
+    llm_client = await registry.aget("llm_client")
+    if llm_client is None:
+        logging.error("LLM client is not available. Cannot generate response.")
+        return UNAVAILABLE_REPLY
+
+    try:
+        return await llm_client.generate(build_prompt(user_query, context, sentiment_label))
+    except LLMError as e:
+        logging.error(f"An error occurred while calling the LLM: {e}", exc_info=True)
+        return ERROR_REPLY
+
+
+async def stream_response(user_query: str, context: str, sentiment_label: str) -> AsyncIterator[str]:
+    """
+    Streams reply fragments from the shared LLMClient as they arrive.
+    """
+    llm_client = await registry.aget("llm_client")
+    if llm_client is None:
+        logging.error("LLM client is not available. Cannot generate response.")
+        yield UNAVAILABLE_REPLY
+        return
+
+    async for fragment in llm_client.stream(build_prompt(user_query, context, sentiment_label)):
+        yield fragment
@@ -0,0 +1,195 @@
+# backend/utils/metrics.py
+import bisect
+import math
+import threading
+from typing import Callable
+
+# --- In-process metrics (Prometheus text exposition format) ---
+# Counters and histograms are updated on the request path, so an update is
+# a dict lookup and a couple of additions under a lock. Values that the code
+# already tracks (cache hit counters, queue sizes) are not duplicated: they
+# are registered as callbacks and only read when /metrics is scraped.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels) -> dict:
+        """
+        Count, sum and cumulative bucket counts of one label set.
+        """
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            counts, total, count = (list(series[0]), series[1], series[2]) if series else ([0] * (len(self.buckets) + 1), 0.0, 0)
+        cumulative, running = {}, 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            running += n
+            cumulative[bound] = running
+        return {"count": count, "sum": total, "buckets": cumulative}
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+        lines = []
+        for key, counts, total, count in items:
+            running = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                running += n
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    A counter or gauge whose samples are read from callbacks at scrape time.
+    Registering a source again for the same labels replaces the old one.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._sources: dict[tuple, Callable[[], float]] = {}
+
+    def add_source(self, fn: Callable[[], float], **labels):
+        with self._lock:
+            self._sources[self._key(labels)] = fn
+
+    def render(self) -> list[str]:
+        with self._lock:
+            sources = list(self._sources.items())
+        lines = []
+        for key, fn in sources:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module reloads (and tests) get the already registered metric back.
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: tuple = (), kind: str = "gauge") -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, labelnames, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            samples = metric.render()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# --- Shared metrics ---
+HTTP_REQUESTS = metrics.counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_LATENCY = metrics.histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+STAGE_LATENCY = metrics.histogram("stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",))
+BATCH_SIZE = metrics.histogram("batch_size", "Items per batch processed by a component.", ("component",), SIZE_BUCKETS)
+INFERENCE_LATENCY = metrics.histogram("inference_batch_duration_seconds", "Duration of one batched model call.", ("scheduler",))
+LLM_REQUESTS = metrics.counter("llm_requests_total", "LLM calls by outcome.", ("backend", "outcome"))
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Estimated LLM prompt and completion tokens.", ("backend", "kind"))
+CACHE_HITS = metrics.callback("cache_hits_total", "Cache hits.", ("cache",), kind="counter")
+CACHE_MISSES = metrics.callback("cache_misses_total", "Cache misses.", ("cache",), kind="counter")
+QUEUE_DEPTH = metrics.callback("queue_depth", "Items waiting in an in-process queue.", ("queue",))
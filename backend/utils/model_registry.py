@@ -0,0 +1,176 @@
+# backend/utils/model_registry.py
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from config import settings
+
+# --- Lazy model registry ---
+# Models are registered with a loader function and only constructed on first
+# use (or by an explicit warm-up), so importing the app is fast and tests can
+# import modules without downloading or loading any model. Each model has its
+# own lock, so concurrent first calls load it exactly once without blocking
+# callers of other models.
+#
+# A failed load is not final: the slot stays unloaded and is retried with
+# exponential backoff (MODEL_RETRY_BACKOFF_S, doubling up to
+# MODEL_RETRY_MAX_BACKOFF_S). Callers get None in between, as before, and
+# only the first load blocks them; retries run on whichever caller (or the
+# readiness probe's background thread) comes first once they are due.
+
+_PROCESS_START = time.monotonic()
+
+
+class _Slot:
+    def __init__(self, loader: Callable[[], Any], required: bool):
+        self.loader = loader
+        self.required = required
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.value: Any = None
+        self.error: str | None = None
+        self.load_time_s: float | None = None
+        self.failures = 0
+        self.retry_at = 0.0  # monotonic time of the next allowed attempt
+
+
+class ModelRegistry:
+    def __init__(
+        self,
+        retry_backoff_s: float = settings.MODEL_RETRY_BACKOFF_S,
+        max_retry_backoff_s: float = settings.MODEL_RETRY_MAX_BACKOFF_S,
+    ):
+        self._slots: dict[str, _Slot] = {}
+        self.retry_backoff_s = retry_backoff_s
+        self.max_retry_backoff_s = max_retry_backoff_s
+        self.ready_at_s: float | None = None
+
+    def register(self, name: str, loader: Callable[[], Any], required: bool = True):
+        """
+        Registers a loader. `required` models must be loaded for readiness.
+        """
+        self._slots[name] = _Slot(loader, required)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._slots
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the model, loading it on first use. A failed load is logged
+        and returns None (callers keep their existing fallbacks); it is
+        retried on a later call once its backoff has passed.
+        """
+        slot = self._slots[name]
+        if slot.loaded:
+            return slot.value
+        if slot.failures and time.monotonic() < slot.retry_at:
+            return None
+        # The first load is waited for; a retry already running elsewhere is not.
+        if not slot.lock.acquire(blocking=not slot.failures):
+            return None
+        try:
+            if not slot.loaded and time.monotonic() >= slot.retry_at:
+                self._load(name, slot)
+        finally:
+            slot.lock.release()
+        self._mark_ready()
+        return slot.value
+
+    def _load(self, name: str, slot: _Slot):
+        start = time.perf_counter()
+        try:
+            slot.value = slot.loader()
+        except Exception as e:
+            slot.value = None
+            slot.error = str(e)
+            slot.failures += 1
+            backoff = min(self.max_retry_backoff_s, self.retry_backoff_s * 2 ** (slot.failures - 1))
+            slot.retry_at = time.monotonic() + backoff
+            logging.error(f"[Model Registry] Failed to load '{name}' (attempt {slot.failures}, retrying in {backoff:.0f}s): {e}",
+                          exc_info=True)
+        else:
+            slot.error = None
+            slot.failures = 0
+            slot.loaded = True
+            logging.info(f"[Model Registry] Loaded '{name}' in {time.perf_counter() - start:.2f}s.")
+        slot.load_time_s = round(time.perf_counter() - start, 3)
+
+    def _mark_ready(self):
+        if self.ready_at_s is None and self.is_ready():
+            self.ready_at_s = round(time.monotonic() - _PROCESS_START, 3)
+            logging.info(f"[Model Registry] All required models ready {self.ready_at_s}s after process start.")
+
+    async def aget(self, name: str) -> Any:
+        """
+        Async variant of `get`: a first-time load runs in a thread so it does
+        not stall the event loop.
+        """
+        slot = self._slots[name]
+        if slot.loaded:
+            return slot.value
+        if slot.failures and time.monotonic() < slot.retry_at:
+            return None
+        return await asyncio.to_thread(self.get, name)
+
+    def reload(self, name: str) -> Any:
+        slot = self._slots[name]
+        with slot.lock:
+            slot.loaded = False
+            slot.failures = 0
+            slot.retry_at = 0.0
+        return self.get(name)
+
+    def retry_due(self) -> list[str]:
+        """
+        Starts background retries of required models whose backoff has passed,
+        so readiness recovers even while no traffic is routed to this process.
+        Returns the names being retried.
+        """
+        now = time.monotonic()
+        due = [
+            name for name, slot in self._slots.items()
+            if slot.required and not slot.loaded and slot.failures and now >= slot.retry_at and not slot.lock.locked()
+        ]
+        for name in due:
+            threading.Thread(target=self.get, args=(name,), name=f"model-retry-{name}", daemon=True).start()
+        return due
+
+    def is_loaded(self, name: str) -> bool:
+        slot = self._slots.get(name)
+        return bool(slot and slot.loaded and slot.value is not None)
+
+    def warm_up(self, names: list[str] | None = None):
+        """
+        Loads the given (default: all) models now instead of on first request.
+        """
+        for name in names or list(self._slots):
+            self.get(name)
+
+    def is_ready(self) -> bool:
+        return all(self.is_loaded(name) for name, slot in self._slots.items() if slot.required)
+
+    def status(self) -> dict:
+        """
+        Startup report: per-model load state and time, plus time-to-ready.
+        """
+        return {
+            "ready": self.is_ready(),
+            "ready_after_s": self.ready_at_s,
+            "uptime_s": round(time.monotonic() - _PROCESS_START, 3),
+            "models": {
+                name: {
+                    "loaded": self.is_loaded(name),
+                    "required": slot.required,
+                    "load_time_s": slot.load_time_s,
+                    "error": slot.error,
+                    "failures": slot.failures,
+                }
+                for name, slot in self._slots.items()
+            },
+        }
+
+
+# Process-wide registry; modules register their models at import time (cheap).
+registry = ModelRegistry()
@@ -0,0 +1,150 @@
+# backend/utils/onnx_backend.py
+import logging
+import os
+
+import numpy as np
+
+from config import settings
+
+# --- ONNX Runtime inference backend (optional) ---
+# Selected with INFERENCE_BACKEND=onnx. The Hugging Face models are exported to
+# ONNX once (cached under ONNX_CACHE_DIR), optionally with dynamic int8 weight
+# quantization, and run with ONNX Runtime on CPU. The wrappers below mimic the
+# call signatures the services already use (the transformers pipeline and
+# SentenceTransformer.encode), so callers do not change.
+# Requires `onnxruntime` (and torch + transformers for the one-time export).
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+
+def _model_path(model_name: str, quantize: bool) -> str:
+    safe_name = model_name.replace("/", "__")
+    suffix = ".int8.onnx" if quantize else ".onnx"
+    return os.path.join(settings.ONNX_CACHE_DIR, safe_name + suffix)
+
+
+def export_model(model_name: str, kind: str, quantize: bool = False) -> str:
+    """
+    Exports a Hugging Face model to ONNX (once) and returns the file path.
+    `kind` is "encoder" (last_hidden_state output) or "classifier" (logits).
+    """
+    path = _model_path(model_name, quantize)
+    if os.path.exists(path):
+        return path
+    os.makedirs(settings.ONNX_CACHE_DIR, exist_ok=True)
+
+    fp32_path = _model_path(model_name, quantize=False)
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model_cls = AutoModelForSequenceClassification if kind == "classifier" else AutoModel
+        model = model_cls.from_pretrained(model_name).eval()
+        sample = tokenizer(["a sample input"], return_tensors="pt")
+        output_name = "logits" if kind == "classifier" else "last_hidden_state"
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                (sample["input_ids"], sample["attention_mask"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=[output_name],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    output_name: {0: "batch"} if kind == "classifier" else {0: "batch", 1: "sequence"},
+                },
+                opset_version=14,
+            )
+        logging.info(f"[ONNX] Exported {model_name} to {fp32_path}.")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+        logging.info(f"[ONNX] Quantized {model_name} to {path}.")
+    return path
+
+
+def _session(path: str):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if settings.ONNX_NUM_THREADS:
+        options.intra_op_num_threads = settings.ONNX_NUM_THREADS
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX drop-in for the parts of SentenceTransformer that we use: mean pooling
+    over the attention mask followed by L2 normalisation, which is exactly the
+    all-MiniLM-L6-v2 pipeline.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, quantize: bool = settings.ONNX_QUANTIZE, max_length: int = 256):
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.session = _session(export_model(model_name, "encoder", quantize))
+        self.max_length = max_length
+        self._dim = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dim
+
+    def encode(self, texts, batch_size: int = 32, convert_to_numpy: bool = True, normalize_embeddings: bool = True, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors="np",
+            )
+            mask = batch["attention_mask"].astype(np.int64)
+            hidden = self.session.run(None, {"input_ids": batch["input_ids"].astype(np.int64), "attention_mask": mask})[0]
+            summed = (hidden * mask[:, :, None]).sum(axis=1)
+            pooled = summed / np.clip(mask.sum(axis=1, keepdims=True), 1e-9, None)
+            # all-MiniLM-L6-v2 ends with a Normalize layer, so output is always unit length.
+            pooled /= np.linalg.norm(pooled, axis=1, keepdims=True).clip(1e-12)
+            outputs.append(pooled.astype(np.float32))
+        embeddings = np.concatenate(outputs) if outputs else np.empty((0, self._dim), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class OnnxTextClassifier:
+    """
+    ONNX drop-in for a transformers "sentiment-analysis" pipeline: returns
+    [{"label": ..., "score": ...}] per input.
+    """
+
+    def __init__(self, model_name: str = SENTIMENT_MODEL, quantize: bool = settings.ONNX_QUANTIZE, max_length: int = 512):
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.id2label = AutoConfig.from_pretrained(model_name).id2label
+        self.session = _session(export_model(model_name, "classifier", quantize))
+        self.max_length = max_length
+
+    def __call__(self, texts, batch_size: int = 32, truncation: bool = True, **kwargs) -> list[dict]:
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        results = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=truncation,
+                max_length=self.max_length, return_tensors="np",
+            )
+            logits = self.session.run(None, {
+                "input_ids": batch["input_ids"].astype(np.int64),
+                "attention_mask": batch["attention_mask"].astype(np.int64),
+            })[0]
+            exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = exp / exp.sum(axis=1, keepdims=True)
+            for row in probs:
+                best = int(row.argmax())
+                results.append({"label": self.id2label[best], "score": float(row[best])})
+        return results
@@ -0,0 +1,196 @@
+# backend/utils/result_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from config import settings
+from utils.metrics import CACHE_HITS, CACHE_MISSES
+
+# --- Memoized model results ---
+# Short customer messages ("thanks", "ok", "I want a refund") repeat constantly.
+# Results are cached per namespace, keyed by a hash of the normalised message:
+# an in-process LRU in front of an optional SQLite file that survives
+# restarts and can be shared by every worker on the node (WAL mode allows
+# concurrent readers). Keys include a version string of whatever produced the
+# result (model + backend, rule set), so a new model never serves old results.
+# On the event loop, use `aget` / `aput`: they only touch SQLite in a thread.
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def text_key(text: str) -> str:
+    normalized = _WHITESPACE.sub(" ", text.strip().lower())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _DiskTier:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (namespace TEXT, key TEXT, value TEXT, PRIMARY KEY (namespace, key))"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, namespace: str, key: str, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (namespace, key, value) VALUES (?, ?, ?)",
+                (namespace, key, json.dumps(value)),
+            )
+
+
+_disk_tier: _DiskTier | None = None
+_disk_lock = threading.Lock()
+# Set after the disk tier fails to open, so later calls stay in memory.
+_disk_tier_disabled = False
+
+
+def _disk_tier_enabled() -> bool:
+    return bool(settings.RESULT_CACHE_DISK_PATH) and not _disk_tier_disabled
+
+
+def _get_disk_tier() -> _DiskTier | None:
+    global _disk_tier, _disk_tier_disabled
+    if not _disk_tier_enabled():
+        return None
+    if _disk_tier is None:
+        with _disk_lock:
+            if _disk_tier is None:
+                try:
+                    _disk_tier = _DiskTier(settings.RESULT_CACHE_DISK_PATH)
+                except Exception as e:
+                    logging.error(f"[Result Cache] Could not open disk tier: {e}", exc_info=True)
+                    _disk_tier_disabled = True
+                    return None
+    return _disk_tier
+
+
+class ResultCache:
+    """
+    Bounded LRU of JSON-serialisable results keyed by normalised text.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = settings.RESULT_CACHE_SIZE,
+        use_disk: bool = True,
+        version: Callable[[], str] | None = None,
+    ):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.use_disk = use_disk
+        self.version = version
+        self._entries: OrderedDict[str, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHE_HITS.add_source(lambda: self.hits + self.disk_hits, cache=namespace)
+        CACHE_MISSES.add_source(lambda: self.misses, cache=namespace)
+
+    def _remember(self, key: str, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _key(self, text: str) -> str:
+        key = text_key(text)
+        return f"{self.version()}|{key}" if self.version else key
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        return None
+
+    def _disk_get(self, key: str):
+        disk = _get_disk_tier() if self.use_disk else None
+        if disk is not None:
+            value = disk.get(self.namespace, key)
+            if value is not None:
+                self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def _disk_put(self, key: str, value):
+        disk = _get_disk_tier() if self.use_disk else None
+        if disk is not None:
+            try:
+                disk.put(self.namespace, key, value)
+            except Exception as e:
+                logging.warning(f"[Result Cache] Disk write failed for {self.namespace}: {e}")
+
+    def get(self, text: str):
+        key = self._key(text)
+        value = self._memory_get(key)
+        return value if value is not None else self._disk_get(key)
+
+    def put(self, text: str, value):
+        key = self._key(text)
+        self._remember(key, value)
+        self._disk_put(key, value)
+
+    async def aget(self, text: str):
+        """
+        `get` for the event loop: memory hits return at once, the disk tier is read in a thread.
+        """
+        key = self._key(text)
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        if not (self.use_disk and _disk_tier_enabled()):
+            self.misses += 1
+            return None
+        return await asyncio.to_thread(self._disk_get, key)
+
+    async def aput(self, text: str, value):
+        """
+        `put` for the event loop: the disk write runs in a thread.
+        """
+        key = self._key(text)
+        self._remember(key, value)
+        if self.use_disk and _disk_tier_enabled():
+            await asyncio.to_thread(self._disk_put, key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,270 @@
+# backend/utils/rule_engine.py
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+from config import settings
+
+# --- Compiled trigger-phrase matcher ---
+# Every trigger phrase (escalation rules and the fallback sentiment lexicon)
+# is compiled into one Aho-Corasick automaton over *word tokens*. A message
+# is tokenised once and walked once, so the cost per message does not grow
+# with the number of rules, and phrases only match on word boundaries
+# ("sue" does not fire inside "issue").
+#
+# Rules marked `stem` also match inflected forms ("refunds", "escalated",
+# "cancelled"): they are compiled into a second automaton over light stems,
+# and the message's tokens are stemmed once for it. Stems are still whole
+# tokens, so "issue" never stems to "sue".
+#
+# Rules live in a JSON file (RULES_PATH). The file is re-read when its
+# modification time changes, and the new automaton is swapped in atomically,
+# so rules can be edited without a restart.
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+# Longest first; "e" last so that "escalate", "escalated" and "escalation" share a stem.
+_SUFFIXES = ("ions", "ion", "ings", "ing", "ed", "es", "s", "e")
+_DOUBLED = re.compile(r"([b-df-hj-np-tv-z])\1$")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+def stem(token: str) -> str:
+    """
+    Strips one inflectional suffix ("refunds" -> "refund", "cancelled" ->
+    "cancel", "escalating" -> "escalat"). Only meant for matching stemmed
+    rule phrases against stemmed messages, not as a linguistic stemmer.
+    """
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            base = token[: -len(suffix)]
+            if suffix in ("ed", "ing", "ings"):
+                base = _DOUBLED.sub(r"\1", base)
+            return base
+    return token
+
+
+class Rule:
+    def __init__(self, phrase: str, tag: str, weight: float = 1.0, data: dict | None = None, stem: bool = False):
+        self.phrase = phrase
+        self.tag = tag
+        self.weight = weight
+        self.data = data or {}
+        self.stem = stem
+        self.tokens = tuple(_stem_all(tokenize(phrase)) if stem else tokenize(phrase))
+
+    def __repr__(self) -> str:
+        return f"Rule({self.phrase!r}, tag={self.tag!r}, weight={self.weight})"
+
+
+class Match:
+    def __init__(self, rule: Rule, start: int, end: int):
+        self.rule = rule
+        self.start = start  # token offsets
+        self.end = end
+
+
+class PhraseAutomaton:
+    """
+    Aho-Corasick automaton whose alphabet is word tokens.
+    """
+
+    def __init__(self, rules: list[Rule]):
+        self.rules = [r for r in rules if r.tokens]
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[Rule]] = [[]]
+
+        for rule in self.rules:
+            state = 0
+            for token in rule.tokens:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][token] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(rule)
+
+        # Breadth-first construction of failure links; outputs are merged along them.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                if state == 0:
+                    continue  # depth-1 states fail back to the root
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(token, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, tokens: list[str]) -> list[Match]:
+        matches = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for i, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for rule in out[state]:
+                matches.append(Match(rule, i + 1 - len(rule.tokens), i + 1))
+        return matches
+
+
+def _stem_all(tokens: list[str]) -> list[str]:
+    return [stem(t) for t in tokens]
+
+
+def load_rules(path: str) -> tuple[list[Rule], dict, str]:
+    """
+    Parses the rules file into Rule objects, per-section settings and a
+    content hash that identifies this rule set.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    spec = json.loads(raw.decode("utf-8"))
+    version = hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+    rules: list[Rule] = []
+    # "stem" can be set per section and overridden per escalation rule / sentiment group.
+    escalation = spec.get("escalation", {})
+    for item in escalation.get("rules", []):
+        rules.append(Rule(item["phrase"], "escalation", float(item.get("weight", 0.9)),
+                          stem=bool(item.get("stem", escalation.get("stem", False)))))
+
+    sentiment = spec.get("sentiment", {})
+    for priority, group in enumerate(sentiment.get("groups", [])):
+        data = {"label": group["label"], "score": group["score"], "emotions": group.get("emotions"), "priority": priority}
+        stemmed = bool(group.get("stem", sentiment.get("stem", False)))
+        for phrase in group.get("phrases", []):
+            rules.append(Rule(phrase, "sentiment", 1.0, data, stem=stemmed))
+
+    options = {
+        "escalation_threshold": float(escalation.get("threshold", 0.85)),
+        "sentiment_default": sentiment.get("default", {"label": "neutral", "score": 0.6, "emotions": {"neutral": 0.7}}),
+    }
+    return rules, options, version
+
+
+class RuleEngine:
+    def __init__(self, path: str = settings.RULES_PATH, check_interval_s: float = settings.RULES_RELOAD_INTERVAL_S):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._mtime: float | None = None
+        self._next_check = 0.0
+        # (exact-token automaton, stemmed-token automaton)
+        self._automata = (PhraseAutomaton([]), PhraseAutomaton([]))
+        # Changes whenever the rule set does; callers that memoize results include it in their keys.
+        self.version = ""
+        self.options: dict = {"escalation_threshold": 0.85, "sentiment_default": {"label": "neutral", "score": 0.6}}
+        self.reload()
+
+    def reload(self) -> int:
+        """
+        Re-reads the rules file and swaps in a freshly compiled automaton.
+        Keeps the previous rules if the file is missing or invalid.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+            rules, options, version = load_rules(self.path)
+            automata = (PhraseAutomaton([r for r in rules if not r.stem]), PhraseAutomaton([r for r in rules if r.stem]))
+        except Exception as e:
+            logging.error(f"[Rule Engine] Could not load rules from {self.path}: {e}", exc_info=True)
+            self._warn_if_empty()
+            return len(self.rules())
+        with self._lock:
+            self._automata, self.options, self.version, self._mtime = automata, options, version, mtime
+        logging.info(f"[Rule Engine] Compiled {len(rules)} rules from {self.path}.")
+        self._warn_if_empty()
+        return len(self.rules())
+
+    def _warn_if_empty(self):
+        if not self.rules():
+            logging.error(
+                f"[Rule Engine] No rules loaded from {self.path}; keyword escalation and "
+                "fallback sentiment are disabled and readiness will fail."
+            )
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval_s
+        try:
+            if os.path.getmtime(self.path) != self._mtime:
+                self.reload()
+        except OSError:
+            pass
+
+    def match(self, text: str) -> list[Match]:
+        """
+        All rule matches in the text, in order of occurrence.
+        """
+        self._maybe_reload()
+        exact, stemmed = self._automata
+        tokens = tokenize(text)
+        matches = exact.find_all(tokens)
+        if stemmed.rules:
+            matches = sorted(matches + stemmed.find_all(_stem_all(tokens)), key=lambda m: (m.end, m.start))
+        return matches
+
+    def rules(self, tag: str | None = None) -> list[Rule]:
+        exact, stemmed = self._automata
+        return [r for r in exact.rules + stemmed.rules if tag is None or r.tag == tag]
+
+
+_engine: RuleEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RuleEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RuleEngine()
+    return _engine
+
+
+def score_escalation(matches: list[Match], threshold: float) -> dict:
+    """
+    Noisy-OR of the matched escalation rule weights, with every matched phrase as a reason.
+    """
+    reasons = []
+    miss = 1.0
+    for m in matches:
+        if m.rule.tag == "escalation" and m.rule.phrase not in reasons:
+            reasons.append(m.rule.phrase)
+            miss *= 1.0 - m.rule.weight
+    score = round(1.0 - miss, 4)
+    return {"predicted": score >= threshold, "score": score, "reasons": reasons}
+
+
+def classify_sentiment(matches: list[Match], default: dict) -> dict:
+    """
+    Keyword sentiment: the highest-priority group with any matched phrase wins.
+    """
+    hits = [m.rule for m in matches if m.rule.tag == "sentiment"]
+    if not hits:
+        return dict(default)
+    best = min(hits, key=lambda r: r.data["priority"]).data
+    return {
+        "label": best["label"],
+        "score": best["score"],
+        "emotions": best.get("emotions"),
+        "reasons": sorted({r.phrase for r in hits if r.data["priority"] == best["priority"]}),
+    }
@@ -0,0 +1,76 @@
+# backend/utils/shared_serving.py
+import gc
+import logging
+import os
+import time
+
+# --- Fork-after-load serving ---
+# With gunicorn's `preload_app`, the master process imports the app, loads the
+# shareable models and the vector index once, and then forks the workers. Model
+# weights (torch tensor storage) and NumPy arrays are plain memory buffers, so
+# the workers share those pages copy-on-write until something writes to them.
+# Nothing here writes to them on the request path: the index is memory-mapped
+# read-only and only detaches into private memory if a worker ingests articles.
+#
+# Only fork-safe state is built in the master. torch is limited to one thread
+# before loading, so no OpenMP / intra-op pool exists at fork time (forking a
+# process with a live pool can deadlock the child). Everything else is created
+# lazily in each worker after the fork: the Gemini client (gRPC channels do not
+# survive fork), the LLM client (its asyncio primitives belong to the worker's
+# loop) and ONNX Runtime sessions (which start native thread pools on creation).
+
+# Registry models whose state is only torch weights.
+SHARED_MODELS = ("embedding", "sentiment", "reranker")
+
+
+def _set_torch_threads(threads: int) -> bool:
+    try:
+        import torch
+    except ImportError:
+        return False
+    torch.set_num_threads(threads)
+    return True
+
+
+def preload():
+    """
+    Loads everything that should be shared between workers. Called in the
+    gunicorn master before forking (see gunicorn_conf.py).
+    """
+    start = time.perf_counter()
+
+    # Importing the services registers the model loaders (nothing is loaded yet).
+    import services  # noqa: F401
+    from config import settings
+    from utils.model_registry import registry
+    from utils.vector_db import get_index
+    from utils.lexical_index import get_lexical_index
+
+    models: list[str] = []
+    if settings.INFERENCE_BACKEND != "onnx" and _set_torch_threads(1):
+        models = [name for name in SHARED_MODELS if name in registry]
+        registry.warm_up(models)
+    index = get_index()
+    get_lexical_index()
+
+    # Move every object created so far into the permanent generation so the
+    # cyclic GC in the workers never touches (and thereby copies) their pages.
+    gc.collect()
+    gc.freeze()
+
+    logging.info(
+        f"[Shared Serving] Preloaded models {models} and {len(index)} indexed chunks "
+        f"in {time.perf_counter() - start:.1f}s (pid {os.getpid()})."
+    )
+
+
+def post_fork(workers: int):
+    """
+    Per-worker setup after fork: split the CPU cores between workers so N
+    workers don't each start a full-size torch thread pool. Models that were
+    not preloaded (LLM clients, ONNX sessions) load in this worker, on first
+    use or in its startup warm-up.
+    """
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    if _set_torch_threads(threads):
+        logging.info(f"[Shared Serving] Worker {os.getpid()} using {threads} torch threads.")
@@ -0,0 +1,122 @@
+# backend/utils/tracing.py
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from config import settings
+from utils.metrics import HTTP_LATENCY, HTTP_REQUESTS, STAGE_LATENCY
+
+# --- Per-request tracing ---
+# RequestContextMiddleware gives every HTTP request an id (the caller's
+# X-Request-ID if it is sane, a fresh one otherwise) and a span list, both
+# held in context variables so that tasks started by the request (asyncio
+# tasks, asyncio.to_thread) see them too. `span()` times a block, feeds the
+# stage_duration_seconds histogram and appends to the current request's
+# spans. The spans are returned in a Server-Timing header and logged for
+# requests slower than TRACE_SLOW_REQUEST_MS.
+
+request_id_var: ContextVar[str | None] = ContextVar("request_id", default=None)
+_spans_var: ContextVar[list | None] = ContextVar("spans", default=None)
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._\-]{1,64}$")
+
+
+def current_request_id() -> str | None:
+    return request_id_var.get()
+
+
+def record_span(name: str, seconds: float):
+    """
+    Records an already measured stage duration.
+    """
+    STAGE_LATENCY.observe(seconds, stage=name)
+    spans = _spans_var.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name: str):
+    """
+    Times the enclosed block as pipeline stage `name` (works in async code too).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def server_timing(spans: list[tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in spans)
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Adds `request_id` to log records ("-" outside of a request).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+def _route_template(scope) -> str:
+    # The route template, not the raw path, keeps label cardinality bounded.
+    # Recent FastAPI versions keep the include_router prefix out of
+    # `route.path` and record the full template in their own scope entry.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(context, "path", None) or getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware (no per-request task or body buffering, unlike
+    BaseHTTPMiddleware) that assigns request ids and records HTTP metrics.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = next((v.decode("latin-1") for k, v in scope.get("headers", []) if k == b"x-request-id"), "")
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        spans: list[tuple[str, float]] = []
+        id_token = request_id_var.set(request_id)
+        spans_token = _spans_var.set(spans)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                if spans:
+                    headers.append((b"server-timing", server_timing(spans).encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = _route_template(scope)
+            method = scope.get("method", "")
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            if settings.TRACE_SLOW_REQUEST_MS and elapsed * 1000 >= settings.TRACE_SLOW_REQUEST_MS:
+                logging.warning(
+                    f"[Tracing] Slow request {method} {route} took {elapsed * 1000:.0f}ms "
+                    f"({server_timing(spans) or 'no spans'})"
+                )
+            request_id_var.reset(id_token)
+            _spans_var.reset(spans_token)
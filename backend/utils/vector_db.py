@@ -0,0 +1,836 @@
+# backend/utils/vector_db.py
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from config import settings
+
+# --- In-process vector index ---
+# Embeddings are kept as one contiguous float32 matrix (one L2-normalised row per
+# chunk) so that cosine similarity is a single matrix-vector product. Small
+# indexes are searched exactly; once the index grows past
+# `exact_threshold` rows an IVF (inverted file) layer is trained with k-means and
+# only the `nprobe` closest clusters are scanned per query.
+#
+# Optional compressed mode (`quantization="int8"` or `"binary"`): candidates
+# are first scored against compact codes kept in RAM (int8 with a per-row
+# scale, or 1 bit per dimension compared by Hamming distance), and only the
+# best `top_k * rescore_factor` are rescored against the full-precision rows.
+#
+# Rows live in two segments: a read-only base, memory-mapped from the saved
+# file with `mmap`, and an in-RAM delta that writes append to. Writes never
+# copy the mapped base into RAM; `save` and `compact` fold the delta into a
+# freshly written base file and map that instead. With compressed codes only
+# the pages of rescored candidates are then ever read.
+#
+# Searches never lock: writers publish immutable snapshots. Deleting (or
+# tombstoning, or overwriting) a chunk only clears its bit in an `alive` mask,
+# so it disappears from search and lookups at once, and `compact()` (run in
+# the background by ingestion) removes the dead rows later in one pass.
+
+_VECTORS_FILE = "vectors.npy"
+_CENTROIDS_FILE = "centroids.npy"
+_ASSIGN_FILE = "assign.npy"
+_META_FILE = "meta.json"
+_CODES_FILE = "codes.npy"
+_CODE_SCALES_FILE = "code_scales.npy"
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+# Rescore factors that keep recall@10 within VECTOR_RECALL_TOLERANCE of exact
+# search. Binary needs a corpus-dependent factor (hundreds at 100k rows), so
+# it has none and must be configured explicitly.
+DEFAULT_RESCORE_FACTORS = {"none": 1, "int8": 10}
+
+_BLOCK_ROWS = 4096
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Returns a float32, L2-normalised copy of a (n, dim) matrix.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _save_npy(path: str, array: np.ndarray):
+    """
+    Writes an .npy file via a temp file so a live memory map of the old file
+    is never truncated underneath a reader.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _popcount(bits: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits)
+    return _POPCOUNT_TABLE[bits]
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first, without a full sort.
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class _Snapshot:
+    """
+    One published, read-only view of the index. Rows below `count` are never
+    written again: writers append past `count` (invisible to this snapshot) or
+    build new arrays, then publish a new snapshot by swapping one reference.
+    Row r is base[r] below len(base), else delta[r - len(base)].
+    """
+
+    __slots__ = (
+        "base", "delta", "codes", "code_scales", "assign", "alive", "ids", "id_to_row",
+        "count", "dead", "centroids", "list_offsets", "list_count", "generation",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def replace(self, **changes) -> "_Snapshot":
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return _Snapshot(**fields)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index with add/delete/upsert and on-disk persistence.
+
+    All row data lives in an immutable `_Snapshot`: searches read the current
+    one without locking, while writers (serialised by `_lock`) append rows or
+    build new arrays and swap the reference. Deleted and overwritten rows are
+    only marked dead in the snapshot's `alive` mask until `compact`.
+    """
+
+    def __init__(
+        self,
+        dim: int = settings.EMBEDDING_DIM,
+        exact_threshold: int = settings.VECTOR_EXACT_THRESHOLD,
+        nprobe: int = settings.VECTOR_IVF_NPROBE,
+        quantization: str = settings.VECTOR_QUANTIZATION,
+        rescore_factor: int = settings.VECTOR_RESCORE_FACTOR,
+        initial_capacity: int = 1024,
+        mmap: bool = False,
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+        if not rescore_factor:
+            if quantization not in DEFAULT_RESCORE_FACTORS:
+                raise ValueError(
+                    f"Quantization '{quantization}' needs an explicit rescore factor (VECTOR_RESCORE_FACTOR); "
+                    "pick one with benchmarks/recall_benchmark.py"
+                )
+            rescore_factor = DEFAULT_RESCORE_FACTORS[quantization]
+        self.dim = dim
+        self.exact_threshold = exact_threshold
+        self.nprobe = nprobe
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        # Serve the base segment from the file written by save/compact.
+        self.mmap = mmap
+
+        self._payloads: dict[str, dict] = {}
+        self._trained_count = 0
+        self._snap = self._empty_snapshot(initial_capacity)
+        self._path: str | None = None
+        # Bumped by every write, so that saving an unchanged index is skipped.
+        self._version = 0
+        self._saved: tuple[str, int] | None = None
+
+        # Serialises writers only; searches never take it.
+        self._lock = threading.RLock()
+        # One off-lock rewrite (training, re-layout, compaction) at a time.
+        self._rewrite_lock = threading.Lock()
+
+    def _empty_snapshot(self, capacity: int, base: np.ndarray | None = None) -> _Snapshot:
+        """
+        A snapshot over `base` (no rows by default) with room for `capacity`
+        appended rows; its count is still 0.
+        """
+        base = np.zeros((0, self.dim), dtype=np.float32) if base is None else base
+        codes, code_scales = self._empty_codes(base.shape[0] + capacity)
+        total = base.shape[0] + capacity
+        return _Snapshot(
+            base=base,
+            delta=np.zeros((capacity, self.dim), dtype=np.float32),
+            codes=codes,
+            code_scales=code_scales,
+            # IVF state: the cluster of each row. The first `list_count` rows
+            # are laid out cluster by cluster, so each inverted list is the
+            # contiguous block list_offsets[c]:list_offsets[c + 1].
+            assign=np.zeros(total, dtype=np.int32),
+            alive=np.ones(total, dtype=bool),
+            ids=[],
+            id_to_row={},
+            count=0,
+            dead=0,
+            centroids=None,
+            list_offsets=None,
+            list_count=0,
+            # Bumped whenever a rewrite renumbers the rows, so that a rewrite
+            # built against an older numbering is thrown away.
+            generation=0,
+        )
+
+    # ---------- Introspection ----------
+    def __len__(self) -> int:
+        snap = self._snap
+        return snap.count - snap.dead
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._snap.id_to_row
+
+    @property
+    def tombstone_count(self) -> int:
+        """
+        Dead rows (deleted, tombstoned or overwritten) awaiting `compact`.
+        """
+        return self._snap.dead
+
+    @property
+    def is_trained(self) -> bool:
+        return self._snap.centroids is not None
+
+    def get_payload(self, chunk_id: str) -> dict | None:
+        return self._payloads.get(chunk_id)
+
+    def ids(self) -> list[str]:
+        return list(self._snap.id_to_row)
+
+    def get_vectors(self, ids: list[str]) -> dict[str, np.ndarray]:
+        """
+        Stored (normalised) vectors of the given ids; unknown ids are skipped.
+        """
+        snap = self._snap
+        rows = {chunk_id: snap.id_to_row.get(chunk_id) for chunk_id in ids}
+        # Rows appended after this snapshot was taken are not readable from it.
+        rows = {chunk_id: row for chunk_id, row in rows.items() if row is not None and row < snap.count}
+        if not rows:
+            return {}
+        vectors = self._take(snap, np.fromiter(rows.values(), dtype=np.int64, count=len(rows)))
+        return dict(zip(rows, vectors))
+
+    def memory_bytes(self) -> dict:
+        """
+        Bytes used by the full-precision rows and by the compressed codes.
+        """
+        snap = self._snap
+        n = snap.count
+        mapped = isinstance(snap.base, np.memmap)
+        in_ram = n - snap.base.shape[0] if mapped else n
+        return {
+            "vectors": n * self.dim * 4,
+            "vectors_memory_mapped": mapped,
+            "vectors_resident": in_ram * self.dim * 4,
+            "codes": int(snap.codes[:n].nbytes + snap.code_scales[:n].nbytes) if self.quantization != "none" else 0,
+        }
+
+    # ---------- Segments ----------
+    @staticmethod
+    def _segments(snap: _Snapshot, start: int, end: int):
+        """
+        Yields rows start:end as contiguous slices, split where the base ends.
+        """
+        nb = snap.base.shape[0]
+        if start < nb:
+            yield snap.base[start:min(end, nb)]
+        if end > nb:
+            yield snap.delta[max(start, nb) - nb:end - nb]
+
+    @staticmethod
+    def _take(snap: _Snapshot, rows: np.ndarray) -> np.ndarray:
+        """
+        Copies the given rows, in the given order, out of both segments.
+        """
+        nb = snap.base.shape[0]
+        in_base = rows < nb
+        if in_base.all():
+            return np.asarray(snap.base[rows])
+        if not in_base.any():
+            return snap.delta[rows - nb]
+        out = np.empty((rows.shape[0], snap.base.shape[1]), dtype=np.float32)
+        out[in_base] = snap.base[rows[in_base]]
+        out[~in_base] = snap.delta[rows[~in_base] - nb]
+        return out
+
+    # ---------- Quantization ----------
+    def _code_width(self) -> int:
+        if self.quantization == "binary":
+            return (self.dim + 7) // 8
+        if self.quantization == "int8":
+            return self.dim
+        return 0
+
+    def _empty_codes(self, capacity: int) -> tuple[np.ndarray, np.ndarray]:
+        dtype = np.int8 if self.quantization == "int8" else np.uint8
+        return np.zeros((capacity, self._code_width()), dtype=dtype), np.zeros(capacity, dtype=np.float32)
+
+    def _encode(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compresses normalised rows. int8 codes carry a per-row scale so that
+        code * scale / 127 approximates the original row.
+        """
+        if self.quantization == "binary":
+            return np.packbits(vectors > 0, axis=1), np.ones(vectors.shape[0], dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1)
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None] * 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def _encode_all(self, vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Codes for every row of a (possibly memory-mapped) matrix, built in blocks.
+        """
+        n = vectors.shape[0]
+        codes, code_scales = self._empty_codes(n)
+        if self.quantization == "none":
+            return codes, code_scales
+        for start in range(0, n, _BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + _BLOCK_ROWS])
+            end = start + block.shape[0]
+            codes[start:end], code_scales[start:end] = self._encode(block)
+        return codes, code_scales
+
+    def _approx_scores(self, snap: _Snapshot, start: int, end: int, q: np.ndarray) -> np.ndarray:
+        """
+        Scores rows start:end against the query using only the codes, in
+        blocks so that no full-size float32 temporary is ever allocated.
+        """
+        scores = np.empty(end - start, dtype=np.float32)
+        if self.quantization == "binary":
+            q_bits = np.packbits(q > 0)
+        for block in range(start, end, _BLOCK_ROWS):
+            sel = slice(block, min(block + _BLOCK_ROWS, end))
+            out = slice(sel.start - start, sel.stop - start)
+            if self.quantization == "binary":
+                hamming = _popcount(np.bitwise_xor(snap.codes[sel], q_bits)).sum(axis=1, dtype=np.int32)
+                scores[out] = self.dim - 2 * hamming
+            else:
+                scores[out] = (snap.codes[sel].astype(np.float32) @ q) * (snap.code_scales[sel] / 127.0)
+        return scores
+
+    # ---------- Mutations ----------
+    def _writable(self, snap: _Snapshot, needed: int) -> _Snapshot:
+        """
+        Returns `snap`, or an unpublished copy whose delta and per-row arrays
+        have room for `needed` rows (amortised doubling). The base segment is
+        shared, never copied. Only rows past `snap.count` may be written in place.
+        """
+        nb = snap.base.shape[0]
+        capacity = snap.alive.shape[0]
+        if needed <= capacity and snap.assign.flags.writeable:
+            return snap
+        grown = self._empty_snapshot(max(needed - nb, 2 * (capacity - nb), 1024), base=snap.base)
+        n = snap.count
+        grown.delta[: n - nb] = snap.delta[: n - nb]
+        grown.codes[:n] = snap.codes[:n]
+        grown.code_scales[:n] = snap.code_scales[:n]
+        grown.assign[:n] = snap.assign[:n]
+        grown.alive[:n] = snap.alive[:n]
+        return snap.replace(
+            delta=grown.delta,
+            codes=grown.codes,
+            code_scales=grown.code_scales,
+            assign=grown.assign,
+            alive=grown.alive,
+        )
+
+    def upsert(self, ids: list[str], vectors, payloads: list[dict] | None = None):
+        """
+        Inserts new chunks and overwrites existing ones in a single batch.
+        """
+        if not ids:
+            return
+        vectors = _normalize(vectors)
+        if vectors.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected vectors of shape ({len(ids)}, {self.dim}), got {vectors.shape}")
+        payloads = payloads or [None] * len(ids)
+        # The last occurrence of a repeated id wins.
+        last = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        if len(last) < len(ids):
+            picked = list(last.values())
+            ids, vectors, payloads = list(last), vectors[picked], [payloads[i] for i in picked]
+
+        with self._lock:
+            snap = self._writable(self._snap, self._snap.count + len(ids))
+            start, end = snap.count, snap.count + len(ids)
+            nb = snap.base.shape[0]
+            snap.delta[start - nb:end - nb] = vectors
+            if self.quantization != "none":
+                snap.codes[start:end], snap.code_scales[start:end] = self._encode(vectors)
+            if snap.centroids is not None:
+                snap.assign[start:end] = self._nearest_centroids(snap.centroids, vectors)
+            snap.alive[start:end] = True
+
+            # Overwritten chunks get a fresh row and their old one is marked
+            # dead, so no row a reader can see is ever rewritten.
+            replaced = [snap.id_to_row[i] for i in ids if i in snap.id_to_row]
+            alive = snap.alive
+            if replaced:
+                alive = alive.copy()
+                alive[replaced] = False
+            snap.ids.extend(ids)
+            for row, chunk_id in enumerate(ids, start):
+                snap.id_to_row[chunk_id] = row
+            for chunk_id, payload in zip(ids, payloads):
+                if payload is not None:
+                    self._payloads[chunk_id] = payload
+            self._snap = snap.replace(count=end, alive=alive, dead=snap.dead + len(replaced))
+            self._version += 1
+
+        self._maybe_train()
+        self._maybe_relayout()
+
+    def add(self, ids: list[str], vectors, payloads: list[dict] | None = None):
+        """
+        Adds chunks that must not already exist in the index.
+        """
+        existing = [i for i in ids if i in self]
+        if existing:
+            raise KeyError(f"Chunk ids already indexed: {existing[:5]}")
+        self.upsert(ids, vectors, payloads)
+
+    def delete(self, ids: list[str]) -> int:
+        """
+        Removes chunks by id: they vanish from search and lookups at once and
+        their rows are dropped by the next `compact`. Returns the number removed.
+        """
+        with self._lock:
+            snap = self._snap
+            rows = []
+            for chunk_id in ids:
+                row = snap.id_to_row.pop(chunk_id, None)
+                if row is not None:
+                    rows.append(row)
+                    self._payloads.pop(chunk_id, None)
+            if rows:
+                alive = snap.alive.copy()
+                alive[rows] = False
+                self._snap = snap.replace(alive=alive, dead=snap.dead + len(rows))
+                self._version += 1
+            return len(rows)
+
+    def update_payloads(self, ids: list[str], payloads: list[dict]) -> int:
+        """
+        Replaces the payloads of indexed chunks without touching their vectors.
+        """
+        updated = 0
+        with self._lock:
+            for chunk_id, payload in zip(ids, payloads):
+                if chunk_id in self:
+                    self._payloads[chunk_id] = payload
+                    updated += 1
+            self._version += bool(updated)
+        return updated
+
+    def tombstone(self, ids: list[str]) -> int:
+        """
+        Hides chunks from search and lookups without moving any rows; the
+        same as `delete`. Returns the number of chunks newly tombstoned.
+        """
+        return self.delete(ids)
+
+    def compact(self) -> int:
+        """
+        Drops dead rows and renumbers the live ones. The compacted arrays are
+        built outside the writer lock and swapped in, so ingestion and search
+        carry on meanwhile. Returns the number of rows removed.
+        """
+        with self._rewrite_lock:
+            version, snap = self._snapshot()
+            if not snap.dead:
+                return 0
+            keep = np.flatnonzero(snap.alive[: snap.count])
+            # Dropping rows keeps the cluster-ordered prefix in order.
+            list_count = int(np.searchsorted(keep, snap.list_count))
+            self._rewrite(snap, keep, list_count, path=self._mapped_path(), version=version)
+            return snap.count - keep.shape[0]
+
+    def _snapshot(self) -> tuple[int, _Snapshot]:
+        """
+        The current snapshot and a write version it is at least as new as.
+        Writers publish before bumping the version, so reading the version
+        first can only under-report (and cost an extra save), never skip one.
+        """
+        version = self._version
+        return version, self._snap
+
+    def _mapped_path(self) -> str | None:
+        """
+        Where rewrites of a file-backed index go, so they never land in RAM.
+        """
+        return self._path if self.mmap else None
+
+    def _rewrite(
+        self,
+        snap: _Snapshot,
+        order: np.ndarray,
+        list_count: int,
+        assign: np.ndarray | None = None,
+        centroids: np.ndarray | None = None,
+        path: str | None = None,
+        version: int | None = None,
+    ) -> bool:
+        """
+        Publishes a copy of `snap` holding only the rows in `order`, in that
+        order, whose first `list_count` rows are sorted by cluster. Those rows
+        become the new base segment; with `path` the whole index is written
+        there (recorded as a save of `version`), and with `mmap` the base is
+        then mapped from that file rather than held in RAM. The copy (with room to spare) is built outside the
+        writer lock; under it only the rows appended to or killed in the index
+        meanwhile are carried over, into the new delta. Returns False if
+        another rewrite renumbered the rows first.
+        """
+        assign = snap.assign if assign is None else assign
+        centroids = snap.centroids if centroids is None else centroids
+        m = order.shape[0]
+        if path and self.mmap:
+            os.makedirs(path, exist_ok=True)
+            vectors_path = os.path.join(path, _VECTORS_FILE)
+            base = np.lib.format.open_memmap(vectors_path + ".tmp", mode="w+", dtype=np.float32, shape=(m, self.dim))
+        else:
+            base = np.empty((m, self.dim), dtype=np.float32)
+        # Copied in blocks, so a memory-mapped rewrite never holds the matrix in RAM.
+        for start in range(0, m, _BLOCK_ROWS):
+            rows = order[start:start + _BLOCK_ROWS]
+            base[start:start + rows.shape[0]] = self._take(snap, rows)
+        fresh = self._empty_snapshot(max(_BLOCK_ROWS, m // 8), base=base)
+        fresh.codes[:m] = snap.codes[order]
+        fresh.code_scales[:m] = snap.code_scales[order]
+        fresh.assign[:m] = assign[order]
+        ids = [snap.ids[row] for row in order.tolist()]
+        id_to_row = dict(zip(ids, range(m)))
+        list_offsets = None
+        if centroids is not None:
+            counts = np.bincount(fresh.assign[:list_count], minlength=centroids.shape[0])
+            list_offsets = np.concatenate(([0], np.cumsum(counts)))
+        if path:
+            if self.mmap:
+                base.flush()
+                os.replace(vectors_path + ".tmp", vectors_path)
+                fresh = fresh.replace(base=np.load(vectors_path, mmap_mode="r"))
+            else:
+                os.makedirs(path, exist_ok=True)
+                _save_npy(os.path.join(path, _VECTORS_FILE), base)
+            self._write_files(path, fresh, ids, centroids, list_count)
+
+        with self._lock:
+            current = self._snap
+            if current.generation != snap.generation:
+                return False
+            end = m + current.count - snap.count
+            fresh = self._writable(fresh.replace(count=m), end)
+            fresh.alive[:m] = current.alive[order]
+            if end > m:
+                tail = slice(snap.count, current.count)
+                fresh.delta[: end - m] = self._take(current, np.arange(snap.count, current.count))
+                fresh.codes[m:end] = current.codes[tail]
+                fresh.code_scales[m:end] = current.code_scales[tail]
+                if centroids is not None and centroids is not current.centroids:
+                    fresh.assign[m:end] = self._nearest_centroids(centroids, fresh.delta[: end - m])
+                else:
+                    fresh.assign[m:end] = current.assign[tail]
+                fresh.alive[m:end] = current.alive[tail]
+                tail_ids = current.ids[tail]
+                ids.extend(tail_ids)
+                for i, chunk_id in enumerate(tail_ids):
+                    if current.id_to_row.get(chunk_id) == snap.count + i:
+                        id_to_row[chunk_id] = m + i
+            for row in np.flatnonzero(~fresh.alive[:m]).tolist():
+                # Killed after the copy was taken.
+                if id_to_row.get(ids[row]) == row:
+                    del id_to_row[ids[row]]
+            self._snap = fresh.replace(
+                ids=ids,
+                id_to_row=id_to_row,
+                count=end,
+                dead=int(np.count_nonzero(~fresh.alive[:end])),
+                centroids=centroids,
+                list_offsets=list_offsets,
+                list_count=list_count,
+                generation=snap.generation + 1,
+            )
+            if path:
+                self._path = path
+                if version is not None:
+                    self._saved = (path, version)
+        return True
+
+    def _write_files(self, path: str, snap: _Snapshot, ids: list[str], centroids: np.ndarray | None, list_count: int):
+        """
+        Writes everything but the vectors for the first len(ids) rows of `snap`.
+        The manifest goes last, so a reader never sees ids without their rows.
+        """
+        m = len(ids)
+        _save_npy(os.path.join(path, _ASSIGN_FILE), snap.assign[:m])
+        if self.quantization != "none":
+            _save_npy(os.path.join(path, _CODES_FILE), snap.codes[:m])
+            _save_npy(os.path.join(path, _CODE_SCALES_FILE), snap.code_scales[:m])
+        centroids_path = os.path.join(path, _CENTROIDS_FILE)
+        if centroids is not None:
+            _save_npy(centroids_path, centroids)
+        elif os.path.exists(centroids_path):
+            os.remove(centroids_path)
+        payloads = {}
+        for chunk_id in ids:
+            payload = self._payloads.get(chunk_id)
+            if payload is not None:
+                payloads[chunk_id] = payload
+        meta = {
+            "dim": self.dim,
+            "ids": ids,
+            "payloads": payloads,
+            "trained_count": self._trained_count,
+            "list_count": list_count,
+            "quantization": self.quantization,
+        }
+        tmp_path = os.path.join(path, _META_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, os.path.join(path, _META_FILE))
+
+    # ---------- IVF ----------
+    @staticmethod
+    def _nearest_centroids(centroids: np.ndarray, vectors: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], batch_size):
+            block = np.asarray(vectors[start:start + batch_size])
+            out[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+        return out
+
+    def _maybe_train(self):
+        live = len(self)
+        if live < self.exact_threshold:
+            return
+        if not self.is_trained or live >= 4 * self._trained_count:
+            self.train()
+
+    def _maybe_relayout(self):
+        """
+        Re-sorts the rows by cluster once enough have been appended past the
+        laid-out prefix; until then searches scan that tail exhaustively.
+        """
+        snap = self._snap
+        if snap.centroids is None or snap.count - snap.list_count <= max(_BLOCK_ROWS, snap.count // 16):
+            return
+        if not self._rewrite_lock.acquire(blocking=False):
+            return
+        try:
+            version, snap = self._snapshot()
+            live = np.flatnonzero(snap.alive[: snap.count])
+            order = live[np.argsort(snap.assign[live], kind="stable")]
+            self._rewrite(snap, order, order.shape[0], path=self._mapped_path(), version=version)
+        finally:
+            self._rewrite_lock.release()
+
+    def train(self, nlist: int | None = None, iterations: int = 10, seed: int = 0):
+        """
+        Trains IVF centroids with spherical k-means on a sample of the live
+        rows, then rewrites the index cluster by cluster so that every
+        inverted list is one contiguous block (a probe is a plain matrix-vector
+        product, not a gather). Runs against a snapshot, outside the writer lock.
+        """
+        # One rewrite at a time; a concurrent request is skipped.
+        if not self._rewrite_lock.acquire(blocking=False):
+            return
+        try:
+            snap = self._snap
+            n = snap.count
+            live = np.flatnonzero(snap.alive[:n])
+            if live.shape[0] == 0:
+                return
+            nlist = nlist or max(1, int(np.sqrt(live.shape[0])))
+            nlist = min(nlist, live.shape[0])
+            rng = np.random.default_rng(seed)
+            sample_size = min(live.shape[0], 64 * nlist)
+            sample = self._take(snap, np.sort(rng.choice(live, size=sample_size, replace=False)))
+
+            centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                empty = np.bincount(labels, minlength=nlist) == 0
+                sums[empty] = centroids[empty]
+                centroids = _normalize(sums)
+
+            assign = np.concatenate([self._nearest_centroids(centroids, rows) for rows in self._segments(snap, 0, n)])
+            order = live[np.argsort(assign[live], kind="stable")]
+            self._trained_count = live.shape[0]
+            if self._rewrite(snap, order, order.shape[0], assign=assign, centroids=centroids, path=self._mapped_path()):
+                with self._lock:
+                    self._version += 1
+                logging.info(f"[VectorIndex] Trained IVF with {nlist} lists over {live.shape[0]} vectors.")
+        finally:
+            self._rewrite_lock.release()
+
+    # ---------- Search ----------
+    def search(self, query, top_k: int = 5, nprobe: int | None = None) -> list[tuple[str, float]]:
+        """
+        Returns up to top_k (chunk_id, cosine_score) pairs, best first. Reads
+        the current snapshot without locking, so it never waits on a writer.
+        """
+        q = _normalize(query)[0]
+        snap = self._snap
+        n = snap.count
+        if n == snap.dead:
+            return []
+        if snap.centroids is not None and n >= self.exact_threshold:
+            offsets = snap.list_offsets
+            probes = np.sort(_top_k(snap.centroids @ q, nprobe or self.nprobe))
+            # Rows appended since the last layout form one more block, always scanned.
+            blocks = [(offsets[c], offsets[c + 1]) for c in probes] + [(snap.list_count, n)]
+            blocks = [(start, end) for start, end in blocks if end > start]
+        else:
+            blocks = [(0, n)]
+        if not blocks:
+            return []
+        rows = np.concatenate([np.arange(start, end) for start, end in blocks])
+
+        if self.quantization != "none":
+            # First pass over the compact codes, then rescore the shortlist at full precision.
+            scores = np.concatenate([self._approx_scores(snap, start, end, q) for start, end in blocks])
+        else:
+            scores = np.concatenate([rows @ q for start, end in blocks for rows in self._segments(snap, start, end)])
+        # Dead rows are excluded before ranking, so top_k never grows with them.
+        if snap.dead:
+            scores[~snap.alive[rows]] = -np.inf
+        if self.quantization != "none":
+            shortlist = _top_k(scores, top_k * self.rescore_factor)
+            shortlist = shortlist[scores[shortlist] > -np.inf]
+            rows = np.sort(rows[shortlist])  # sequential reads from the memory map
+            scores = self._take(snap, rows) @ q
+
+        best = _top_k(scores, top_k)
+        return [(snap.ids[rows[i]], float(scores[i])) for i in best if scores[i] > -np.inf]
+
+    # ---------- Persistence ----------
+    def save(self, path: str):
+        """
+        Writes the live rows of the index to a directory: .npy files that
+        `load` can memory-map, plus a JSON manifest. With `mmap` the index
+        then reads its base rows from the written file, so only rows added
+        later stay in RAM. Saving an unchanged index to the same path is a no-op.
+        """
+        with self._rewrite_lock:
+            version, snap = self._snapshot()
+            if self._saved == (path, version):
+                return
+            keep = np.flatnonzero(snap.alive[: snap.count])
+            self._rewrite(snap, keep, int(np.searchsorted(keep, snap.list_count)), path=path, version=version)
+        logging.info(f"[VectorIndex] Saved {keep.shape[0]} vectors to {path}.")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, **kwargs) -> "VectorIndex":
+        """
+        Loads an index written by `save`. With mmap=True the vector matrix is
+        memory-mapped read-only and stays mapped: writes go to the delta
+        segment, and later saves and compactions map their own file.
+        Compressed codes are always loaded into RAM; if the saved codes do not
+        match the requested quantization they are rebuilt from the vectors.
+        """
+        with open(os.path.join(path, _META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(dim=meta["dim"], initial_capacity=1, mmap=mmap, **kwargs)
+        mode = "r" if mmap else None
+        vectors = np.load(os.path.join(path, _VECTORS_FILE), mmap_mode=mode)
+        assign = np.load(os.path.join(path, _ASSIGN_FILE), mmap_mode=mode)
+        n = vectors.shape[0]
+        ids = list(meta["ids"])
+        codes_path = os.path.join(path, _CODES_FILE)
+        if index.quantization != "none" and meta.get("quantization") == index.quantization and os.path.exists(codes_path):
+            codes = np.load(codes_path)
+            code_scales = np.load(os.path.join(path, _CODE_SCALES_FILE))
+        else:
+            # Also sizes the (zero-width) code arrays to the loaded rows when unquantized.
+            codes, code_scales = index._encode_all(vectors)
+        centroids = list_offsets = None
+        list_count = 0
+        centroids_path = os.path.join(path, _CENTROIDS_FILE)
+        if os.path.exists(centroids_path):
+            centroids = np.load(centroids_path)
+            list_count = meta.get("list_count", 0)
+            counts = np.bincount(assign[:list_count], minlength=centroids.shape[0])
+            list_offsets = np.concatenate(([0], np.cumsum(counts)))
+            index._trained_count = meta.get("trained_count", n)
+        index._snap = _Snapshot(
+            base=vectors,
+            delta=np.zeros((0, index.dim), dtype=np.float32),
+            codes=codes,
+            code_scales=code_scales,
+            assign=assign,
+            alive=np.ones(n, dtype=bool),
+            ids=ids,
+            id_to_row={chunk_id: row for row, chunk_id in enumerate(ids)},
+            count=n,
+            dead=0,
+            centroids=centroids,
+            list_offsets=list_offsets,
+            list_count=list_count,
+            generation=0,
+        )
+        index._payloads = meta.get("payloads", {})
+        index._path = path
+        index._saved = (path, index._version)
+        # Older saves kept tombstoned rows on disk.
+        if meta.get("tombstones"):
+            index.delete(meta["tombstones"])
+        # Older saves were not laid out cluster by cluster.
+        index._maybe_relayout()
+        logging.info(f"[VectorIndex] Loaded {n} vectors from {path}.")
+        return index
+
+
+# --- Process-wide default index ---
+_default_index: VectorIndex | None = None
+_default_lock = threading.Lock()
+
+
+def get_index() -> VectorIndex:
+    """
+    Returns the shared index, loading it from VECTOR_INDEX_PATH when a saved
+    copy exists so a restarted worker does not have to re-embed anything.
+    """
+    global _default_index
+    if _default_index is None:
+        with _default_lock:
+            if _default_index is None:
+                path = settings.VECTOR_INDEX_PATH
+                if path and os.path.exists(os.path.join(path, _META_FILE)):
+                    try:
+                        _default_index = VectorIndex.load(path)
+                    except Exception as e:
+                        logging.error(f"[VectorIndex] Failed to load index from {path}: {e}", exc_info=True)
+                if _default_index is None:
+                    _default_index = VectorIndex(mmap=True)
+    return _default_index
+
+
+def save_index():
+    """
+    Persists the shared index to VECTOR_INDEX_PATH.
+    """
+    if _default_index is not None and settings.VECTOR_INDEX_PATH:
+        _default_index.save(settings.VECTOR_INDEX_PATH)
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { sendMessage } from '../services/api';
+import { sendMessage, streamMessage } from '../services/api';
 import './Home.css'; // We'll create this file next for styling
 import { ThumbsUp, ThumbsDown, Send } from 'lucide-react'; // Using icons for a cleaner look
 
@@ -8,6 +8,8 @@ export default function Home() {
   const [messages, setMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
+  // Assigned by the backend on the first reply; keeps the whole chat in one session.
+  const sessionIdRef = useRef(null);
 
   // Function to automatically scroll to the latest message
   const scrollToBottom = () => {
@@ -26,17 +28,47 @@ export default function Home() {
     setInput('');
     setIsLoading(true);
 
+    // Replaces the last message (the bot reply being streamed) with an updated copy.
+    const updateLastMessage = (update) =>
+      setMessages((prev) => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...update(prev[prev.length - 1]) }]);
+
     try {
-      const botResponse = await sendMessage(input);
-      const botMessage = {
-        text: botResponse.reply || 'Sorry, I encountered an issue.',
-        sender: 'bot',
-        sources: botResponse.sources || [],
-        sentiment: botResponse.sentiment || null,
-        escalation: botResponse.escalation || null,
-        feedback: null, // To track user feedback (like/dislike)
-      };
-      setMessages((prev) => [...prev, botMessage]);
+      let started = false;
+      await streamMessage(input, {
+        sessionId: sessionIdRef.current,
+        onMeta: (meta) => {
+          started = true;
+          sessionIdRef.current = meta.session_id || sessionIdRef.current;
+          setIsLoading(false);
+          setMessages((prev) => [
+            ...prev,
+            {
+              text: '',
+              sender: 'bot',
+              sources: meta.sources || [],
+              sentiment: meta.sentiment || null,
+              escalation: meta.escalation || null,
+              feedback: null, // To track user feedback (like/dislike)
+            },
+          ]);
+        },
+        onToken: (token) => updateLastMessage((msg) => ({ text: msg.text + token })),
+        onDone: (done) => updateLastMessage(() => ({ text: done.reply || 'Sorry, I encountered an issue.' })),
+      }).catch(async (error) => {
+        if (started) throw error;
+        // Streaming unavailable: fall back to the non-streaming endpoint.
+        const botResponse = await sendMessage(input, sessionIdRef.current);
+        sessionIdRef.current = botResponse.session_id || sessionIdRef.current;
+        const botMessage = {
+          text: botResponse.reply || 'Sorry, I encountered an issue.',
+          sender: 'bot',
+          sources: botResponse.sources || [],
+          sentiment: botResponse.sentiment || null,
+          escalation: botResponse.escalation || null,
+          feedback: null, // To track user feedback (like/dislike)
+        };
+        setMessages((prev) => [...prev, botMessage]);
+      });
     } catch (error) {
       const errorMessage = { text: 'Failed to connect to the backend.', sender: 'bot' };
       setMessages((prev) => [...prev, errorMessage]);
@@ -2,12 +2,56 @@ import axios from "axios";
 
 const API_BASE_URL = "http://127.0.0.1:8000"; // Backend URL
 
-export const sendMessage = async (text) => {
+export const sendMessage = async (text, sessionId = null) => {
   try {
-    const response = await axios.post(`${API_BASE_URL}/chat/respond`, { text });
+    const response = await axios.post(`${API_BASE_URL}/chat/respond`, { text, session_id: sessionId });
     return response.data;
   } catch (error) {
     console.error("Error sending message:", error);
     return { error: "Failed to connect to backend" };
   }
 };
+
+// Streams a reply from /chat/stream (server-sent events over POST).
+// `onMeta` gets sources/sentiment/escalation first, `onToken` each text
+// fragment, and `onDone` the final reply. Pass the `session_id` returned by
+// the first reply as `sessionId` to keep later turns in the same transcript.
+export const streamMessage = async (text, { sessionId = null, onMeta, onToken, onDone } = {}) => {
+  const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ text, session_id: sessionId }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Stream request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of rawEvent.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (!data) continue;
+      const parsed = JSON.parse(data);
+
+      if (event === "meta") onMeta?.(parsed);
+      else if (event === "token") onToken?.(parsed.text);
+      else if (event === "done") onDone?.(parsed);
+    }
+  }
+};